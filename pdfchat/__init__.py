@@ -5,12 +5,24 @@ A production-ready, self-hosted AI appliance for querying PDFs using
 state-of-the-art LLMs, embeddings, and a modern WebUI.
 """
 
+import importlib
 import logging
 import os
+from typing import Any
 
 from .config import Config
-from .ingestion import PDFIngestion
-from .server import QueryServer
+
+# Imported on first access: they pull in llama-index, and `import pdfchat`
+# should stay cheap for CLI commands and tools that only need the config
+_LAZY_EXPORTS = {"PDFIngestion": ".ingestion", "QueryServer": ".server"}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Configure logging
@@ -0,0 +1,129 @@
+"""
+Admission control for PDF Chat Appliance.
+
+Caps the number of LLM generations in flight and queues a bounded number
+of waiting requests. Requests that find the queue full, or that wait
+longer than the configured queue time, are rejected immediately with a
+Retry-After hint instead of piling onto an already saturated Ollama.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT = 2
+DEFAULT_MAX_QUEUE = 16
+DEFAULT_MAX_WAIT = 10.0
+
+# Weight of the newest sample in the moving average of service time
+_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded, time-limited wait queue.
+
+    Must be used from a single event loop; `release` may be handed to
+    `loop.call_soon_threadsafe` when the work finishes on another thread.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ):
+        """Create a controller admitting `max_concurrent` requests at a time."""
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._in_flight = 0
+        self._queued = 0
+        self._admitted = 0
+        self._rejected_queue_full = 0
+        self._rejected_timeout = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._service_time = 0.0
+        self._started: Dict[int, float] = {}
+
+    async def acquire(self) -> int:
+        """Wait for a slot, returning a ticket to pass to `release`.
+
+        Raises AdmissionRejected with 429 when the queue is full and 503
+        when no slot frees up within `max_wait` seconds.
+        """
+        if self._semaphore.locked() and self._queued >= self.max_queue:
+            self._rejected_queue_full += 1
+            raise AdmissionRejected(
+                429, "Too many queued queries", self._retry_after()
+            )
+
+        start = time.perf_counter()
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self._rejected_timeout += 1
+            raise AdmissionRejected(
+                503, "Timed out waiting for a query slot", self._retry_after()
+            ) from None
+        finally:
+            self._queued -= 1
+
+        waited = time.perf_counter() - start
+        self._in_flight += 1
+        self._admitted += 1
+        self._total_wait += waited
+        self._max_wait_seen = max(self._max_wait_seen, waited)
+        ticket = self._admitted
+        self._started[ticket] = time.perf_counter()
+        return ticket
+
+    def release(self, ticket: int) -> None:
+        """Free the slot taken by `acquire`."""
+        started = self._started.pop(ticket, None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if self._service_time:
+            self._service_time += _EWMA_ALPHA * (elapsed - self._service_time)
+        else:
+            self._service_time = elapsed
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, wait times and rejection counters."""
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": self._queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "max_wait": self.max_wait,
+            "admitted": self._admitted,
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_timeout": self._rejected_timeout,
+            "avg_wait_time": self._total_wait / self._admitted if self._admitted else 0.0,
+            "max_wait_time": self._max_wait_seen,
+            "avg_service_time": self._service_time,
+        }
+
+    def _retry_after(self) -> int:
+        """Seconds until the current backlog is expected to drain."""
+        backlog = self._in_flight + self._queued
+        return max(1, math.ceil(self._service_time * backlog / self.max_concurrent))
@@ -0,0 +1,187 @@
+"""
+Approximate nearest-neighbour index for PDF Chat Appliance.
+
+An inverted-file (IVF) index over the rows of an embedding matrix. A
+spherical k-means coarse quantizer assigns every row to one of `nlist`
+lists; a query only scans the rows of its `nprobe` closest lists, which
+trades a little recall for a large cut in rows read. The index stores
+row ids only, the vectors stay in the (memory-mapped) matrix.
+"""
+
+import logging
+import math
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .search import DEFAULT_BLOCK_ROWS, exact_top_k
+
+logger = logging.getLogger(__name__)
+
+# Rows sampled per list when training the quantizer
+TRAINING_SAMPLES_PER_LIST = 256
+
+
+def default_nlist(num_rows: int) -> int:
+    """Rule-of-thumb list count (~4 * sqrt(n)) for a corpus size."""
+    return max(1, min(num_rows, int(4 * math.sqrt(num_rows))))
+
+
+class IVFIndex:
+    """Inverted-file index over L2-normalized embedding rows."""
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = 8):
+        """Create an index from trained centroids with no rows assigned."""
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.nprobe = nprobe
+        self.indexed_rows = 0
+        self.trained_rows = 0
+        self._lists: List[np.ndarray] = [
+            np.empty(0, dtype=np.int64) for _ in range(self.nlist)
+        ]
+
+    @property
+    def nlist(self) -> int:
+        """Number of inverted lists."""
+        return self.centroids.shape[0]
+
+    @classmethod
+    def train(
+        cls,
+        matrix: np.ndarray,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        iterations: int = 20,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """Train the coarse quantizer with spherical k-means on a row sample."""
+        num_rows = matrix.shape[0]
+        nlist = min(nlist or default_nlist(num_rows), num_rows)
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(num_rows, nlist * TRAINING_SAMPLES_PER_LIST)
+        sample_rows = np.sort(rng.choice(num_rows, sample_size, replace=False))
+        sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+
+            # Re-seed empty lists from random sample rows
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        logger.info(f"Trained IVF quantizer with {nlist} lists on {sample_size} rows")
+        index = cls(centroids, nprobe=nprobe)
+        index.trained_rows = num_rows
+        return index
+
+    def add(self, matrix: np.ndarray, block_rows: int = DEFAULT_BLOCK_ROWS) -> None:
+        """Assign matrix rows not yet indexed to their nearest list."""
+        num_rows = matrix.shape[0]
+        for start in range(self.indexed_rows, num_rows, block_rows):
+            end = min(start + block_rows, num_rows)
+            block = np.asarray(matrix[start:end], dtype=np.float32)
+            assignment = np.argmax(block @ self.centroids.T, axis=1)
+
+            order = np.argsort(assignment, kind="stable")
+            counts = np.bincount(assignment, minlength=self.nlist)
+            rows = order + start
+            offset = 0
+            for list_id in np.flatnonzero(counts):
+                count = counts[list_id]
+                self._lists[list_id] = np.concatenate(
+                    [self._lists[list_id], rows[offset : offset + count]]
+                )
+                offset += count
+        self.indexed_rows = max(self.indexed_rows, num_rows)
+
+    def search(
+        self,
+        matrix: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        mask: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Search the `nprobe` closest lists for the top-k rows of one query.
+
+        With a `mask`, more lists are probed (doubling `nprobe`) until k
+        masked candidates are found or every list has been searched.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        query = np.asarray(query, dtype=np.float32)
+
+        while True:
+            probe, _ = exact_top_k(self.centroids, query, nprobe)
+            candidates = np.sort(np.concatenate([self._lists[i] for i in probe]))
+            # Rows indexed after `matrix` was taken are not searched
+            candidates = candidates[candidates < matrix.shape[0]]
+            if mask is None:
+                break
+            candidates = candidates[mask[candidates]]
+            if len(candidates) >= k or nprobe >= self.nlist:
+                break
+            nprobe = min(2 * nprobe, self.nlist)
+        if not len(candidates):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        local, scores = exact_top_k(np.asarray(matrix[candidates]), query, k)
+        return candidates[local], scores
+
+    def probed_rows(self, nprobe: Optional[int] = None) -> float:
+        """Expected number of rows scanned when probing `nprobe` lists."""
+        return self.indexed_rows * min(nprobe or self.nprobe, self.nlist) / self.nlist
+
+    def save(self, path: str) -> None:
+        """Write the index to an .npz file."""
+        sizes = np.array([len(rows) for rows in self._lists], dtype=np.int64)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            sizes=sizes,
+            rows=np.concatenate(self._lists),
+            indexed_rows=np.int64(self.indexed_rows),
+            trained_rows=np.int64(self.trained_rows),
+            nprobe=np.int64(self.nprobe),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Read an index written by save()."""
+        with np.load(path) as data:
+            index = cls(data["centroids"], nprobe=int(data["nprobe"]))
+            offsets = np.concatenate([[0], np.cumsum(data["sizes"])])
+            rows = data["rows"]
+            index._lists = [
+                rows[offsets[i] : offsets[i + 1]].copy() for i in range(index.nlist)
+            ]
+            index.indexed_rows = int(data["indexed_rows"])
+            index.trained_rows = int(data["trained_rows"])
+        return index
+
+
+def recall_at_k(
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    index: IVFIndex,
+    k: int = 10,
+    nprobe: Optional[int] = None,
+) -> float:
+    """Fraction of the exact top-k rows that the IVF index also returns."""
+    exact_rows, _ = exact_top_k(matrix, queries, k)
+    hits = 0
+    for query, expected in zip(queries, exact_rows):
+        found, _ = index.search(matrix, query, k, nprobe=nprobe)
+        hits += len(set(found.tolist()) & set(expected.tolist()))
+    return hits / exact_rows.size if exact_rows.size else 1.0
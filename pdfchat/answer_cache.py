@@ -0,0 +1,151 @@
+"""
+Semantic answer cache for PDF Chat Appliance.
+
+Help-desk traffic is dominated by paraphrases of the same questions, and
+generating an answer on a CPU model takes seconds. Answers are cached
+against the query embedding and returned for any later query whose
+embedding is within a cosine-similarity threshold, as long as the index
+generation (bumped whenever ingestion swaps in a new index) is unchanged.
+"""
+
+import copy
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .search import normalize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_SIMILARITY = 0.95
+
+
+class SemanticAnswerCache:
+    """LRU cache of query responses looked up by embedding similarity."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        similarity_threshold: float = DEFAULT_SIMILARITY,
+    ):
+        """Create an empty cache; `max_entries` of 0 disables it."""
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        # Slot arrays are allocated on first insert, once the dimension is known
+        self._vectors: Optional[np.ndarray] = None
+        self._max_results = np.zeros(max_entries, dtype=np.int64)
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._used = np.zeros(max_entries, dtype=bool)
+        self._responses: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._clock = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.max_entries > 0
+
+    def get(
+        self, embedding: List[float], generation: int, max_results: int
+    ) -> Optional[Dict[str, Any]]:
+        """Return a cached response for a similar query, or None."""
+        query = normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            self._check_generation(generation)
+            slot = self._best_slot(query, max_results)
+            if slot is None:
+                self.misses += 1
+                return None
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self.hits += 1
+            return copy.deepcopy(self._responses[slot])
+
+    def put(
+        self,
+        embedding: List[float],
+        response: Dict[str, Any],
+        generation: int,
+        max_results: int,
+    ) -> None:
+        """Cache a response computed against the given index generation."""
+        if not self.enabled:
+            return
+        query = normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            # An answer computed before a newer index was swapped in is stale
+            if self._generation is not None and generation < self._generation:
+                return
+            self._check_generation(generation)
+
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                self._vectors = np.zeros(
+                    (self.max_entries, query.shape[0]), dtype=np.float32
+                )
+                self._used[:] = False
+
+            free = np.flatnonzero(~self._used)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+            self._clock += 1
+            self._vectors[slot] = query
+            self._max_results[slot] = max_results
+            self._last_used[slot] = self._clock
+            self._used[slot] = True
+            self._responses[slot] = copy.deepcopy(response)
+
+    def clear(self) -> None:
+        """Drop all entries, keeping the counters."""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": int(self._used.sum()),
+            "max_entries": self.max_entries,
+            "similarity_threshold": self.similarity_threshold,
+            "generation": self._generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+    def _best_slot(self, query: np.ndarray, max_results: int) -> Optional[int]:
+        """Most similar cached query with the same result count, if close enough."""
+        if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+            return None
+        candidates = np.flatnonzero(self._used & (self._max_results == max_results))
+        if not len(candidates):
+            return None
+        scores = self._vectors[candidates] @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        return int(candidates[best])
+
+    def _check_generation(self, generation: int) -> None:
+        """Invalidate everything when the index generation moves on."""
+        if self._generation != generation:
+            if self._used.any():
+                self.invalidations += 1
+                logger.info(
+                    f"Answer cache invalidated (generation {self._generation} -> {generation})"
+                )
+            self._clear()
+            self._generation = generation
+
+    def _clear(self) -> None:
+        self._used[:] = False
+        self._responses = [None] * self.max_entries
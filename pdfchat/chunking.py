@@ -0,0 +1,470 @@
+"""
+Native sentence-aware chunker for PDF Chat Appliance.
+
+The text is tokenized once with the embedding model's tokenizer, keeping
+each token's character offsets, and sentence boundaries are found in one
+regex scan. Chunks are then packed greedily in token space: every chunk
+holds at most `chunk_size` model tokens, ends on a sentence boundary
+where one fits, and repeats up to `chunk_overlap` tokens of whole
+sentences from the chunk before it. Substrings are only sliced out of
+the text when a chunk is emitted.
+
+ParallelChunker tokenizes the segments of a large document in worker
+processes and packs the stitched token arrays in the parent, so its
+chunks are identical to TokenChunker's.
+"""
+
+import functools
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.node_parser.interface import TextSplitter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKENIZER = "nomic-ai/nomic-embed-text-v1.5"
+# Segments smaller than this cost more in IPC than they save
+DEFAULT_SEGMENT_CHARS = 1_000_000
+
+# A sentence starts after terminal punctuation (and any closing quotes or
+# brackets) followed by whitespace, or after a blank line
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])[\"'”)\]]*\s+|\n\s*\n")
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+Offsets = Tuple[np.ndarray, np.ndarray]
+
+
+class _HFTokenizer:
+    """Character offsets from a Hugging Face fast tokenizer."""
+
+    def __init__(self, tokenizer: Any, name: str):
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        self._tokenizer = tokenizer
+        self.name = name
+
+    def offsets(self, text: str) -> Offsets:
+        encoding = self._tokenizer.encode(text, add_special_tokens=False)
+        spans = np.asarray(encoding.offsets, dtype=np.int64).reshape(-1, 2)
+        return spans[:, 0], spans[:, 1]
+
+
+class _TiktokenTokenizer:
+    """Character offsets from tiktoken, the budget llama-index splitters use."""
+
+    def __init__(self, encoding: Any):
+        self._encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def offsets(self, text: str) -> Offsets:
+        tokens = self._encoding.encode_ordinary(text)
+        lengths = np.fromiter(
+            map(len, self._encoding.decode_tokens_bytes(tokens)),
+            dtype=np.int64,
+            count=len(tokens),
+        )
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        if not text.isascii():
+            # Map UTF-8 byte offsets to character offsets
+            data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+            chars = np.concatenate(([0], np.cumsum((data & 0xC0) != 0x80)))
+            starts, ends = chars[starts], chars[ends]
+        return starts, ends
+
+
+class _RegexTokenizer:
+    """Word and punctuation offsets, used when no model tokenizer loads."""
+
+    name = "regex"
+
+    def offsets(self, text: str) -> Offsets:
+        spans = np.array(
+            [m.span() for m in _WORD.finditer(text)], dtype=np.int64
+        ).reshape(-1, 2)
+        return spans[:, 0], spans[:, 1]
+
+
+def _tiktoken_encoding() -> Any:
+    """The cl100k encoding, read from llama-index's bundled cache if needed."""
+    import llama_index.core
+    import tiktoken
+
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        return tiktoken.get_encoding("cl100k_base")
+    os.environ["TIKTOKEN_CACHE_DIR"] = os.path.join(
+        os.path.dirname(llama_index.core.__file__), "_static", "tiktoken_cache"
+    )
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    finally:
+        del os.environ["TIKTOKEN_CACHE_DIR"]
+
+
+@functools.lru_cache(maxsize=None)
+def load_tokenizer(name: Optional[str] = DEFAULT_TOKENIZER) -> Any:
+    """Load a tokenizer that reports token character offsets.
+
+    `name` is a Hugging Face model id, or "tiktoken" or "regex". Falls
+    back to tiktoken, then to word-level tokens, when the model's
+    tokenizer cannot be loaded (no `tokenizers` package, offline host).
+    """
+    if name not in ("tiktoken", "regex"):
+        try:
+            from tokenizers import Tokenizer
+
+            return _HFTokenizer(Tokenizer.from_pretrained(name), name)
+        except Exception as e:
+            logger.warning(
+                f"Tokenizer of {name} unavailable ({e}); counting tiktoken tokens"
+            )
+    if name != "regex":
+        try:
+            return _TiktokenTokenizer(_tiktoken_encoding())
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable ({e}); counting word tokens")
+    return _RegexTokenizer()
+
+
+def resolve_tokenizer(name: Optional[str] = DEFAULT_TOKENIZER, strict: bool = False) -> Any:
+    """load_tokenizer(), warning (or with `strict`, raising) on a fallback.
+
+    A fallback tokenizer counts budgets in other tokens than the
+    embedding model's, so chunks can exceed its context. Its `.name`
+    says which tokenizer actually loaded.
+    """
+    tokenizer = load_tokenizer(name)
+    requested = name or DEFAULT_TOKENIZER
+    if tokenizer.name != requested and not tokenizer.name.startswith(f"{requested}:"):
+        message = (
+            f"Chunking with {tokenizer.name} instead of the {requested} tokenizer; "
+            "chunk budgets are not counted in embedding model tokens"
+        )
+        if strict:
+            raise RuntimeError(message)
+        logger.warning(message)
+    return tokenizer
+
+
+class TokenChunker:
+    """Splits text into sentence-aligned chunks with exact token budgets."""
+
+    def __init__(
+        self,
+        chunk_size: int = 1024,
+        chunk_overlap: int = 200,
+        tokenizer: Any = None,
+    ):
+        """Create a chunker; `tokenizer` defaults to the embedding model's."""
+        if chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("Need 0 <= chunk_overlap < chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.tokenizer = tokenizer or load_tokenizer()
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        """Character [start, end) spans of the chunks of `text`."""
+        return self.pack(text, *self.tokenize(text))
+
+    def split_text(self, text: str) -> List[str]:
+        """Split `text` into chunk strings."""
+        return [text[start:end] for start, end in self.spans(text)]
+
+    def tokenize(self, text: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Token offsets and sentence starts of `text`.
+
+        Returns token start and end offsets, and the sorted indices of the
+        tokens that begin a sentence followed by a len(tokens) sentinel.
+        """
+        starts, ends = self.tokenizer.offsets(text)
+        return starts, ends, _finish_bounds(_sentence_starts(text, ends), len(starts))
+
+    def pack(
+        self, text: str, starts: np.ndarray, ends: np.ndarray, bounds: np.ndarray
+    ) -> List[Tuple[int, int]]:
+        """Greedily pack tokenized `text` into chunk spans."""
+        spans: List[Tuple[int, int]] = []
+        first = last = 0
+        while first < len(starts):
+            end, following = self.step(first, last, bounds)
+            _append_span(spans, text, int(starts[first]), int(ends[end - 1]))
+            first, last = following, end
+        return spans
+
+    def step(self, first: int, last: int, bounds: np.ndarray) -> Tuple[int, int]:
+        """One greedy packing step over token indices.
+
+        From a chunk starting at token `first`, after a chunk that ended
+        at `last`, returns where this chunk ends and where the next one
+        starts. Only `bounds` up to first + chunk_size are consulted.
+        """
+        total = int(bounds[-1])
+        limit = first + self.chunk_size
+        if limit >= total:
+            return total, total
+
+        i = np.searchsorted(bounds, limit, side="right") - 1
+        # Each chunk must get past the end of the one before it
+        if i >= 0 and bounds[i] > max(first, last):
+            end = int(bounds[i])
+            # Repeat the whole sentences that fit in the overlap, if any
+            j = np.searchsorted(bounds, max(end - self.chunk_overlap, first + 1))
+            return end, int(bounds[j]) if bounds[j] < end else end
+        # The sentence is too long and is cut at a token, overlapping by tokens
+        return limit, max(limit - self.chunk_overlap, first + 1)
+
+
+def _sentence_starts(text: str, ends: np.ndarray) -> np.ndarray:
+    """Index of the token holding each sentence's first character.
+
+    BPE tokens may carry the leading space, so a sentence starts at the
+    first token ending past the break. Not yet clipped to (0, len(ends)).
+    """
+    breaks = np.fromiter(
+        (m.end() for m in _SENTENCE_BREAK.finditer(text)), dtype=np.int64
+    )
+    return np.searchsorted(ends, breaks, side="right")
+
+
+def _finish_bounds(bounds: np.ndarray, total: int) -> np.ndarray:
+    """Sorted interior sentence starts followed by a `total` sentinel."""
+    bounds = np.unique(bounds)
+    return np.append(bounds[(bounds > 0) & (bounds < total)], total)
+
+
+def _append_span(spans: List[Tuple[int, int]], text: str, start: int, end: int) -> None:
+    """Add a chunk span narrowed to exclude surrounding whitespace."""
+    start, end = _strip(text, start, end)
+    if start < end:
+        spans.append((start, end))
+
+
+def _strip(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Narrow a span to exclude surrounding whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _tokenize_segment(text: str, tokenizer_name: Optional[str]) -> Tuple[np.ndarray, ...]:
+    """Token offsets and unclipped sentence starts of one segment (worker)."""
+    starts, ends = load_tokenizer(tokenizer_name).offsets(text)
+    return starts, ends, _sentence_starts(text, ends)
+
+
+def _tokenize_texts(
+    texts: Sequence[str], tokenizer_name: Optional[str]
+) -> List[Tuple[np.ndarray, ...]]:
+    """Token offsets and unclipped sentence starts of each text (worker)."""
+    return [_tokenize_segment(text, tokenizer_name) for text in texts]
+
+
+def _is_cut(text: str, cut: int) -> bool:
+    """Whether segments can be tokenized on their own either side of `cut`.
+
+    Neither tokens nor sentence breaks span a newline followed by a
+    non-space character, so text split there tokenizes exactly as a whole.
+    """
+    return 0 < cut < len(text) and text[cut - 1] == "\n" and not text[cut].isspace()
+
+
+class ParallelChunker:
+    """TokenChunker whose tokenization runs on a process pool.
+
+    Tokenizing and scanning for sentences is nearly all of the work and
+    is independent per segment of the text. The packing walk is one step
+    per chunk, so it runs in the parent over the stitched token arrays,
+    which keeps chunks that straddle a segment boundary (and their
+    overlaps) exactly as a sequential pass would make them.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1024,
+        chunk_overlap: int = 200,
+        tokenizer_name: Optional[str] = DEFAULT_TOKENIZER,
+        workers: int = 4,
+        segment_chars: int = DEFAULT_SEGMENT_CHARS,
+    ):
+        self.chunker = TokenChunker(
+            chunk_size, chunk_overlap, tokenizer=load_tokenizer(tokenizer_name)
+        )
+        self.tokenizer_name = tokenizer_name
+        self.workers = max(1, workers)
+        self.segment_chars = segment_chars
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def budget(self) -> Tuple[int, int]:
+        """Chunk size and overlap, in tokens."""
+        return self.chunker.chunk_size, self.chunker.chunk_overlap
+
+    def spans(
+        self, text: str, cuts: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, int]]:
+        """Character [start, end) spans of the chunks of `text`.
+
+        `cuts` are preferred segment starts, such as page offsets; by
+        default segments start at a line. Unusable cuts are ignored.
+        """
+        segments = self.segments(text, cuts)
+        if len(segments) < 2 or self.workers < 2:
+            return self.chunker.spans(text)
+
+        pool = self._get_pool()
+        try:
+            futures = [
+                pool.submit(_tokenize_segment, text[start:end], self.tokenizer_name)
+                for start, end in segments
+            ]
+            parts = [future.result() for future in futures]
+        except BrokenProcessPool:
+            logger.warning("Chunking pool broke; chunking in-process")
+            self._reset_pool(pool)
+            return self.chunker.spans(text)
+
+        starts, ends, bounds = [], [], []
+        tokens = 0
+        for (offset, _), (seg_starts, seg_ends, seg_bounds) in zip(segments, parts):
+            starts.append(seg_starts + offset)
+            ends.append(seg_ends + offset)
+            bounds.append(seg_bounds + tokens)
+            tokens += len(seg_starts)
+        return self.chunker.pack(
+            text,
+            np.concatenate(starts),
+            np.concatenate(ends),
+            _finish_bounds(np.concatenate(bounds), tokens),
+        )
+
+    def split_text(self, text: str, cuts: Optional[Sequence[int]] = None) -> List[str]:
+        """Split `text` into chunk strings."""
+        return [text[start:end] for start, end in self.spans(text, cuts)]
+
+    def spans_many(self, texts: Sequence[str]) -> List[List[Tuple[int, int]]]:
+        """Chunk spans of each of `texts`, chunked independently.
+
+        Pages and sections are small, so they go to the pool in batches of
+        at least `segment_chars`; with a single batch they are chunked
+        in-process.
+        """
+        batches = self.batches(texts)
+        if len(batches) < 2 or self.workers < 2:
+            return [self.chunker.spans(text) for text in texts]
+
+        pool = self._get_pool()
+        try:
+            futures = [
+                pool.submit(_tokenize_texts, texts[start:end], self.tokenizer_name)
+                for start, end in batches
+            ]
+            parts = [part for future in futures for part in future.result()]
+        except BrokenProcessPool:
+            logger.warning("Chunking pool broke; chunking in-process")
+            self._reset_pool(pool)
+            return [self.chunker.spans(text) for text in texts]
+
+        return [
+            self.chunker.pack(text, starts, ends, _finish_bounds(bounds, len(starts)))
+            for text, (starts, ends, bounds) in zip(texts, parts)
+        ]
+
+    def batches(self, texts: Sequence[str]) -> List[Tuple[int, int]]:
+        """[start, end) index ranges of `texts` of at least `segment_chars`."""
+        boundaries = [0]
+        chars = 0
+        for i, text in enumerate(texts[:-1]):
+            chars += len(text)
+            if chars >= self.segment_chars:
+                boundaries.append(i + 1)
+                chars = 0
+        boundaries.append(len(texts))
+        return [
+            (start, end)
+            for start, end in zip(boundaries, boundaries[1:])
+            if start < end
+        ]
+
+    def segments(
+        self, text: str, cuts: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, int]]:
+        """[start, end) segments of at least `segment_chars` (bar the last)."""
+        boundaries = [0]
+        if cuts is None:
+            position = self.segment_chars
+            while position < len(text):
+                newline = text.find("\n", position - 1)
+                if newline < 0:
+                    break
+                if _is_cut(text, newline + 1):
+                    boundaries.append(newline + 1)
+                    position = newline + 1 + self.segment_chars
+                else:
+                    position = newline + 2
+        else:
+            for cut in sorted(cuts):
+                if cut - boundaries[-1] >= self.segment_chars and _is_cut(text, cut):
+                    boundaries.append(cut)
+        boundaries.append(len(text))
+        return list(zip(boundaries, boundaries[1:]))
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned workers do not inherit the parent's threads and locks
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class TokenChunkSplitter(TextSplitter):
+    """llama-index node parser backed by TokenChunker."""
+
+    chunk_size: int = Field(default=1024, description="Maximum tokens per chunk.")
+    chunk_overlap: int = Field(default=200, description="Tokens shared by neighbours.")
+    tokenizer_name: Optional[str] = Field(
+        default=DEFAULT_TOKENIZER, description="Tokenizer counting the budget."
+    )
+
+    _chunker: TokenChunker = PrivateAttr()
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._chunker = TokenChunker(
+            self.chunk_size,
+            self.chunk_overlap,
+            tokenizer=load_tokenizer(self.tokenizer_name),
+        )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "TokenChunkSplitter"
+
+    def split_text(self, text: str) -> List[str]:
+        return self._chunker.split_text(text)
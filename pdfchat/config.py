@@ -6,8 +6,8 @@ paths, model settings, and server configuration.
 """
 
 import os
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional
 
 import yaml
 
@@ -22,22 +22,37 @@ class Config:
 
     # Embedding model
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    # Ingestion embedding backend (see config/default.yaml)
+    embedding: Dict[str, Any] = field(default_factory=dict)
 
     # Server settings
     host: str = "0.0.0.0"
     port: int = 5000
+    query_workers: int = 4
 
     # LLM settings (for future Ollama integration)
     llm_model: Optional[str] = None
     llm_base_url: Optional[str] = None
+    llm_timeout: int = 45
+
+    # Tuning sections (see config/default.yaml)
+    chunking: Dict[str, Any] = field(default_factory=dict)
+    file_processing: Dict[str, Any] = field(default_factory=dict)
+    vector_db: Dict[str, Any] = field(default_factory=dict)
+    cache: Dict[str, Any] = field(default_factory=dict)
+    admission: Dict[str, Any] = field(default_factory=dict)
+    query_batching: Dict[str, Any] = field(default_factory=dict)
+    warmup: Dict[str, Any] = field(default_factory=dict)
 
     @classmethod
     def from_yaml(cls, config_path: str = "config/default.yaml") -> "Config":
         """Load configuration from YAML file."""
         if os.path.exists(config_path):
             with open(config_path) as f:
-                config_data = yaml.safe_load(f)
-                return cls(**config_data)
+                config_data = yaml.safe_load(f) or {}
+                # Ignore sections that are not modelled here yet
+                known = {f.name for f in fields(cls)}
+                return cls(**{k: v for k, v in config_data.items() if k in known})
         return cls()
 
     def to_yaml(self, config_path: str = "config/default.yaml") -> None:
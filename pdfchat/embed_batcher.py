@@ -0,0 +1,184 @@
+"""
+Adaptive embedding batcher for PDF Chat Appliance.
+
+Embedding models pad every text in a batch to the longest one, so texts
+are sorted by length before they are split into batches. The batch size
+is tuned while embedding: it keeps moving in the direction that raised
+throughput (embeddings per second) and turns back when throughput drops,
+a batch takes longer than `max_batch_seconds`, or system memory runs
+short. Several batches are kept in flight so the backend (Ollama or a
+local model server) never waits on the Python side between calls.
+"""
+
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_MIN_BATCH_SIZE = 4
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_IN_FLIGHT = 2
+DEFAULT_MAX_BATCH_SECONDS = 30.0
+DEFAULT_MEMORY_LIMIT_PERCENT = 90.0
+
+# Batch size multiplier per adjustment
+GROWTH_FACTOR = 1.5
+# Throughput changes smaller than this are measurement noise
+RATE_TOLERANCE = 0.05
+
+EmbedBatchFn = Callable[[List[str]], List[List[float]]]
+
+
+class AdaptiveBatcher:
+    """Embeds texts in length-sorted batches of a self-tuning size."""
+
+    def __init__(
+        self,
+        embed_batch: EmbedBatchFn,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        min_batch_size: int = DEFAULT_MIN_BATCH_SIZE,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        in_flight: int = DEFAULT_IN_FLIGHT,
+        max_batch_seconds: float = DEFAULT_MAX_BATCH_SECONDS,
+        memory_limit_percent: float = DEFAULT_MEMORY_LIMIT_PERCENT,
+        adaptive: bool = True,
+    ):
+        """Create a batcher around a blocking batch embedding function.
+
+        `batch_size` is the starting size; with `adaptive` off it is
+        fixed, which is how a benchmark measures one size at a time.
+        """
+        if not 1 <= min_batch_size <= max_batch_size or in_flight < 1:
+            raise ValueError("Need 1 <= min_batch_size <= max_batch_size, in_flight >= 1")
+        self.embed_batch = embed_batch
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.batch_size = min(max(batch_size, min_batch_size), max_batch_size)
+        self.in_flight = in_flight
+        self.max_batch_seconds = max_batch_seconds
+        self.memory_limit_percent = memory_limit_percent
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+        self._direction = 1
+        self._last_rate: Optional[float] = None
+        # Per batch size: [batches, embeddings, seconds]
+        self._stats: Dict[int, List[float]] = {}
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        on_batch: Optional[Callable[[int], None]] = None,
+    ) -> List[List[float]]:
+        """Embed `texts`, returning embeddings in input order.
+
+        `on_batch` is called with the number of texts embedded so far
+        after every batch. The first batch error is raised once the
+        batches already in flight have finished.
+        """
+        # Longest first, so a size that exhausts memory fails early
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        done = 0
+        position = 0
+
+        def next_batch() -> List[int]:
+            nonlocal position
+            # Sized when taken, so in-flight results steer later batches
+            indices = order[position : position + self.batch_size]
+            position += len(indices)
+            return indices
+
+        def finish(indices: List[int], embeddings: List[List[float]], seconds: float):
+            nonlocal done
+            if len(embeddings) != len(indices):
+                raise ValueError("Embedding count mismatch")
+            for i, embedding in zip(indices, embeddings):
+                results[i] = embedding
+            done += len(indices)
+            self.record(len(indices), seconds)
+            if on_batch is not None:
+                on_batch(done)
+
+        if self.in_flight == 1 or len(order) <= self.batch_size:
+            while position < len(order):
+                indices = next_batch()
+                finish(indices, *self._timed_call([texts[i] for i in indices]))
+            return results  # type: ignore[return-value]
+
+        pending: Dict[Future, List[int]] = {}
+        with ThreadPoolExecutor(
+            max_workers=self.in_flight, thread_name_prefix="embed-batch"
+        ) as pool:
+            try:
+                while position < len(order) or pending:
+                    while position < len(order) and len(pending) < self.in_flight:
+                        indices = next_batch()
+                        future = pool.submit(self._timed_call, [texts[i] for i in indices])
+                        pending[future] = indices
+                    finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        finish(pending.pop(future), *future.result())
+            finally:
+                for future in pending:
+                    future.cancel()
+        return results  # type: ignore[return-value]
+
+    def _timed_call(self, texts: List[str]) -> Tuple[List[List[float]], float]:
+        start = time.perf_counter()
+        embeddings = self.embed_batch(texts)
+        return embeddings, time.perf_counter() - start
+
+    def record(self, items: int, seconds: float) -> None:
+        """Account for one finished batch and adjust the batch size."""
+        with self._lock:
+            entry = self._stats.setdefault(items, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += items
+            entry[2] += seconds
+            # Short final batches and batches cut before the last change
+            # say little about the current size
+            if not self.adaptive or items != self.batch_size:
+                return
+
+            rate = items / seconds if seconds > 0 else math.inf
+            memory = psutil.virtual_memory().percent
+            if memory >= self.memory_limit_percent or seconds > self.max_batch_seconds:
+                self._direction = -1
+            elif self._last_rate is not None and rate < self._last_rate * (
+                1 - RATE_TOLERANCE
+            ):
+                # The last step made things worse; head back
+                self._direction = -self._direction
+            self._last_rate = rate
+
+            if self._direction > 0:
+                size = math.ceil(self.batch_size * GROWTH_FACTOR)
+            else:
+                size = math.floor(self.batch_size / GROWTH_FACTOR)
+            size = min(max(size, self.min_batch_size), self.max_batch_size)
+            if size != self.batch_size:
+                logger.debug(
+                    f"Embedding batch size {self.batch_size} -> {size} "
+                    f"({rate:.1f} embeddings/s, memory {memory:.0f}%)"
+                )
+                self.batch_size = size
+
+    def stats(self) -> Dict[int, Dict[str, float]]:
+        """Batches, embeddings and embeddings/sec measured at each batch size."""
+        with self._lock:
+            return {
+                size: {
+                    "batches": int(batches),
+                    "embeddings": int(items),
+                    "seconds": seconds,
+                    "embeddings_per_second": items / seconds if seconds else 0.0,
+                }
+                for size, (batches, items, seconds) in sorted(self._stats.items())
+            }
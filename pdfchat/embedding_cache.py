@@ -0,0 +1,318 @@
+"""
+Embedding cache for PDF Chat Appliance.
+
+Chunks that are byte-identical after whitespace normalization (legal
+boilerplate, repeated headers, duplicated vendor sections) are embedded
+once and looked up afterwards. Vectors are persisted in SQLite keyed by
+(model, text hash) with size-bounded least-recently-used eviction.
+Query embeddings are kept in a small in-process LRU, since dashboards
+and scripted checks ask the same questions over and over.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# ~3 KB per 768-dim vector, so roughly 1.5 GB on disk when full
+DEFAULT_MAX_ENTRIES = 500_000
+DEFAULT_QUERY_ENTRIES = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Apply Unicode NFC normalization and collapse whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text: str) -> str:
+    """Hash of a chunk after Unicode and whitespace normalization."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent (model, text hash) -> vector cache with LRU eviction."""
+
+    def __init__(self, db_path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Open (or create) the cache database."""
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._count, self._clock = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(last_used), 0) FROM embeddings"
+        ).fetchone()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[Embedding]]:
+        """Look up cached vectors, returning None for misses."""
+        hashes = [text_hash(text) for text in texts]
+        with self._lock:
+            found: Dict[str, bytes] = {}
+            unique = list(set(hashes))
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(
+                    self._conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings "
+                        f"WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model, *batch],
+                    ).fetchall()
+                )
+
+            if found:
+                self._clock += 1
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(self._clock, model, h) for h in found],
+                )
+                self._conn.commit()
+
+            results = [
+                np.frombuffer(found[h], dtype=np.float32).tolist() if h in found else None
+                for h in hashes
+            ]
+            hits = sum(r is not None for r in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(
+        self, model: str, texts: List[str], embeddings: List[Embedding]
+    ) -> None:
+        """Store vectors, evicting the least recently used entries if full."""
+        with self._lock:
+            self._clock += 1
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        model,
+                        text_hash(text),
+                        np.asarray(embedding, dtype=np.float32).tobytes(),
+                        self._clock,
+                    )
+                    for text, embedding in zip(texts, embeddings)
+                ],
+            )
+            self._count += max(cursor.rowcount, 0)
+
+            excess = self._count - self.max_entries
+            if excess > 0:
+                # Evict an extra 10% so eviction does not run on every insert
+                evict = excess + self.max_entries // 10
+                cursor = self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN ("
+                    "SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (evict,),
+                )
+                self._count -= cursor.rowcount
+                self.evictions += cursor.rowcount
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class QueryEmbeddingCache:
+    """In-process LRU of query embeddings with an optional time-to-live."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_QUERY_ENTRIES,
+        ttl_seconds: Optional[float] = None,
+    ):
+        """Create an empty cache; a falsy `ttl_seconds` disables expiry."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds or None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, Tuple[Embedding, float]] = OrderedDict()
+
+    def get(self, query: str) -> Optional[Embedding]:
+        """Return the cached embedding for a query, or None."""
+        key = normalize_text(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None:
+                if time.monotonic() - entry[1] > self.ttl_seconds:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, query: str, embedding: Embedding) -> None:
+        """Store a query embedding, evicting the least recently used."""
+        if self.max_entries <= 0:
+            return
+        key = normalize_text(query)
+        with self._lock:
+            self._entries[key] = (embedding, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model wrapper that consults an EmbeddingCache first."""
+
+    _inner: Any = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _query_cache: Optional[QueryEmbeddingCache] = PrivateAttr()
+
+    def __init__(
+        self,
+        inner: Any,
+        cache: EmbeddingCache,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Wrap `inner`, caching text embeddings in `cache` and, if given,
+        query embeddings in `query_cache`."""
+        # Inherit the inner model's name (the cache key) and batch size
+        model_name = getattr(inner, "model_name", None)
+        if isinstance(model_name, str):
+            kwargs.setdefault("model_name", model_name)
+        batch_size = getattr(inner, "embed_batch_size", None)
+        if isinstance(batch_size, int):
+            kwargs.setdefault("embed_batch_size", batch_size)
+        super().__init__(**kwargs)
+        self._inner = inner
+        self._cache = cache
+        self._query_cache = query_cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        """The underlying persistent cache."""
+        return self._cache
+
+    @property
+    def query_cache(self) -> Optional[QueryEmbeddingCache]:
+        """The in-process query embedding cache, if enabled."""
+        return self._query_cache
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        if self._query_cache is None:
+            return self._inner.get_query_embedding(query)
+        embedding = self._query_cache.get(query)
+        if embedding is None:
+            embedding = self._inner.get_query_embedding(query)
+            self._query_cache.put(query, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        if self._query_cache is None:
+            return await self._inner.aget_query_embedding(query)
+        embedding = self._query_cache.get(query)
+        if embedding is None:
+            embedding = await self._inner.aget_query_embedding(query)
+            self._query_cache.put(query, embedding)
+        return embedding
+
+    def get_query_embedding_batch(self, queries: List[str]) -> List[Embedding]:
+        """Embed several queries, sending the cache misses in one model call."""
+        results: List[Optional[Embedding]] = [
+            self._query_cache.get(query) if self._query_cache else None
+            for query in queries
+        ]
+        missing = [i for i, embedding in enumerate(results) if embedding is None]
+        if missing:
+            unique = list(dict.fromkeys(queries[i] for i in missing))
+            computed = dict(zip(unique, self._embed_queries(unique)))
+            if self._query_cache is not None:
+                for query, embedding in computed.items():
+                    self._query_cache.put(query, embedding)
+            for i in missing:
+                results[i] = computed[queries[i]]
+        return results
+
+    def _embed_queries(self, queries: List[str]) -> List[Embedding]:
+        """Embed queries with the query prompt, batched where the model allows."""
+        # HuggingFaceEmbedding encodes a list in one forward pass with the query prompt
+        embed = getattr(self._inner, "_embed", None)
+        if callable(embed):
+            return embed(queries, prompt_name="query")
+        return [self._inner.get_query_embedding(query) for query in queries]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        cached = self._cache.get_many(self.model_name, texts)
+        missing = [i for i, embedding in enumerate(cached) if embedding is None]
+        if missing:
+            # Embed each distinct missing text once
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            computed = dict(
+                zip(unique, self._inner.get_text_embedding_batch(unique))
+            )
+            self._cache.put_many(self.model_name, unique, [computed[t] for t in unique])
+            for i in missing:
+                cached[i] = computed[texts[i]]
+        return cached
@@ -0,0 +1,224 @@
+"""
+Multi-process embedding pool for PDF Chat Appliance.
+
+One PyTorch or onnxruntime process leaves most cores of a large ingest
+box idle, because intra-op parallelism stops scaling long before 32
+threads. The pool runs N worker processes instead, each pinned to its own
+slice of the cores with a matching thread budget, and each loading the
+embedding model once when it starts. Batches are split evenly across the
+workers and come back as NumPy arrays.
+
+With the "fork" start method the model is built in the parent before the
+workers start, so weights that are never written (PyTorch tensors) are
+shared copy-on-write rather than loaded N times. Forking is only safe
+from a process that has not started other threads yet, such as the bulk
+ingest script; the default "spawn" loads one copy per worker.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_WORKER_BATCH_SIZE = 32
+
+# Thread pools sized from the environment when a numeric library loads
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# The embedding model of a worker process
+_worker_model: Any = None
+
+
+def core_sets(workers: int) -> List[List[int]]:
+    """Split the cores this process may run on into one slice per worker.
+
+    Slices are contiguous so that a worker's threads share caches. With
+    more workers than cores, workers share cores round-robin.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    if workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    return [part.tolist() for part in np.array_split(cores, workers)]
+
+
+def _init_worker(
+    factory: Callable[[], Any],
+    model: Any,
+    counter: Any,
+    cores: List[List[int]],
+    threads: int,
+) -> None:
+    """Pin the worker to its cores, size its thread pools and load the model."""
+    global _worker_model
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores[index % len(cores)])
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    # The worker's thread budget already covers tokenization
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    _worker_model = model if model is not None else factory()
+    if hasattr(_worker_model, "threads"):
+        # OnnxEmbedding opens its session lazily, with this thread count
+        _worker_model.threads = threads
+
+
+def _embed_texts(texts: List[str]) -> np.ndarray:
+    return np.asarray(_worker_model.get_text_embedding_batch(texts), dtype=np.float32)
+
+
+def _embed_queries(queries: List[str]) -> np.ndarray:
+    return np.asarray(
+        [_worker_model.get_query_embedding(query) for query in queries],
+        dtype=np.float32,
+    )
+
+
+class EmbeddingPool:
+    """Embeds batches on a long-lived pool of pinned worker processes."""
+
+    def __init__(
+        self,
+        model_factory: Callable[[], Any],
+        workers: int = DEFAULT_WORKERS,
+        threads_per_worker: Optional[int] = None,
+        start_method: str = "spawn",
+    ):
+        """Create a pool; workers start on first use.
+
+        `model_factory` builds the embedding model in each worker and must
+        be picklable for "spawn", e.g. a `functools.partial` of a model
+        class. `threads_per_worker` defaults to the worker's core count.
+        """
+        if workers < 1:
+            raise ValueError("Need at least one worker")
+        self.model_factory = model_factory
+        self.workers = workers
+        self.core_sets = core_sets(workers)
+        self.threads_per_worker = threads_per_worker or len(self.core_sets[0])
+        self.start_method = start_method
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts` as a (len(texts), dim) float32 array, split evenly
+        across the workers."""
+        return self._run(_embed_texts, list(texts))
+
+    def embed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """Embed queries with the model's query prompt."""
+        return self._run(_embed_queries, list(queries))
+
+    def _run(self, function: Callable, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        pool = self._get_pool()
+        size = math.ceil(len(texts) / self.workers)
+        try:
+            futures = [
+                pool.submit(function, texts[i : i + size])
+                for i in range(0, len(texts), size)
+            ]
+            return np.concatenate([future.result() for future in futures])
+        except BrokenProcessPool:
+            # A crashed worker cannot be reused; start a fresh pool next time
+            logger.warning("Embedding pool broke; restarting it on the next batch")
+            self._reset_pool(pool)
+            raise
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                context = multiprocessing.get_context(self.start_method)
+                # Forked workers inherit a model built here, weights and all
+                model = self.model_factory() if self.start_method == "fork" else None
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(
+                        self.model_factory,
+                        model,
+                        context.Value("i", 0),
+                        self.core_sets,
+                        self.threads_per_worker,
+                    ),
+                )
+                logger.info(
+                    f"Started {self.workers} embedding workers with "
+                    f"{self.threads_per_worker} threads each"
+                )
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PooledEmbedding(BaseEmbedding):
+    """llama-index embedding model backed by an EmbeddingPool."""
+
+    _pool: EmbeddingPool = PrivateAttr()
+
+    def __init__(
+        self,
+        pool: EmbeddingPool,
+        worker_batch_size: int = DEFAULT_WORKER_BATCH_SIZE,
+        **kwargs: Any,
+    ) -> None:
+        """Wrap `pool`; llama-index hands it `worker_batch_size` texts per
+        worker at a time."""
+        kwargs.setdefault("embed_batch_size", worker_batch_size * pool.workers)
+        super().__init__(**kwargs)
+        self._pool = pool
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PooledEmbedding"
+
+    @property
+    def pool(self) -> EmbeddingPool:
+        """The underlying worker pool."""
+        return self._pool
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._pool.embed_queries([query])[0].tolist()
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._pool.embed(texts).tolist()
@@ -4,35 +4,101 @@ Enterprise-Scale Document Ingestion for PDF Chat Appliance
 Optimized for 10,000+ page PDF processing with parallel chunking and embedding
 """
 
+import functools
+import hashlib
+import importlib.util
 import logging
 import os
+import threading
 import time
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from queue import Queue
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 import psutil
-
-# Try PyMuPDF first (much faster), fallback to PyPDF
-try:
-    import fitz  # PyMuPDF
-
-    USE_PYMUPDF = True
-except ImportError:
-    import pypdf
-
-    USE_PYMUPDF = False
-
 from llama_index.core import Document
 from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
 from llama_index.embeddings.ollama import OllamaEmbedding
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
 
+from .chunking import (
+    DEFAULT_SEGMENT_CHARS,
+    DEFAULT_TOKENIZER,
+    ParallelChunker,
+    resolve_tokenizer,
+)
+from .embed_batcher import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_IN_FLIGHT,
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MIN_BATCH_SIZE,
+    AdaptiveBatcher,
+)
+from .embedding_cache import CachedEmbedding, EmbeddingCache
+from .embedding_pool import EmbeddingPool, PooledEmbedding
+from .extraction import (
+    DEFAULT_RANGE_TIMEOUT,
+    PageExtractor,
+    PageRecord,
+    assign_offsets,
+    page_count,
+)
+from .manifest import IngestionManifest, chunker_fingerprint
+from .onnx_embedding import load_onnx_embedding
+from .pipeline import DEFAULT_QUEUE_SIZE, run_pipeline
+from .structure import Section, section_label, section_labels
+from .utils import stable_file_id
+from .vector_store import open_local_vector_store
+
 logger = logging.getLogger(__name__)
 
+# Try PyMuPDF first (much faster), fallback to PyPDF; both are imported
+# where they are used (PyMuPDF in the extraction worker processes)
+USE_PYMUPDF = importlib.util.find_spec("fitz") is not None
+
+EMBED_MODEL_NAME = "nomic-embed-text-v1.5"
+ENTERPRISE_STORE = "enterprise_vectors"
+CHUNK_SIZE = 1024
+CHUNK_OVERLAP = 200
+
+# Stages of the streaming scheduler and their default thread pool sizes
+PIPELINE_STAGES = ("extract", "chunk", "embed", "store")
+DEFAULT_STAGE_WORKERS = {"extract": 2, "chunk": 2, "embed": 2, "store": 2}
+
+
+
+class PageChunk(NamedTuple):
+    """A chunk of one page, with its character span and section in the document"""
+
+    page: int
+    text: str
+    start: Optional[int] = None
+    end: Optional[int] = None
+    section: Tuple[str, ...] = ()
+
+
+def page_chunk_id(file_id: str, page: int, index: int) -> str:
+    """Deterministic point id of the index-th chunk of a page"""
+    return f"{file_id}_p{page}_{index}"
+
+
+def page_digest(record: PageRecord) -> str:
+    """Hash of a page's text and section paths, for delta re-ingestion.
+
+    Renaming a section changes the paths (and stored metadata) of pages
+    that do not contain its heading, so those pages count as changed too.
+    """
+    digest = hashlib.sha256(record.text.encode("utf-8"))
+    for section in record.sections or ():
+        if section.path:
+            digest.update(("\0" + section_label(section.path)).encode("utf-8"))
+    return digest.hexdigest()
+
 
 @dataclass
 class ProcessingProgress:
@@ -47,6 +113,45 @@ class ProcessingProgress:
     estimated_completion: Optional[float] = None
 
 
+@dataclass
+class _DocumentRun:
+    """State of one document while it streams through the stage pools"""
+
+    pdf_path: str
+    file_id: str
+    previous_pages: Dict[str, Dict[str, Any]]
+    start_time: float = field(default_factory=time.time)
+    page_hashes: Dict[str, str] = field(default_factory=dict)
+    replaced_pages: set = field(default_factory=set)
+    chunk_counts: Counter = field(default_factory=Counter)
+    total_chunks: int = 0
+    cleared: bool = False
+    error: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        # The chunk count is only known once the whole document has streamed
+        return {
+            "file_id": self.file_id,
+            "file_name": Path(self.pdf_path).name,
+            "total_chunks": None,
+        }
+
+    def add_chunks(self, pages) -> None:
+        """Count stored chunks per page"""
+        with self.lock:
+            for page in pages:
+                self.chunk_counts[page] += 1
+                self.total_chunks += 1
+
+    def fail(self, error: str) -> None:
+        """Mark the document failed, keeping the first error"""
+        with self.lock:
+            if self.error is None:
+                self.error = error
+
+
 class EnterpriseIngestionEngine:
     """Enterprise-scale document ingestion with parallel processing"""
 
@@ -61,9 +166,43 @@ class EnterpriseIngestionEngine:
         qdrant_port = int(os.environ.get("QDRANT_PORT", "6333"))
         self.qdrant_client = QdrantClient(host=qdrant_host, port=qdrant_port)
 
-        # Initialize embedding model
-        self.embed_model = OllamaEmbedding(
-            model_name="nomic-embed-text-v1.5", base_url="http://ollama:11434"
+        # Initialize embedding model. The batcher below sizes the batches,
+        # so the models must not split them again by their own batch size.
+        chunking = config.chunking
+        max_batch_size = chunking.get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)
+        embedding = config.embedding
+        if embedding.get("backend", "ollama") == "onnx":
+            # In-process int8 graph, named apart from the Ollama model
+            base_model = load_onnx_embedding(embedding, embed_batch_size=max_batch_size)
+            model_name = base_model.model_name
+            if embedding.get("pool_workers"):
+                # Worker processes pinned to their own cores, each with the graph
+                base_model = PooledEmbedding(
+                    EmbeddingPool(
+                        functools.partial(
+                            load_onnx_embedding,
+                            embedding,
+                            embed_batch_size=max_batch_size,
+                        ),
+                        workers=embedding["pool_workers"],
+                        threads_per_worker=embedding.get("pool_threads"),
+                    ),
+                    model_name=model_name,
+                    embed_batch_size=max_batch_size,
+                )
+        else:
+            # One HTTP request per text, so batches only bound the work in flight
+            base_model = OllamaEmbedding(
+                model_name=EMBED_MODEL_NAME,
+                base_url="http://ollama:11434",
+                embed_batch_size=max_batch_size,
+            )
+            model_name = EMBED_MODEL_NAME
+        # Identical chunks (boilerplate, repeated sections) are embedded once
+        self.embed_model = CachedEmbedding(
+            base_model,
+            EmbeddingCache(os.path.join(config.persist_dir, "embedding_cache.db")),
+            model_name=model_name,
         )
 
         # Initialize vector store
@@ -74,6 +213,60 @@ class EnterpriseIngestionEngine:
         # Create collection if it doesn't exist
         self._ensure_collection_exists()
 
+        # Local mirror of the stored vectors for exact/ANN search without Qdrant.
+        # It has its own directory: the query server's store is chunked
+        # differently and deletes rows under the same file ids.
+        self.local_store = open_local_vector_store(config, ENTERPRISE_STORE)
+
+        # Process pool for page extraction, sized independently of the file threads
+        file_processing = config.file_processing
+        self.page_extractor = PageExtractor(
+            workers=file_processing.get("extract_workers", max_workers),
+            range_timeout=file_processing.get(
+                "extract_range_timeout", DEFAULT_RANGE_TIMEOUT
+            ),
+            bboxes=file_processing.get("extract_bboxes", False),
+            headings=config.chunking.get("structural", False),
+        )
+        # Embedding batches sized from measured throughput, several in flight
+        self.embed_batcher = AdaptiveBatcher(
+            self.embed_model.get_text_embedding_batch,
+            batch_size=chunking.get("batch_size", DEFAULT_BATCH_SIZE),
+            min_batch_size=chunking.get("min_batch_size", DEFAULT_MIN_BATCH_SIZE),
+            max_batch_size=max_batch_size,
+            in_flight=chunking.get("embed_in_flight", DEFAULT_IN_FLIGHT),
+            adaptive=chunking.get("adaptive_batching", True),
+        )
+        # Thread pool sizes of the streaming scheduler's stages
+        self.stage_workers = {
+            **DEFAULT_STAGE_WORKERS,
+            **file_processing.get("stage_workers", {}),
+        }
+
+        # Chunker settings; changing any of them re-ingests every document
+        self.chunk_size = chunking.get("chunk_size", CHUNK_SIZE)
+        self.chunk_overlap = chunking.get("chunk_overlap", CHUNK_OVERLAP)
+        splitter = chunking.get("splitter", "native")
+        tokenizer = None
+        if splitter == "native":
+            # Keyed on the tokenizer that loaded, which may be a fallback
+            tokenizer = resolve_tokenizer(
+                chunking.get("tokenizer", DEFAULT_TOKENIZER),
+                strict=chunking.get("strict_tokenizer", False),
+            ).name
+        self.chunker = chunker_fingerprint(
+            splitter, chunking.get("structural", False), tokenizer
+        )
+
+        # Native chunker, created on first use and rebuilt if the budget changes
+        self._page_chunker: Optional[ParallelChunker] = None
+        self._chunker_lock = threading.Lock()
+
+        # Record of ingested files so unchanged PDFs are skipped on re-runs
+        self.manifest = IngestionManifest(
+            os.path.join(config.persist_dir, "enterprise_manifest.json")
+        )
+
     def _ensure_collection_exists(self):
         """Ensure Qdrant collection exists with optimized settings"""
         try:
@@ -84,6 +277,7 @@ class EnterpriseIngestionEngine:
                 from qdrant_client.models import (
                     Distance,
                     OptimizersConfigDiff,
+                    PayloadSchemaType,
                     VectorParams,
                 )
 
@@ -98,168 +292,169 @@ class EnterpriseIngestionEngine:
                         default_segment_number=2,
                     ),
                 )
+                # Section filters narrow the candidates before vector search
+                self.qdrant_client.create_payload_index(
+                    collection_name="enterprise_docs",
+                    field_name="sections",
+                    field_schema=PayloadSchemaType.KEYWORD,
+                )
                 logger.info(
                     "Created enterprise_docs collection with optimized settings"
                 )
         except Exception as e:
             logger.error(f"Error ensuring collection exists: {e}")
 
-    def extract_text_fast(self, pdf_path: str) -> str:
-        """Extract text from PDF using the fastest available method"""
+    def extract_pages(self, pdf_path: str) -> List[PageRecord]:
+        """Extract the non-empty pages of a PDF using the fastest available method"""
         try:
-            if USE_PYMUPDF:
-                return self._extract_with_pymupdf(pdf_path)
-            else:
-                return self._extract_with_pypdf(pdf_path)
+            return list(self.iter_pages(pdf_path))
         except Exception as e:
             logger.error(f"Error extracting text from {pdf_path}: {e}")
-            return ""
-
-    def _extract_with_pymupdf(self, pdf_path: str) -> str:
-        """Extract text using PyMuPDF (much faster for large PDFs)"""
-        text_parts = []
-
-        try:
-            doc = fitz.open(pdf_path)
-            total_pages = len(doc)
-
-            # Process pages in parallel
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = []
-
-                for page_num in range(total_pages):
-                    future = executor.submit(self._extract_page_text, doc, page_num)
-                    futures.append((page_num, future))
-
-                # Collect results in order
-                for page_num, future in futures:
-                    try:
-                        page_text = future.result(timeout=30)  # 30s timeout per page
-                        if page_text.strip():
-                            text_parts.append(
-                                f"--- Page {page_num + 1} ---\n{page_text}"
-                            )
-
-                        # Update progress
-                        self.progress_queue.put(
-                            {
-                                "type": "page_processed",
-                                "file": pdf_path,
-                                "page": page_num + 1,
-                                "total_pages": total_pages,
-                            }
-                        )
-
-                    except Exception as e:
-                        logger.warning(f"Error processing page {page_num + 1}: {e}")
-                        continue
-
-            doc.close()
-            return "\n\n".join(text_parts)
-
-        except Exception as e:
-            logger.error(f"PyMuPDF extraction failed for {pdf_path}: {e}")
-            # Fallback to PyPDF
-            return self._extract_with_pypdf(pdf_path)
-
-    def _extract_page_text(self, doc, page_num: int) -> str:
-        """Extract text from a single page"""
-        try:
-            page = doc.load_page(page_num)
-            text = page.get_text()
-            return text.strip()
-        except Exception as e:
-            logger.warning(f"Error extracting text from page {page_num}: {e}")
-            return ""
-
-    def _extract_with_pypdf(self, pdf_path: str) -> str:
-        """Fallback text extraction using PyPDF"""
-        text_parts = []
-
-        try:
-            with open(pdf_path, "rb") as file:
-                reader = pypdf.PdfReader(file)
-                total_pages = len(reader.pages)
-
-                for page_num in range(total_pages):
-                    try:
-                        page = reader.pages[page_num]
-                        text = page.extract_text()
-                        if text.strip():
-                            text_parts.append(f"--- Page {page_num + 1} ---\n{text}")
-
-                        # Update progress
-                        self.progress_queue.put(
-                            {
-                                "type": "page_processed",
-                                "file": pdf_path,
-                                "page": page_num + 1,
-                                "total_pages": total_pages,
-                            }
-                        )
-
-                    except Exception as e:
-                        logger.warning(f"Error processing page {page_num + 1}: {e}")
-                        continue
-
-                return "\n\n".join(text_parts)
-
-        except Exception as e:
-            logger.error(f"PyPDF extraction failed for {pdf_path}: {e}")
-            return ""
-
-    def create_chunks_parallel(
-        self, text: str, chunk_size: int = 1024, chunk_overlap: int = 200
-    ) -> List[str]:
-        """Create chunks in parallel for better performance"""
-        try:
-            # Use SentenceSplitter for better semantic chunking
-            splitter = SentenceSplitter(
-                chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        if USE_PYMUPDF:
+            try:
+                return list(self.iter_pages(pdf_path, use_pymupdf=False))
+            except Exception as e:
+                logger.error(f"PyPDF extraction failed for {pdf_path}: {e}")
+        return []
+
+    def iter_pages(
+        self, pdf_path: str, use_pymupdf: bool = USE_PYMUPDF
+    ) -> Iterator[PageRecord]:
+        """Yield the non-empty pages of a PDF as they are extracted"""
+        if use_pymupdf:
+            # Page ranges are extracted in worker processes, each with its own document
+            total_pages = page_count(pdf_path)
+            pages = self.page_extractor.iter_pages(pdf_path)
+        else:
+            import pypdf
+
+            reader = pypdf.PdfReader(pdf_path)
+            total_pages = len(reader.pages)
+            pages = assign_offsets(self._iter_pypdf_pages(reader))
+
+        for record in pages:
+            self.progress_queue.put(
+                {
+                    "type": "page_processed",
+                    "file": pdf_path,
+                    "page": record.page,
+                    "total_pages": total_pages,
+                }
             )
-
-            # Create document and split
-            doc = Document(text=text)
-            nodes = splitter.get_nodes_from_documents([doc])
-
-            # Extract text from nodes
-            chunks = [node.text for node in nodes if node.text.strip()]
-
-            logger.info(f"Created {len(chunks)} chunks from text")
-            return chunks
-
-        except Exception as e:
-            logger.error(f"Error creating chunks: {e}")
-            return []
-
-    def embed_chunks_parallel(
-        self, chunks: List[str], batch_size: int = 10
-    ) -> List[List[float]]:
-        """Embed chunks in parallel batches"""
-        embeddings = []
-
-        try:
-            # Process in batches for better performance
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i : i + batch_size]
-
-                # Embed batch
-                batch_embeddings = self.embed_model.get_text_embedding_batch(batch)
-                embeddings.extend(batch_embeddings)
-
-                # Update progress
-                self.progress_queue.put(
-                    {
-                        "type": "chunks_embedded",
-                        "processed": len(embeddings),
-                        "total": len(chunks),
-                    }
+            yield record
+
+    def _iter_pypdf_pages(self, reader) -> Iterator[PageRecord]:
+        """Fallback page extraction using PyPDF"""
+        for page_num, page in enumerate(reader.pages):
+            try:
+                text = (page.extract_text() or "").strip()
+            except Exception as e:
+                logger.warning(f"Error processing page {page_num + 1}: {e}")
+                continue
+            if text:
+                yield PageRecord(page_num + 1, text, 0, len(text))
+
+    def _get_page_chunker(self, chunk_size: int, chunk_overlap: int) -> ParallelChunker:
+        """The native chunker, whose worker pool is shared by every document"""
+        with self._chunker_lock:
+            chunker = self._page_chunker
+            budget = (chunk_size, chunk_overlap)
+            if chunker is not None and chunker.budget != budget:
+                chunker.close()
+                chunker = None
+            if chunker is None:
+                chunking = self.config.chunking
+                chunker = self._page_chunker = ParallelChunker(
+                    chunk_size,
+                    chunk_overlap,
+                    tokenizer_name=chunking.get("tokenizer", DEFAULT_TOKENIZER),
+                    workers=chunking.get("max_concurrent_chunks", self.max_workers),
+                    segment_chars=chunking.get("segment_chars", DEFAULT_SEGMENT_CHARS),
                 )
-
-                logger.info(
-                    f"Embedded batch {i//batch_size + 1}/{(len(chunks) + batch_size - 1)//batch_size}"
+            return chunker
+
+    def create_page_chunks(
+        self,
+        pages: List[PageRecord],
+        chunk_size: int = 1024,
+        chunk_overlap: int = 200,
+    ) -> List[PageChunk]:
+        """Chunk each page on its own, keeping each chunk's page and span.
+
+        Chunks never cross a page boundary, so an edit to one page cannot
+        shift the chunk boundaries (and invalidate the vectors) of others.
+        Pages with `sections` are chunked within each section, and chunks
+        carry the section path. The native chunker counts `chunk_size` in
+        embedding model tokens; `chunking.splitter: sentence` selects
+        llama-index's SentenceSplitter. Chunking errors are raised, so the
+        document fails rather than losing pages.
+        """
+        pieces = [
+            (page, section)
+            for page in pages
+            for section in page.sections or (Section(0, len(page.text), ()),)
+        ]
+        if self.config.chunking.get("splitter", "native") == "native":
+            # Large documents are tokenized on the chunker's process pool
+            chunker = self._get_page_chunker(chunk_size, chunk_overlap)
+            spans = chunker.spans_many(
+                [page.text[section.start : section.end] for page, section in pieces]
+            )
+            chunks = [
+                PageChunk(
+                    page.page,
+                    page.text[section.start + start : section.start + end],
+                    page.start + section.start + start,
+                    page.start + section.start + end,
+                    section.path,
                 )
+                for (page, section), piece_spans in zip(pieces, spans)
+                for start, end in piece_spans
+            ]
+            logger.info(f"Created {len(chunks)} chunks from {len(pages)} pages")
+            return chunks
 
+        splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        docs = [
+            Document(
+                text=page.text[section.start : section.end],
+                metadata={"piece": i},
+            )
+            for i, (page, section) in enumerate(pieces)
+        ]
+        nodes = splitter.get_nodes_from_documents(docs)
+        chunks = []
+        for node in nodes:
+            if not node.text.strip():
+                continue
+            page, section = pieces[node.metadata["piece"]]
+            # The splitter reports offsets within the section's text
+            start = end = None
+            if node.start_char_idx is not None and node.end_char_idx is not None:
+                start = page.start + section.start + node.start_char_idx
+                end = page.start + section.start + node.end_char_idx
+            chunks.append(PageChunk(page.page, node.text, start, end, section.path))
+
+        logger.info(f"Created {len(chunks)} chunks from {len(pages)} pages")
+        return chunks
+
+    def embed_chunks_parallel(self, chunks: List[str]) -> List[List[float]]:
+        """Embed chunks in length-sorted, adaptively sized batches.
+
+        Several batches are in flight at once, and the batch size follows
+        the measured throughput, latency and memory (see AdaptiveBatcher).
+        """
+        try:
+            embeddings = self.embed_batcher.embed(
+                chunks,
+                on_batch=lambda done: self.progress_queue.put(
+                    {"type": "chunks_embedded", "processed": done, "total": len(chunks)}
+                ),
+            )
+            logger.info(
+                f"Embedded {len(chunks)} chunks "
+                f"(batch size now {self.embed_batcher.batch_size})"
+            )
             return embeddings
 
         except Exception as e:
@@ -267,29 +462,81 @@ class EnterpriseIngestionEngine:
             return []
 
     def store_vectors_batch(
-        self, chunks: List[str], embeddings: List[List[float]], metadata: Dict
+        self,
+        chunks: List[str],
+        embeddings: List[List[float]],
+        metadata: Dict,
+        chunk_pages: Optional[List[int]] = None,
+        chunk_indices: Optional[List[int]] = None,
+        chunk_spans: Optional[List[Tuple[Optional[int], Optional[int]]]] = None,
+        chunk_sections: Optional[List[Tuple[str, ...]]] = None,
     ) -> bool:
-        """Store vectors in Qdrant with batch operations"""
+        """Store vectors in Qdrant with batch operations
+
+        With `chunk_pages`, point ids and chunk indices are per page so a
+        page's points can be replaced without touching the rest. Callers
+        storing a page across several batches pass its `chunk_indices`.
+        `chunk_spans` are document character offsets stored for citations.
+        `chunk_sections` are section paths, stored as a `section` label and
+        as `sections`, the labels of the section and its ancestors, so a
+        filter on one label matches the whole subtree.
+        """
         try:
             # Prepare points for batch insertion
             points = []
+            page_counts: Dict[int, int] = {}
             for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                point = {
-                    "id": f"{metadata['file_id']}_{i}",
-                    "vector": embedding,
-                    "payload": {
-                        "text": chunk,
-                        "file_name": metadata.get("file_name", ""),
-                        "chunk_index": i,
-                        "total_chunks": len(chunks),
-                        "created_at": time.time(),
-                    },
+                payload = {
+                    "text": chunk,
+                    "file_id": metadata["file_id"],
+                    "file_name": metadata.get("file_name", ""),
+                    "chunk_index": i,
+                    "total_chunks": metadata.get("total_chunks", len(chunks)),
+                    "created_at": time.time(),
                 }
-                points.append(point)
+                point_id = f"{metadata['file_id']}_{i}"
+                if chunk_pages is not None:
+                    page = chunk_pages[i]
+                    if chunk_indices is not None:
+                        index = chunk_indices[i]
+                    else:
+                        index = page_counts.get(page, 0)
+                        page_counts[page] = index + 1
+                    point_id = page_chunk_id(metadata["file_id"], page, index)
+                    payload["page"] = page
+                    payload["page_start"] = payload["page_end"] = page
+                    payload["chunk_index"] = index
+                if chunk_spans is not None:
+                    payload["char_start"], payload["char_end"] = chunk_spans[i]
+                if chunk_sections is not None and chunk_sections[i]:
+                    payload["section"] = section_label(chunk_sections[i])
+                    payload["sections"] = section_labels(chunk_sections[i])
+
+                points.append({"id": point_id, "vector": embedding, "payload": payload})
 
             # Batch upsert to Qdrant
             self.qdrant_client.upsert(collection_name="enterprise_docs", points=points)
 
+            # Mirror into the local store so its ANN index grows incrementally
+            self.local_store.add(
+                [
+                    TextNode(
+                        id_=point["id"],
+                        text=point["payload"]["text"],
+                        embedding=point["vector"],
+                        metadata={
+                            k: v for k, v in point["payload"].items() if k != "text"
+                        },
+                        relationships={
+                            NodeRelationship.SOURCE: RelatedNodeInfo(
+                                node_id=metadata["file_id"]
+                            )
+                        },
+                    )
+                    for point in points
+                ]
+            )
+
             logger.info(f"Stored {len(points)} vectors in Qdrant")
             return True
 
@@ -297,32 +544,103 @@ class EnterpriseIngestionEngine:
             logger.error(f"Error storing vectors: {e}")
             return False
 
-    def process_document_enterprise(self, pdf_path: str) -> Dict:
+    def delete_document_vectors(self, file_id: str) -> None:
+        """Delete all stored vectors of a document from Qdrant and the local store"""
+        from qdrant_client.models import (
+            FieldCondition,
+            Filter,
+            FilterSelector,
+            MatchValue,
+        )
+
+        self.qdrant_client.delete(
+            collection_name="enterprise_docs",
+            points_selector=FilterSelector(
+                filter=Filter(
+                    must=[FieldCondition(key="file_id", match=MatchValue(value=file_id))]
+                )
+            ),
+        )
+        self.local_store.delete(file_id)
+
+    def delete_page_vectors(self, file_id: str, pages: Dict[str, Dict[str, Any]]) -> None:
+        """Delete the stored points of the given pages of a document"""
+        from qdrant_client.models import PointIdsList
+
+        point_ids = [
+            page_chunk_id(file_id, int(page), index)
+            for page, entry in pages.items()
+            for index in range(entry.get("chunks", 0))
+        ]
+        if not point_ids:
+            return
+        self.qdrant_client.delete(
+            collection_name="enterprise_docs",
+            points_selector=PointIdsList(points=point_ids),
+        )
+        self.local_store.delete_nodes(point_ids)
+
+    def process_document_enterprise(
+        self,
+        pdf_path: str,
+        file_id: Optional[str] = None,
+        previous_pages: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> Dict:
         """Process a single document with enterprise-scale optimizations"""
         start_time = time.time()
-        file_id = f"{Path(pdf_path).stem}_{int(start_time)}"
+        # Stable per-file id so re-ingesting replaces vectors instead of duplicating
+        file_id = file_id or stable_file_id(pdf_path)
 
         try:
             logger.info(f"Starting enterprise processing of {pdf_path}")
 
-            # Extract text (fastest method)
+            if self.config.chunking.get("enable_streaming"):
+                return self.ingest_documents_streaming(
+                    [(pdf_path, file_id, previous_pages or {})]
+                )[0]
+
+            # Extract page records (fastest method)
             logger.info("Extracting text from PDF...")
-            text = self.extract_text_fast(pdf_path)
+            pages = self.extract_pages(pdf_path)
 
-            if not text.strip():
+            if not pages:
                 return {
                     "success": False,
                     "error": "No text extracted from PDF",
                     "file": pdf_path,
                 }
 
+            # Hash pages so unchanged ones keep their stored vectors
+            page_hashes = {str(page.page): page_digest(page) for page in pages}
+            previous_pages = previous_pages or {}
+            changed_pages = [
+                page
+                for page in pages
+                if previous_pages.get(str(page.page), {}).get("sha256")
+                != page_hashes[str(page.page)]
+            ]
+            stale_pages = {
+                page: entry
+                for page, entry in previous_pages.items()
+                if page_hashes.get(page) != entry.get("sha256")
+            }
+            reused_pages = len(pages) - len(changed_pages)
+            if previous_pages:
+                logger.info(
+                    f"Reusing vectors of {reused_pages}/{len(pages)} unchanged pages"
+                )
+
             # Create chunks
             logger.info("Creating semantic chunks...")
-            chunks = self.create_chunks_parallel(
-                text, chunk_size=1024, chunk_overlap=200
+            page_chunks = self.create_page_chunks(
+                changed_pages,
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
             )
+            chunks = [chunk.text for chunk in page_chunks]
+            chunk_pages = [chunk.page for chunk in page_chunks]
 
-            if not chunks:
+            if not chunks and not reused_pages:
                 return {
                     "success": False,
                     "error": "No chunks created from text",
@@ -331,7 +649,7 @@ class EnterpriseIngestionEngine:
 
             # Embed chunks
             logger.info("Embedding chunks...")
-            embeddings = self.embed_chunks_parallel(chunks)
+            embeddings = self.embed_chunks_parallel(chunks) if chunks else []
 
             if len(embeddings) != len(chunks):
                 return {
@@ -346,11 +664,27 @@ class EnterpriseIngestionEngine:
                 "file_id": file_id,
                 "file_name": Path(pdf_path).name,
                 "file_size": os.path.getsize(pdf_path),
-                "total_pages": text.count("--- Page"),
+                "total_pages": len(pages),
                 "total_chunks": len(chunks),
             }
 
-            storage_success = self.store_vectors_batch(chunks, embeddings, metadata)
+            # Replace whatever an earlier version of the changed pages stored
+            if previous_pages:
+                self.delete_page_vectors(file_id, stale_pages)
+            else:
+                self.delete_document_vectors(file_id)
+            storage_success = (
+                self.store_vectors_batch(
+                    chunks,
+                    embeddings,
+                    metadata,
+                    chunk_pages,
+                    chunk_spans=[(chunk.start, chunk.end) for chunk in page_chunks],
+                    chunk_sections=[chunk.section for chunk in page_chunks],
+                )
+                if chunks
+                else True
+            )
 
             if not storage_success:
                 return {
@@ -359,6 +693,20 @@ class EnterpriseIngestionEngine:
                     "file": pdf_path,
                 }
 
+            # Record per-page hashes and chunk counts for the next delta run
+            chunk_counts = Counter(chunk_pages)
+            page_entries = {
+                page: {
+                    "sha256": sha256,
+                    "chunks": (
+                        chunk_counts[int(page)]
+                        if page in stale_pages or page not in previous_pages
+                        else previous_pages[page].get("chunks", 0)
+                    ),
+                }
+                for page, sha256 in page_hashes.items()
+            }
+
             processing_time = time.time() - start_time
 
             result = {
@@ -367,6 +715,8 @@ class EnterpriseIngestionEngine:
                 "processing_time": processing_time,
                 "total_pages": metadata["total_pages"],
                 "total_chunks": len(chunks),
+                "reused_pages": reused_pages,
+                "pages": page_entries,
                 "chunks_per_second": (
                     len(chunks) / processing_time if processing_time > 0 else 0
                 ),
@@ -380,6 +730,208 @@ class EnterpriseIngestionEngine:
             logger.error(f"Error processing {pdf_path}: {e}")
             return {"success": False, "error": str(e), "file": pdf_path}
 
+    def ingest_documents_streaming(
+        self, documents: List[Tuple[str, str, Dict[str, Dict[str, Any]]]]
+    ) -> List[Dict]:
+        """Stream several documents through staged extract/chunk/embed/store pools.
+
+        Each (pdf_path, file_id, previous_pages) document flows through
+        four stages, each with its own thread pool sized by
+        `file_processing.stage_workers` and a bounded queue in front of
+        it. Stages overlap across documents, so one file is extracted while
+        another is embedded or upserted, and peak memory depends on the
+        queue and batch sizes rather than on document sizes. Returns one
+        result per document, in input order.
+        """
+        runs = [
+            _DocumentRun(pdf_path, file_id, previous_pages or {})
+            for pdf_path, file_id, previous_pages in documents
+        ]
+        queue_size = self.config.chunking.get("stream_queue_size", DEFAULT_QUEUE_SIZE)
+
+        def extract_pages(docs):
+            for run in docs:
+                try:
+                    for page in self.iter_pages(run.pdf_path):
+                        yield run, page
+                except Exception as e:
+                    logger.error(f"Error extracting text from {run.pdf_path}: {e}")
+                    run.fail(str(e))
+
+        def chunk_pages(pages):
+            for run, page in pages:
+                if run.error is not None:
+                    # The document will be retried whole; skip its other pages
+                    continue
+                try:
+                    if not self._replace_page(run, page):
+                        continue
+                    page_chunks = self.create_page_chunks(
+                        [page],
+                        chunk_size=self.chunk_size,
+                        chunk_overlap=self.chunk_overlap,
+                    )
+                except Exception as e:
+                    logger.error(f"Error chunking {run.pdf_path}: {e}")
+                    run.fail(str(e))
+                    continue
+                for index, chunk in enumerate(page_chunks):
+                    yield run, index, chunk
+
+        def embed_batches(chunks):
+            batch = []
+            for chunk in chunks:
+                batch.append(chunk)
+                # The batcher's size adapts to the throughput of earlier batches
+                if len(batch) >= self.embed_batcher.batch_size:
+                    yield from self._embed_stream_batch(batch)
+                    batch = []
+            if batch:
+                yield from self._embed_stream_batch(batch)
+
+        def store_batches(batches):
+            for batch, embeddings in batches:
+                # A batch may span documents; each document is upserted on its own
+                by_run: Dict[int, List[int]] = {}
+                for i, (run, _, _) in enumerate(batch):
+                    by_run.setdefault(id(run), []).append(i)
+                for rows in by_run.values():
+                    run = batch[rows[0]][0]
+                    if run.error is not None:
+                        continue
+                    chunks = [batch[i][2] for i in rows]
+                    stored = self.store_vectors_batch(
+                        [chunk.text for chunk in chunks],
+                        [embeddings[i] for i in rows],
+                        run.metadata,
+                        chunk_pages=[chunk.page for chunk in chunks],
+                        chunk_indices=[batch[i][1] for i in rows],
+                        chunk_spans=[(chunk.start, chunk.end) for chunk in chunks],
+                        chunk_sections=[chunk.section for chunk in chunks],
+                    )
+                    if stored:
+                        run.add_chunks(chunk.page for chunk in chunks)
+                    else:
+                        run.fail("Failed to store vectors")
+                yield len(batch)
+
+        stage_workers = self.stage_workers
+        logger.info(
+            f"Streaming {len(runs)} documents through staged pools {stage_workers}"
+        )
+        for _ in run_pipeline(
+            runs,
+            [extract_pages, chunk_pages, embed_batches, store_batches],
+            queue_size=queue_size,
+            workers=[stage_workers[stage] for stage in PIPELINE_STAGES],
+        ):
+            pass
+
+        results = []
+        for run in runs:
+            try:
+                results.append(self._finish_streamed_document(run))
+            except Exception as e:
+                logger.error(f"Error finishing {run.pdf_path}: {e}")
+                results.append({"success": False, "error": str(e), "file": run.pdf_path})
+        return results
+
+    def _replace_page(self, run: "_DocumentRun", record: PageRecord) -> bool:
+        """Record a streamed page's hash; True if it must be (re-)embedded.
+
+        Old vectors are deleted here, before any chunk of the page reaches
+        the store stage, so a delete can never race the page's upserts.
+        """
+        page = record.page
+        sha256 = page_digest(record)
+        previous = run.previous_pages.get(str(page))
+        with run.lock:
+            run.page_hashes[str(page)] = sha256
+            if previous is not None and previous.get("sha256") == sha256:
+                return False
+            if not run.previous_pages and not run.cleared:
+                # Leftovers of an earlier ingest under the same id go first
+                self.delete_document_vectors(run.file_id)
+                run.cleared = True
+            run.replaced_pages.add(page)
+        if previous is not None:
+            self.delete_page_vectors(run.file_id, {str(page): previous})
+        return True
+
+    def _embed_stream_batch(self, batch: List[Tuple]) -> Iterator[Tuple[List, List]]:
+        """Embed one streamed batch, failing its documents if the model does"""
+        try:
+            embeddings = self.embed_batcher.embed([chunk.text for _, _, chunk in batch])
+        except Exception as e:
+            logger.error(f"Error embedding chunks: {e}")
+            for run, _, _ in batch:
+                run.fail(str(e))
+            return
+        self.progress_queue.put({"type": "chunks_embedded", "processed": len(batch)})
+        yield batch, embeddings
+
+    def _finish_streamed_document(self, run: "_DocumentRun") -> Dict:
+        """Delete vectors of vanished pages and build a document's result"""
+        pdf_path = run.pdf_path
+        if run.error is not None:
+            return {"success": False, "error": run.error, "file": pdf_path}
+        if not run.page_hashes:
+            return {
+                "success": False,
+                "error": "No text extracted from PDF",
+                "file": pdf_path,
+            }
+        reused_pages = len(run.page_hashes) - len(run.replaced_pages)
+        if not run.total_chunks and not reused_pages:
+            return {
+                "success": False,
+                "error": "No chunks created from text",
+                "file": pdf_path,
+            }
+        if run.previous_pages:
+            logger.info(
+                f"Reused vectors of {reused_pages}/{len(run.page_hashes)} unchanged pages"
+            )
+
+        # Pages that are gone from the new version of the document
+        self.delete_page_vectors(
+            run.file_id,
+            {
+                page: entry
+                for page, entry in run.previous_pages.items()
+                if page not in run.page_hashes
+            },
+        )
+
+        page_entries = {
+            page: {
+                "sha256": sha256,
+                "chunks": (
+                    run.chunk_counts[int(page)]
+                    if int(page) in run.replaced_pages
+                    else run.previous_pages[page].get("chunks", 0)
+                ),
+            }
+            for page, sha256 in run.page_hashes.items()
+        }
+
+        processing_time = time.time() - run.start_time
+        file_size = os.path.getsize(pdf_path)
+        logger.info(f"Successfully streamed {pdf_path} in {processing_time:.2f}s")
+        return {
+            "success": True,
+            "file": pdf_path,
+            "processing_time": processing_time,
+            "total_pages": len(run.page_hashes),
+            "total_chunks": run.total_chunks,
+            "reused_pages": reused_pages,
+            "pages": page_entries,
+            "chunks_per_second": (
+                run.total_chunks / processing_time if processing_time > 0 else 0
+            ),
+            "file_size_mb": file_size / (1024 * 1024),
+        }
+
     def ingest_pdfs_enterprise(self, docs_dir: str = None) -> Dict:
         """Ingest all PDFs with enterprise-scale processing"""
         if docs_dir is None:
@@ -392,6 +944,12 @@ class EnterpriseIngestionEngine:
             # Find all PDF files
             pdf_files = list(Path(docs_dir).glob("*.pdf"))
 
+            # Drop vectors of files that were removed from the documents directory
+            for record in self.manifest.removed_files([str(p) for p in pdf_files]):
+                self.delete_document_vectors(record.file_id)
+                self.manifest.remove(record.path)
+                logger.info(f"Removed vectors of deleted file {record.path}")
+
             if not pdf_files:
                 logger.warning(f"No PDF files found in {docs_dir}")
                 return {
@@ -402,35 +960,63 @@ class EnterpriseIngestionEngine:
 
             logger.info(f"Found {len(pdf_files)} PDF files to process")
 
-            # Process files in parallel
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = {
-                    executor.submit(
-                        self.process_document_enterprise, str(pdf_file)
-                    ): pdf_file
-                    for pdf_file in pdf_files
-                }
+            # Only new or changed files need extracting, chunking and embedding
+            pending = {}
+            for pdf_file in pdf_files:
+                record = self.manifest.check(
+                    str(pdf_file),
+                    self.chunk_size,
+                    self.chunk_overlap,
+                    self.embed_model.model_name,
+                    self.chunker,
+                )
+                if record is not None:
+                    pending[pdf_file] = record
+            skipped_files = len(pdf_files) - len(pending)
+            if skipped_files:
+                logger.info(f"Skipping {skipped_files} unchanged PDF files")
+
+            if self.config.chunking.get("enable_streaming"):
+                # Stage pools overlap extraction, embedding and upserts across files
+                documents = [
+                    (str(pdf_file), record.file_id, self.manifest.reusable_pages(record))
+                    for pdf_file, record in pending.items()
+                ]
+                for pdf_file, result in zip(
+                    pending, self.ingest_documents_streaming(documents)
+                ):
+                    results.append(result)
+                    self._record_result(pdf_file, pending[pdf_file], result)
+            else:
+                # Process files in parallel
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    futures = {
+                        executor.submit(
+                            self.process_document_enterprise,
+                            str(pdf_file),
+                            record.file_id,
+                            self.manifest.reusable_pages(record),
+                        ): pdf_file
+                        for pdf_file, record in pending.items()
+                    }
 
-                for future in as_completed(futures):
-                    pdf_file = futures[future]
-                    try:
-                        result = future.result(
-                            timeout=600
-                        )  # 10 minute timeout per file
-                        results.append(result)
-
-                        if result["success"]:
-                            logger.info(f"✅ Processed {pdf_file.name}")
-                        else:
-                            logger.error(
-                                f"❌ Failed to process {pdf_file.name}: {result.get('error')}"
+                    for future in as_completed(futures):
+                        pdf_file = futures[future]
+                        try:
+                            result = future.result(
+                                timeout=600
+                            )  # 10 minute timeout per file
+                            results.append(result)
+                            self._record_result(pdf_file, pending[pdf_file], result)
+
+                        except Exception as e:
+                            logger.error(f"❌ Error processing {pdf_file.name}: {e}")
+                            results.append(
+                                {"success": False, "error": str(e), "file": str(pdf_file)}
                             )
 
-                    except Exception as e:
-                        logger.error(f"❌ Error processing {pdf_file.name}: {e}")
-                        results.append(
-                            {"success": False, "error": str(e), "file": str(pdf_file)}
-                        )
+            # Build or extend the ANN index over the newly stored vectors
+            self.local_store.update_ann_index()
 
             total_time = time.time() - start_time
             successful = [r for r in results if r["success"]]
@@ -441,6 +1027,7 @@ class EnterpriseIngestionEngine:
                 "total_files": len(pdf_files),
                 "successful_files": len(successful),
                 "failed_files": len(failed),
+                "skipped_files": skipped_files,
                 "total_processing_time": total_time,
                 "average_time_per_file": (
                     total_time / len(pdf_files) if pdf_files else 0
@@ -460,6 +1047,15 @@ class EnterpriseIngestionEngine:
             logger.error(f"Error in enterprise ingestion: {e}")
             return {"success": False, "error": str(e), "total_files": 0}
 
+    def _record_result(self, pdf_file: Path, record, result: Dict) -> None:
+        """Record a successfully processed file in the manifest"""
+        if result["success"]:
+            record.pages = result.get("pages", {})
+            self.manifest.record(record)
+            logger.info(f"✅ Processed {pdf_file.name}")
+        else:
+            logger.error(f"❌ Failed to process {pdf_file.name}: {result.get('error')}")
+
     def get_processing_stats(self) -> Dict:
         """Get current processing statistics"""
         return {
@@ -467,4 +1063,5 @@ class EnterpriseIngestionEngine:
             "memory_usage_mb": psutil.Process().memory_info().rss / (1024 * 1024),
             "cpu_percent": psutil.cpu_percent(),
             "processing_stats": self.processing_stats,
+            "embedding_batches": self.embed_batcher.stats(),
         }
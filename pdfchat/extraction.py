@@ -0,0 +1,311 @@
+"""
+Process-pool PDF text extraction for PDF Chat Appliance.
+
+A fitz document must not be shared between threads, and page extraction
+is CPU-bound Python/C code that holds the GIL for much of its run. Large
+PDFs are therefore split into contiguous page ranges, and each range is
+extracted by a worker process that opens the file itself and returns
+only compact PageRecord tuples.
+"""
+
+import itertools
+import logging
+import math
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+from .structure import (
+    Heading,
+    Section,
+    assign_sections,
+    font_headings,
+    outline_headings,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RANGE_TIMEOUT = 120.0
+# Ranges smaller than this cost more in IPC than they save
+MIN_RANGE_PAGES = 16
+# Several ranges per worker so a slow range does not leave cores idle
+RANGES_PER_WORKER = 4
+
+# Page texts are separated by this in the document's character offsets
+PAGE_SEPARATOR = "\n\n"
+
+BBox = Tuple[float, float, float, float]
+
+
+class ExtractionError(RuntimeError):
+    """A page range of a PDF could not be extracted.
+
+    Raised instead of returning a partial document, so the caller does
+    not record the file as ingested and retries it on the next run.
+    """
+
+
+class PageRecord(NamedTuple):
+    """Extracted text of one page.
+
+    `start` and `end` are character offsets of the text in the whole
+    document (pages joined by PAGE_SEPARATOR); `bboxes` are the page's
+    text block rectangles, when requested. `headings` are the headings
+    found on the page and `sections` the page's stretches of text with
+    their section paths, when structure is requested.
+    """
+
+    page: int
+    text: str
+    start: int = 0
+    end: int = 0
+    bboxes: Optional[Tuple[BBox, ...]] = None
+    headings: Optional[Tuple[Heading, ...]] = None
+    sections: Optional[Tuple[Section, ...]] = None
+
+
+class PageRange(NamedTuple):
+    """Extracted pages of a page range and the 1-based pages that failed."""
+
+    records: List[PageRecord]
+    failed: Tuple[int, ...] = ()
+
+
+def assign_offsets(records: Iterable[PageRecord]) -> Iterator[PageRecord]:
+    """Set document character offsets on records arriving in page order."""
+    offset = 0
+    for record in records:
+        end = offset + len(record.text)
+        yield record._replace(start=offset, end=end)
+        offset = end + len(PAGE_SEPARATOR)
+
+
+def page_count(pdf_path: str) -> int:
+    """Number of pages in a PDF."""
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+
+def page_ranges(total_pages: int, workers: int) -> List[Tuple[int, int]]:
+    """Split pages into contiguous [start, end) ranges for `workers` processes."""
+    if total_pages <= 0:
+        return []
+    size = max(MIN_RANGE_PAGES, math.ceil(total_pages / (workers * RANGES_PER_WORKER)))
+    return [(start, min(start + size, total_pages)) for start in range(0, total_pages, size)]
+
+
+def extract_page_range(
+    pdf_path: str,
+    start: int,
+    end: int,
+    bboxes: bool = False,
+    headings: bool = False,
+) -> PageRange:
+    """Extract the non-empty pages in [start, end) with 1-based page numbers.
+
+    Runs in a worker process, so it opens its own handle to the document.
+    Offsets are left at zero for the caller to assign in page order, and
+    sections for the caller to assign from the headings. Pages that raise
+    are logged and reported in `failed` rather than failing the range.
+    """
+    pages = []
+    failed = []
+    with fitz.open(pdf_path) as doc:
+        outline: Optional[Dict[int, List[list]]] = None
+        if headings:
+            # The outline is authoritative; fonts are the fallback without one
+            outline = {}
+            for entry in doc.get_toc():
+                outline.setdefault(entry[2], []).append(entry)
+        for page_num in range(start, end):
+            try:
+                page = doc.load_page(page_num)
+                text = page.get_text().strip()
+                blocks = (
+                    tuple(
+                        tuple(round(v, 2) for v in block[:4])
+                        for block in page.get_text("blocks")
+                        if block[6] == 0 and block[4].strip()
+                    )
+                    if bboxes and text
+                    else None
+                )
+                found = None
+                if outline and text:
+                    found = outline_headings(outline.get(page_num + 1, ()), text)
+                elif outline is not None and text:
+                    found = font_headings(page.get_text("dict"), text)
+            except Exception as e:
+                logger.warning(f"Error extracting text from page {page_num + 1}: {e}")
+                failed.append(page_num + 1)
+                continue
+            if text:
+                pages.append(PageRecord(page_num + 1, text, 0, len(text), blocks, found))
+    return PageRange(pages, tuple(failed))
+
+
+class PageExtractor:
+    """Extracts PDF pages in parallel on a long-lived process pool."""
+
+    def __init__(
+        self,
+        workers: int = 4,
+        range_timeout: float = DEFAULT_RANGE_TIMEOUT,
+        bboxes: bool = False,
+        headings: bool = False,
+    ):
+        """Create an extractor; the pool is started on first use."""
+        self.workers = workers
+        self.range_timeout = range_timeout
+        self.bboxes = bboxes
+        self.headings = headings
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def extract(self, pdf_path: str) -> List[PageRecord]:
+        """Extract the non-empty pages of a PDF, in page order."""
+        return list(self.iter_pages(pdf_path))
+
+    def iter_pages(self, pdf_path: str) -> Iterator[PageRecord]:
+        """Yield the non-empty pages of a PDF in page order, with offsets."""
+        records = self._iter_ranges(pdf_path)
+        try:
+            if self.headings:
+                yield from assign_sections(assign_offsets(records))
+            else:
+                yield from assign_offsets(records)
+        finally:
+            # Cancels in-flight ranges when the consumer stops early
+            records.close()
+
+    def _iter_ranges(self, pdf_path: str) -> Iterator[PageRecord]:
+        """Yield the non-empty pages of a PDF in page order as ranges complete.
+
+        At most two ranges per worker are in flight, so memory is bounded
+        by the range size rather than the document size. A range that
+        fails or exceeds `range_timeout` raises ExtractionError once the
+        pages before it are yielded; ranges lost to a crashed worker and
+        single pages that failed are retried in-process.
+        """
+        total_pages = page_count(pdf_path)
+        ranges = page_ranges(total_pages, self.workers)
+        if self.workers <= 1 or len(ranges) <= 1:
+            for start, end in ranges:
+                yield from self._retry_failed(
+                    pdf_path,
+                    extract_page_range(pdf_path, start, end, self.bboxes, self.headings),
+                )
+            return
+
+        pool = self._get_pool()
+
+        def submit(page_range: Tuple[int, int]) -> Optional[Future]:
+            try:
+                return pool.submit(
+                    extract_page_range,
+                    pdf_path,
+                    *page_range,
+                    self.bboxes,
+                    self.headings,
+                )
+            except BrokenProcessPool:
+                return None
+
+        remaining = iter(ranges)
+        in_flight: Deque[Tuple[int, int, Optional[Future]]] = deque(
+            (*page_range, submit(page_range))
+            for page_range in itertools.islice(remaining, 2 * self.workers)
+        )
+        stuck = False
+        try:
+            while in_flight:
+                start, end, future = in_flight.popleft()
+                try:
+                    if future is None:
+                        raise BrokenProcessPool("pool unavailable")
+                    pages = future.result(timeout=self.range_timeout)
+                except FutureTimeoutError as e:
+                    stuck = True
+                    raise ExtractionError(
+                        f"Pages {start + 1}-{end} of {pdf_path} timed out "
+                        f"after {self.range_timeout}s"
+                    ) from e
+                except BrokenProcessPool:
+                    # Usually a crash in another range; retry this one in-process
+                    logger.warning(
+                        f"Extraction pool broke; extracting pages {start + 1}-{end} "
+                        f"of {pdf_path} in-process"
+                    )
+                    pages = extract_page_range(
+                        pdf_path, start, end, self.bboxes, self.headings
+                    )
+                    stuck = True
+                except Exception as e:
+                    raise ExtractionError(
+                        f"Error extracting pages {start + 1}-{end} of {pdf_path}: {e}"
+                    ) from e
+
+                next_range = next(remaining, None)
+                if next_range is not None:
+                    in_flight.append((*next_range, submit(next_range)))
+                yield from self._retry_failed(pdf_path, pages)
+        finally:
+            for _, _, future in in_flight:
+                if future is not None:
+                    future.cancel()
+            if stuck:
+                # A hung or crashed worker cannot be reused; start a fresh pool next time
+                self._reset_pool(pool)
+
+    def _retry_failed(self, pdf_path: str, result: PageRange) -> List[PageRecord]:
+        """The range's pages with its failed pages extracted again in-process.
+
+        Raises ExtractionError if a page fails twice, so a document with
+        missing pages is never recorded as ingested.
+        """
+        if not result.failed:
+            return result.records
+        records = list(result.records)
+        for page in result.failed:
+            retry = extract_page_range(
+                pdf_path, page - 1, page, self.bboxes, self.headings
+            )
+            if retry.failed:
+                raise ExtractionError(f"Could not extract page {page} of {pdf_path}")
+            records.extend(retry.records)
+        return sorted(records, key=lambda record: record.page)
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned workers do not inherit the parent's threads and locks
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        # ProcessPoolExecutor cannot cancel a running task, so stop its workers
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -6,23 +6,49 @@ using semantic search and LLM-based responses with comprehensive
 OpenAPI documentation generation.
 """
 
+import asyncio
+import json
 import logging
 import os
-import signal
 import sys
 import time
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 
 # Mandatory .venv activation check
 if "venv" not in sys.executable:
     raise RuntimeError("VENV NOT ACTIVATED. Please activate `.venv` before running this script.")
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from llama_index.core.schema import QueryBundle
 from pydantic import BaseModel, Field
 
+from .admission import (
+    DEFAULT_MAX_CONCURRENT,
+    DEFAULT_MAX_QUEUE,
+    DEFAULT_MAX_WAIT,
+    AdmissionController,
+    AdmissionRejected,
+)
+from .answer_cache import DEFAULT_MAX_ENTRIES, DEFAULT_SIMILARITY, SemanticAnswerCache
 from .config import Config
 from .ingestion import PDFIngestion
+from .query_batcher import (
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_WAIT_MS,
+    QueryEmbeddingBatcher,
+)
+from .query_engine import QueryEngineRegistry
+from .warmup import (
+    DEFAULT_KEEP_ALIVE,
+    DEFAULT_LLM_TIMEOUT,
+    DEFAULT_RETRY_INTERVAL,
+    Warmup,
+    ollama_generate,
+)
 
 # Import chat history if available
 try:
@@ -45,6 +71,7 @@ class QueryRequest(BaseModel):
     user_id: Optional[str] = Field(default="default", description="User identifier for chat history")
     document_id: Optional[str] = Field(default=None, description="Specific document ID to search in")
     max_results: Optional[int] = Field(default=5, description="Maximum number of results to return", ge=1, le=20)
+    section: Optional[str] = Field(default=None, description="Only search this document section and its subsections, e.g. \"Installation > Network Setup\"")
 
 
 class SourceNode(BaseModel):
@@ -52,6 +79,8 @@ class SourceNode(BaseModel):
     content: str = Field(..., description="Text content from the source document")
     metadata: Dict = Field(..., description="Metadata about the source document")
     score: Optional[float] = Field(None, description="Similarity score for the result")
+    page_start: Optional[int] = Field(None, description="First page of the document the content comes from")
+    page_end: Optional[int] = Field(None, description="Last page of the document the content comes from")
 
 
 class QueryAnalysis(BaseModel):
@@ -68,6 +97,7 @@ class QueryResponse(BaseModel):
     query_analysis: QueryAnalysis = Field(..., description="Analysis of the query content")
     processing_time: Optional[float] = Field(None, description="Time taken to process the query in seconds")
     fallback_answer: Optional[str] = Field(None, description="Fallback answer for cross-vendor queries")
+    cached: bool = Field(False, description="Whether the answer was served from the semantic answer cache")
 
 
 class DocumentInfo(BaseModel):
@@ -91,6 +121,44 @@ class HealthResponse(BaseModel):
     uptime: float = Field(..., description="Service uptime in seconds")
 
 
+class ComponentReadiness(BaseModel):
+    """Model for the warm-up state of one component."""
+    state: str = Field(..., description="pending, warming, ready, failed or skipped")
+    seconds: Optional[float] = Field(None, description="Duration of the last warm-up attempt in seconds")
+    attempts: int = Field(..., description="Warm-up attempts so far")
+    error: Optional[str] = Field(None, description="Error of the last failed attempt")
+
+
+class ReadinessResponse(BaseModel):
+    """Response model for the readiness check."""
+    ready: bool = Field(..., description="Whether every component is warm and the replica should receive traffic")
+    warmup_seconds: Optional[float] = Field(None, description="Time from startup until all components were warm")
+    components: Dict[str, ComponentReadiness] = Field(..., description="Warm-up state per component")
+
+
+class CacheStatsResponse(BaseModel):
+    """Response model for cache statistics."""
+    query_embeddings: Dict = Field(..., description="Hit/miss counters of the query embedding LRU")
+    answers: Dict = Field(..., description="Hit/miss counters of the semantic answer cache")
+    query_batching: Dict = Field(..., description="Batch counts and sizes of the query embedding micro-batcher")
+    index_generation: int = Field(..., description="Generation of the currently loaded query index")
+
+
+class AdmissionMetricsResponse(BaseModel):
+    """Response model for admission control metrics."""
+    in_flight: int = Field(..., description="Queries currently generating")
+    queue_depth: int = Field(..., description="Queries waiting for a slot")
+    max_concurrent: int = Field(..., description="Maximum concurrent generations")
+    max_queue: int = Field(..., description="Maximum queued queries before 429")
+    max_wait: float = Field(..., description="Maximum queue time in seconds before 503")
+    admitted: int = Field(..., description="Queries admitted since startup")
+    rejected_queue_full: int = Field(..., description="Queries rejected with 429")
+    rejected_timeout: int = Field(..., description="Queries rejected with 503")
+    avg_wait_time: float = Field(..., description="Mean queue wait of admitted queries in seconds")
+    max_wait_time: float = Field(..., description="Longest queue wait of an admitted query in seconds")
+    avg_service_time: float = Field(..., description="Moving average of time a query holds a slot")
+
+
 class IngestionResponse(BaseModel):
     """Response model for document ingestion."""
     status: str = Field(..., description="Ingestion status")
@@ -98,6 +166,29 @@ class IngestionResponse(BaseModel):
     documents_processed: Optional[int] = Field(None, description="Number of documents processed")
 
 
+def _frame(frame_type: str, **fields) -> str:
+    """Encode one newline-delimited JSON frame of a streamed response."""
+    return json.dumps({"type": frame_type, **fields}) + "\n"
+
+
+def _page_span(metadata: Dict) -> Dict[str, Optional[int]]:
+    """Page span of a source chunk, for citations."""
+    start = metadata.get("page_start", metadata.get("page"))
+    end = metadata.get("page_end", start)
+    if start is None:
+        # Chunks from the reader-based ingestion only carry a page label
+        label = str(metadata.get("page_label", ""))
+        start = end = int(label) if label.isdigit() else None
+    return {"page_start": start, "page_end": end}
+
+
+def _query_bundle(query_text: str, query_embedding: Optional[List[float]]):
+    """Query for the engine, carrying a precomputed embedding when there is one."""
+    if query_embedding is None:
+        return query_text
+    return QueryBundle(query_str=query_text, embedding=query_embedding)
+
+
 class FastAPIQueryServer:
     """FastAPI-based server for handling PDF queries with comprehensive documentation."""
 
@@ -106,6 +197,29 @@ class FastAPIQueryServer:
         self.config = config
         self.start_time = time.time()
         self.ingestion = PDFIngestion(config)
+        self.query_engines = QueryEngineRegistry(self.ingestion)
+        self.admission = AdmissionController(
+            max_concurrent=config.admission.get("max_concurrent", DEFAULT_MAX_CONCURRENT),
+            max_queue=config.admission.get("max_queue", DEFAULT_MAX_QUEUE),
+            max_wait=config.admission.get("max_wait", DEFAULT_MAX_WAIT),
+        )
+        self.query_batcher = QueryEmbeddingBatcher(
+            self.ingestion.embed_queries,
+            max_batch_size=config.query_batching.get(
+                "max_batch_size", DEFAULT_MAX_BATCH_SIZE
+            ),
+            max_wait_ms=config.query_batching.get("max_wait_ms", DEFAULT_MAX_WAIT_MS),
+        )
+        # Bounded pool for blocking retrieval and LLM calls
+        self.query_executor = ThreadPoolExecutor(
+            max_workers=config.query_workers, thread_name_prefix="query"
+        )
+        self.answer_cache = SemanticAnswerCache(
+            max_entries=config.cache.get("answer_entries", DEFAULT_MAX_ENTRIES),
+            similarity_threshold=config.cache.get(
+                "answer_similarity", DEFAULT_SIMILARITY
+            ),
+        )
         self.chat_db: Optional[MemoryAPI] = None
 
         # Initialize chat history if available
@@ -121,12 +235,12 @@ class FastAPIQueryServer:
             title="PDF Chat Appliance API",
             description="""
             **PDF Chat Appliance** - Intelligent PDF document querying and analysis system.
-            
+
             This API provides endpoints for:
             * **Querying PDF documents** using natural language
             * **Document ingestion and management**
             * **Health monitoring and system status**
-            
+
             ## Features
             * Semantic search across PDF documents
             * LLM-powered query responses
@@ -149,12 +263,53 @@ class FastAPIQueryServer:
             allow_headers=["*"],
         )
 
+        self.warmup = self._create_warmup()
+        if self.config.warmup.get("enabled", True):
+            # Warm in the background so /health answers while models load
+            self.app.router.on_startup.append(self.warmup.start)
+        else:
+            # Build the query index once at startup
+            self.query_engines.try_refresh()
+
         # Setup routes
         self._setup_routes()
+        self.app.router.on_shutdown.append(self._shutdown)
+
+    def _create_warmup(self) -> Warmup:
+        """Warm-up of the embedding model, query index and LLM, as configured."""
+        settings = self.config.warmup
+        warmup = Warmup(
+            retry_interval=settings.get("retry_interval", DEFAULT_RETRY_INTERVAL)
+        )
+        if not settings.get("enabled", True):
+            return warmup
+
+        def embedding():
+            self.ingestion.embed_query("warm-up")
+
+        def vector_store():
+            self.query_engines.refresh()
+
+        def llm():
+            ollama_generate(
+                self.config.llm_base_url,
+                self.config.llm_model,
+                timeout=settings.get("llm_timeout", DEFAULT_LLM_TIMEOUT),
+                keep_alive=settings.get("llm_keep_alive", DEFAULT_KEEP_ALIVE),
+            )
+
+        llm_configured = self.config.llm_model and self.config.llm_base_url
+        warmup.add("embedding", embedding if settings.get("embedding", True) else None)
+        warmup.add(
+            "vector_store",
+            vector_store if settings.get("vector_store", True) else None,
+        )
+        warmup.add("llm", llm if settings.get("llm", True) and llm_configured else None)
+        return warmup
 
     def _setup_routes(self):
         """Setup FastAPI routes with comprehensive documentation."""
-        
+
         @self.app.get(
             "/health",
             response_model=HealthResponse,
@@ -171,6 +326,48 @@ class FastAPIQueryServer:
                 uptime=time.time() - self.start_time
             )
 
+        @self.app.get(
+            "/ready",
+            response_model=ReadinessResponse,
+            summary="Readiness Check",
+            description="503 until the embedding model, vector store and LLM are warm; route traffic only to ready replicas.",
+            tags=["System"],
+            responses={503: {"model": ReadinessResponse, "description": "Still warming up"}},
+        )
+        async def readiness_check(response: Response):
+            """Readiness endpoint with per-component warm-up state and timings."""
+            status = self.warmup.status()
+            if not status["ready"]:
+                response.status_code = 503
+            return ReadinessResponse(**status)
+
+        @self.app.get(
+            "/admin/cache",
+            response_model=CacheStatsResponse,
+            summary="Cache Statistics",
+            description="Hit/miss counters and sizes of the query-path caches.",
+            tags=["System"]
+        )
+        async def cache_stats():
+            """Report query-path cache statistics."""
+            return CacheStatsResponse(
+                query_embeddings=self.ingestion.query_embedding_cache.stats(),
+                answers=self.answer_cache.stats(),
+                query_batching=self.query_batcher.metrics(),
+                index_generation=self.query_engines.generation,
+            )
+
+        @self.app.get(
+            "/admin/admission",
+            response_model=AdmissionMetricsResponse,
+            summary="Admission Metrics",
+            description="In-flight generations, queue depth, wait times and rejections.",
+            tags=["System"]
+        )
+        async def admission_metrics():
+            """Report admission control metrics."""
+            return AdmissionMetricsResponse(**self.admission.metrics())
+
         @self.app.post(
             "/query",
             response_model=QueryResponse,
@@ -180,41 +377,80 @@ class FastAPIQueryServer:
         )
         async def query(request: QueryRequest):
             """Handle PDF queries with comprehensive error handling and documentation."""
+            # Embedding and cache lookups happen before admission, so queries
+            # waiting for a slot still share embedding batches
+            query_embedding = await self._embed_batched(request.query)
+            cached = self._cached_answer(
+                query_embedding, request.max_results or 5, request.section
+            )
+            if cached is not None:
+                # Needs neither retrieval nor the LLM, so takes no generation slot
+                return QueryResponse(
+                    **await run_in_threadpool(
+                        self._handle_query, request, query_embedding, cached
+                    )
+                )
+
+            ticket = await self._admit()
+            loop = asyncio.get_running_loop()
             try:
-                # Get chat history for context if available
-                if self.chat_db and request.document_id:
-                    try:
-                        _ = self.chat_db.get_messages(request.document_id)
-                    except Exception as e:
-                        logger.warning(f"Failed to retrieve chat history: {e}")
-
-                # Process the query
-                max_results = request.max_results or 5
-                response = self._process_query(request.query, max_results)
-
-                # Store chat history if available
-                if self.chat_db and request.document_id:
-                    try:
-                        self.chat_db.add_message(
-                            session_id=request.document_id,
-                            role="user",
-                            content=request.query,
-                            response_time=None
-                        )
-                        self.chat_db.add_message(
-                            session_id=request.document_id,
-                            role="assistant",
-                            content=response["answer"],
-                            response_time=None
-                        )
-                    except Exception as e:
-                        logger.warning(f"Failed to store chat history: {e}")
+                # Run off the event loop so health checks and other queries keep flowing
+                work = self.query_executor.submit(
+                    self._handle_query, request, query_embedding
+                )
+            except BaseException:
+                self.admission.release(ticket)
+                raise
+            # Hold the slot until the worker is actually done, even after a timeout
+            work.add_done_callback(
+                lambda _: loop.call_soon_threadsafe(self.admission.release, ticket)
+            )
 
+            try:
+                response = await asyncio.wait_for(
+                    asyncio.wrap_future(work), timeout=self.config.llm_timeout
+                )
                 return QueryResponse(**response)
 
+            except asyncio.TimeoutError as e:
+                # The worker thread cannot be interrupted; its result is discarded
+                logger.error(f"Query timed out after {self.config.llm_timeout} seconds")
+                raise HTTPException(
+                    status_code=504,
+                    detail=f"Query timed out after {self.config.llm_timeout} seconds",
+                ) from e
             except Exception as e:
                 logger.error(f"Query error: {e}")
-                raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}") from e
+
+        @self.app.post(
+            "/query/stream",
+            summary="Stream a PDF Query",
+            description=(
+                "Query PDF documents and stream the result as newline-delimited JSON: "
+                "a `sources` frame once retrieval is done, `token` frames as the LLM "
+                "produces text, and a final `done` frame with timings "
+                "(or an `error` frame)."
+            ),
+            tags=["Query"]
+        )
+        async def query_stream(request: QueryRequest):
+            """Stream sources, then answer tokens, then timings."""
+            max_results = request.max_results or 5
+            query_embedding = await self._embed_batched(request.query)
+            cached = self._cached_answer(query_embedding, max_results, request.section)
+            frames = self._stream_query(
+                request.query,
+                max_results,
+                query_embedding,
+                section=request.section,
+                cached=cached,
+            )
+            if cached is None:
+                # Only retrieval and generation hold a slot
+                ticket = await self._admit()
+                frames = self._release_after(ticket, frames)
+            return StreamingResponse(frames, media_type="application/x-ndjson")
 
         @self.app.post(
             "/ingest",
@@ -226,8 +462,8 @@ class FastAPIQueryServer:
         async def ingest_documents(background_tasks: BackgroundTasks):
             """Handle document ingestion requests with background processing."""
             try:
-                background_tasks.add_task(self.ingestion.ingest_pdfs)
-                
+                background_tasks.add_task(self._ingest_and_refresh)
+
                 return IngestionResponse(
                     status="success",
                     message="Document ingestion started successfully",
@@ -236,7 +472,7 @@ class FastAPIQueryServer:
 
             except Exception as e:
                 logger.error(f"Ingestion error: {e}")
-                raise HTTPException(status_code=500, detail=f"Document ingestion failed: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Document ingestion failed: {str(e)}") from e
 
         @self.app.get(
             "/documents",
@@ -269,41 +505,288 @@ class FastAPIQueryServer:
 
             except Exception as e:
                 logger.error(f"Error listing documents: {e}")
-                raise HTTPException(status_code=500, detail=f"Failed to list documents: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Failed to list documents: {str(e)}") from e
 
-    def _process_query(self, query_text: str, max_results: int = 5) -> Dict:
-        """Process a query and return results with comprehensive error handling."""
+    async def _admit(self) -> int:
+        """Wait for a generation slot, shedding load with 429/503 when saturated."""
+        try:
+            return await self.admission.acquire()
+        except AdmissionRejected as e:
+            logger.warning(f"Query rejected ({e.status_code}): {e.reason}")
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=e.reason,
+                headers={"Retry-After": str(e.retry_after)},
+            ) from e
+
+    async def _release_after(self, ticket: int, frames: Iterator[str]) -> AsyncIterator[str]:
+        """Relay streamed frames, freeing the admission slot when the stream ends."""
+        try:
+            async for frame in iterate_in_threadpool(frames):
+                yield frame
+        finally:
+            self.admission.release(ticket)
+
+    async def _embed_batched(self, query_text: str) -> Optional[List[float]]:
+        """Embed a query together with concurrent ones, or None if unavailable."""
+        if not self.query_engines.is_loaded:
+            return None
         try:
-            import platform
-            if platform.system() != "Windows":
-                signal.signal(signal.SIGALRM, self._timeout_handler)
-                signal.alarm(45)
+            return await self.query_batcher.embed(query_text)
+        except Exception as e:
+            logger.warning(f"Batched query embedding skipped: {e}")
+            return None
+
+    def _handle_query(
+        self,
+        request: QueryRequest,
+        query_embedding: Optional[List[float]] = None,
+        cached: Optional[Dict] = None,
+    ) -> Dict:
+        """Answer a query request (with `cached`, a cache hit already looked
+        up), recording it in chat history if enabled."""
+        # Get chat history for context if available
+        if self.chat_db and request.document_id:
+            try:
+                _ = self.chat_db.get_messages(request.document_id)
+            except Exception as e:
+                logger.warning(f"Failed to retrieve chat history: {e}")
+
+        # Process the query
+        max_results = request.max_results or 5
+        if cached is not None:
+            response = cached
+        else:
+            response = self._process_query(
+                request.query, max_results, query_embedding, section=request.section
+            )
 
+        # Store chat history if available
+        if self.chat_db and request.document_id:
             try:
-                index = self.ingestion.load_existing_index()
-                query_engine = index.as_query_engine(
+                self.chat_db.add_message(
+                    session_id=request.document_id,
+                    role="user",
+                    content=request.query,
+                    response_time=None
+                )
+                self.chat_db.add_message(
+                    session_id=request.document_id,
+                    role="assistant",
+                    content=response["answer"],
+                    response_time=None
+                )
+            except Exception as e:
+                logger.warning(f"Failed to store chat history: {e}")
+
+        return response
+
+    def _shutdown(self) -> None:
+        """Stop accepting query work and drop anything still queued."""
+        self.warmup.stop()
+        self.query_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _ingest_and_refresh(self) -> None:
+        """Ingest documents, then swap in the updated query index."""
+        self.ingestion.ingest_pdfs()
+        self.query_engines.try_refresh()
+
+    def _process_query(
+        self,
+        query_text: str,
+        max_results: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        section: Optional[str] = None,
+    ) -> Dict:
+        """Process a query, answering paraphrases of recent questions from the cache."""
+        if section is not None:
+            # Cached answers may draw on any section, so they are not shared
+            return self._generate_answer(
+                query_text, max_results, query_embedding, section=section
+            )
+        # Read the generation first so an answer racing an index swap is not cached
+        generation = self.query_engines.generation
+        if query_embedding is None:
+            query_embedding = self._embed_for_answer_cache(query_text)
+        cached = self._cached_answer(query_embedding, max_results, generation=generation)
+        if cached is not None:
+            return cached
+
+        response = self._generate_answer(query_text, max_results, query_embedding)
+        if query_embedding is not None:
+            self.answer_cache.put(query_embedding, response, generation, max_results)
+        return response
+
+    def _stream_query(
+        self,
+        query_text: str,
+        max_results: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        section: Optional[str] = None,
+        cached: Optional[Dict] = None,
+    ) -> Iterator[str]:
+        """Yield NDJSON frames for a query: sources, answer tokens, then timings.
+
+        `cached` is an answer already found in the cache."""
+        start = time.perf_counter()
+        generation = self.query_engines.generation
+        query_analysis = self._analyze_query(query_text)
+        first_token_time = None
+        # Answers restricted to a section are neither served from nor added to the cache
+        cacheable = section is None
+
+        try:
+            if query_embedding is None and cacheable:
+                query_embedding = self._embed_for_answer_cache(query_text)
+            if cached is None and cacheable:
+                cached = self._cached_answer(
+                    query_embedding, max_results, generation=generation
+                )
+
+            if cached is not None:
+                retrieval_time = time.perf_counter() - start
+                yield _frame("sources", sources=cached["sources"], query_analysis=query_analysis)
+                first_token_time = time.perf_counter() - start
+                yield _frame("token", text=cached["answer"])
+            else:
+                query_engine = self.query_engines.get_query_engine(
                     similarity_top_k=max_results,
                     response_mode="compact",
+                    streaming=True,
+                    section=section,
                 )
-                response = query_engine.query(query_text)
-                query_analysis = self._analyze_query(query_text)
-
-                enhanced_response = {
-                    "answer": response.response,
-                    "sources": [
+                # Retrieval happens here; synthesis is deferred to the token generator
+                response = query_engine.query(_query_bundle(query_text, query_embedding))
+                retrieval_time = time.perf_counter() - start
+                sources = self._format_sources(response.source_nodes)
+                yield _frame("sources", sources=sources, query_analysis=query_analysis)
+
+                tokens = []
+                response_gen = getattr(response, "response_gen", None)
+                for token in response_gen if response_gen is not None else [str(response)]:
+                    # Deadline is checked per token; a client disconnect closes this generator
+                    if time.perf_counter() - start > self.config.llm_timeout:
+                        raise TimeoutError(
+                            f"Query timed out after {self.config.llm_timeout} seconds"
+                        )
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter() - start
+                    tokens.append(token)
+                    yield _frame("token", text=token)
+
+                if cacheable and query_embedding is not None:
+                    self.answer_cache.put(
+                        query_embedding,
                         {
-                            "content": node.text,
-                            "metadata": node.metadata,
-                            "score": node.score if hasattr(node, "score") else None,
-                        }
-                        for node in response.source_nodes
-                    ],
-                    "query_analysis": query_analysis,
-                    "processing_time": getattr(response, "processing_time", None),
-                }
-
-                if query_analysis["is_cross_vendor"]:
-                    fallback_answer = f"""I understand you're asking about integrating {' and '.join(query_analysis['vendors'])} technologies.
+                            "answer": "".join(tokens),
+                            "sources": sources,
+                            "query_analysis": query_analysis,
+                            "processing_time": time.perf_counter() - start,
+                        },
+                        generation,
+                        max_results,
+                    )
+
+            yield _frame(
+                "done",
+                cached=cached is not None,
+                retrieval_time=retrieval_time,
+                time_to_first_token=first_token_time,
+                processing_time=time.perf_counter() - start,
+                fallback_answer=(
+                    self._fallback_answer(query_analysis)
+                    if query_analysis["is_cross_vendor"]
+                    else None
+                ),
+            )
+
+        except Exception as e:
+            # Headers are already sent, so errors are reported in-band
+            logger.error(f"Streaming query error: {e}")
+            yield _frame("error", detail=f"Query processing failed: {str(e)}")
+
+    def _cached_answer(
+        self,
+        query_embedding: Optional[List[float]],
+        max_results: int,
+        section: Optional[str] = None,
+        generation: Optional[int] = None,
+    ) -> Optional[Dict]:
+        """A cached answer to a paraphrase of the query, or None.
+
+        Answers restricted to a section are never served from the cache.
+        """
+        if section is not None or query_embedding is None:
+            return None
+        if not self.answer_cache.enabled:
+            return None
+        if generation is None:
+            generation = self.query_engines.generation
+        cached = self.answer_cache.get(query_embedding, generation, max_results)
+        if cached is not None:
+            cached["cached"] = True
+        return cached
+
+    def _embed_for_answer_cache(self, query_text: str) -> Optional[List[float]]:
+        """Embed a query for the answer cache, or None if it cannot be used."""
+        if not self.answer_cache.enabled or not self.query_engines.is_loaded:
+            return None
+        try:
+            return self.ingestion.embed_query(query_text)
+        except Exception as e:
+            logger.warning(f"Answer cache lookup skipped: {e}")
+            return None
+
+    def _generate_answer(
+        self,
+        query_text: str,
+        max_results: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        section: Optional[str] = None,
+    ) -> Dict:
+        """Process a query and return results with comprehensive error handling."""
+        try:
+            query_engine = self.query_engines.get_query_engine(
+                similarity_top_k=max_results,
+                response_mode="compact",
+                section=section,
+            )
+            response = query_engine.query(_query_bundle(query_text, query_embedding))
+            query_analysis = self._analyze_query(query_text)
+
+            enhanced_response = {
+                "answer": response.response,
+                "sources": self._format_sources(response.source_nodes),
+                "query_analysis": query_analysis,
+                "processing_time": getattr(response, "processing_time", None),
+            }
+
+            if query_analysis["is_cross_vendor"]:
+                enhanced_response["fallback_answer"] = self._fallback_answer(
+                    query_analysis
+                )
+
+            return enhanced_response
+
+        except Exception as e:
+            logger.error(f"Query processing error: {e}")
+            raise
+
+    def _format_sources(self, source_nodes) -> List[Dict]:
+        """Convert retrieved nodes into response source entries."""
+        return [
+            {
+                "content": node.text,
+                "metadata": node.metadata,
+                "score": node.score if hasattr(node, "score") else None,
+                **_page_span(node.metadata),
+            }
+            for node in source_nodes
+        ]
+
+    def _fallback_answer(self, query_analysis: Dict) -> str:
+        """General guidance appended to cross-vendor answers."""
+        return f"""I understand you're asking about integrating {' and '.join(query_analysis['vendors'])} technologies.
 
 While I'm having difficulty accessing the full documentation at the moment, here are some general considerations for {query_analysis['query_type']} scenarios:
 
@@ -315,22 +798,6 @@ While I'm having difficulty accessing the full documentation at the moment, here
 
 For specific implementation details, I recommend consulting the official documentation for both {' and '.join(query_analysis['vendors'])} systems."""
 
-                    enhanced_response["fallback_answer"] = fallback_answer
-
-                return enhanced_response
-
-            except TimeoutError:
-                if platform.system() != "Windows":
-                    signal.alarm(0)
-                raise Exception("Query timed out after 45 seconds") from None
-            finally:
-                if platform.system() != "Windows":
-                    signal.alarm(0)
-
-        except Exception as e:
-            logger.error(f"Query processing error: {e}")
-            raise
-
     def _analyze_query(self, query_text: str) -> Dict:
         """Analyze query for vendor-specific content and query type."""
         query_lower = query_text.lower()
@@ -359,19 +826,15 @@ For specific implementation details, I recommend consulting the official documen
             "query_type": query_type,
         }
 
-    def _timeout_handler(self, signum, frame):
-        """Handle query timeout."""
-        raise TimeoutError("Query processing timed out")
-
     def run(self, host: str = "0.0.0.0", port: int = 5000, debug: bool = False):
         """Run the FastAPI server with uvicorn."""
         import uvicorn
-        
+
         logger.info(f"Starting PDF Chat FastAPI Server on {host}:{port}")
         logger.info(f"API Documentation available at: http://{host}:{port}/docs")
         logger.info(f"ReDoc Documentation available at: http://{host}:{port}/redoc")
         logger.info(f"OpenAPI Schema available at: http://{host}:{port}/openapi.json")
-        
+
         uvicorn.run(
             self.app,
             host=host,
@@ -1,39 +1,67 @@
 """
 PDF ingestion module for processing and indexing PDF documents
-for semantic search using llama-index and FAISS.
+for semantic search using llama-index and a memory-mapped vector store.
 """
 
+import bisect
+import functools
 import logging
 import os
-from typing import Dict, List, Optional
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
 from llama_index.core.node_parser import SimpleNodeParser
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
 from llama_index.core.storage import StorageContext
 
+from .chunking import TokenChunkSplitter, resolve_tokenizer
 from .config import Config
+from .embedding_cache import (
+    DEFAULT_QUERY_ENTRIES,
+    CachedEmbedding,
+    EmbeddingCache,
+    QueryEmbeddingCache,
+)
+from .embedding_pool import EmbeddingPool, PooledEmbedding
+from .extraction import (
+    PAGE_SEPARATOR,
+    PageRecord,
+    assign_offsets,
+    extract_page_range,
+    page_count,
+)
+from .lazy_embedding import LazyEmbedding
+from .manifest import IngestionManifest, chunker_fingerprint
+from .onnx_embedding import load_onnx_embedding
+from .structure import assign_sections, section_label, section_labels
+from .utils import stable_file_id
+from .vector_store import MmapVectorStore, open_local_vector_store
 
 # Setup logger for this module
 logger = logging.getLogger(__name__)
 
-# Try to import optional dependencies, provide stubs if not available
+EMBED_MODEL_NAME = "nomic-ai/nomic-embed-text-v1.5"
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = 50
 
 # Set environment variable to use local embeddings to avoid OpenAI fallback
 os.environ["LLAMA_INDEX_EMBED_MODEL"] = "local"
 
-try:
-    from llama_index.core import Settings
+
+def _huggingface_model() -> Any:
+    """Build the PyTorch embedding model (nomic-embed-text-v1.5, as
+    specified in llm-config.mdc); imports torch, so only call on first use."""
     from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
-    # Use nomic-embed-text-v1.5 for embeddings as specified in llm-config.mdc
-    Settings.embed_model = HuggingFaceEmbedding(
-        model_name="nomic-ai/nomic-embed-text-v1.5",
-        trust_remote_code=True
-    )
-except ImportError:
-    logger.warning("HuggingFaceEmbedding not available, using default")
+    return HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME, trust_remote_code=True)
+
 
-# Remove debug file write that won't work in test environment
+def _pool_model_factory(embedding: Dict[str, Any]) -> Callable[[], Any]:
+    """Picklable builder of the configured embedding model for pool workers."""
+    if embedding.get("backend") == "onnx":
+        return functools.partial(load_onnx_embedding, embedding)
+    return _huggingface_model
 
 
 class PDFIngestion:
@@ -42,12 +70,43 @@ class PDFIngestion:
     def __init__(self, config: Config):
         """Initialize the PDF ingestion system."""
         self.config = config
-        self.node_parser = SimpleNodeParser.from_defaults(
-            chunk_size=512, chunk_overlap=50
+        chunking = config.chunking
+        self.chunk_size = chunking.get("chunk_size", CHUNK_SIZE)
+        self.chunk_overlap = chunking.get("chunk_overlap", CHUNK_OVERLAP)
+        splitter = chunking.get("splitter", "native")
+        if splitter == "native":
+            tokenizer_name = chunking.get("tokenizer", EMBED_MODEL_NAME)
+            # Keyed on the tokenizer that loaded, which may be a fallback
+            tokenizer = resolve_tokenizer(
+                tokenizer_name, strict=chunking.get("strict_tokenizer", False)
+            ).name
+            # Exact embedding-model token budgets in one pass over the text
+            self.node_parser = TokenChunkSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                tokenizer_name=tokenizer_name,
+            )
+        else:
+            tokenizer = None
+            self.node_parser = SimpleNodeParser.from_defaults(
+                chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+            )
+        self.chunker = chunker_fingerprint(
+            splitter, chunking.get("structural", False), tokenizer
+        )
+        self._vector_store: Optional[MmapVectorStore] = None
+        self._manifest: Optional[IngestionManifest] = None
+        self._embed_model: Optional[CachedEmbedding] = None
+        self._embed_model_lock = threading.Lock()
+        self.query_embedding_cache = QueryEmbeddingCache(
+            max_entries=config.cache.get(
+                "query_embedding_entries", DEFAULT_QUERY_ENTRIES
+            ),
+            ttl_seconds=config.cache.get("query_embedding_ttl"),
         )
 
     def ingest_pdfs(self) -> None:
-        """Ingest all PDFs from the configured documents directory."""
+        """Ingest new or changed PDFs from the configured documents directory."""
         docs_dir = self.config.docs_dir
         if not os.path.exists(docs_dir):
             logger.warning(f"Documents directory {docs_dir} does not exist")
@@ -59,94 +118,283 @@ class PDFIngestion:
             if file.lower().endswith(".pdf"):
                 pdf_files.append(os.path.join(docs_dir, file))
 
+        # Drop vectors of files that were removed from the documents directory
+        manifest = self._get_manifest()
+        vector_store = self._get_vector_store()
+        for record in manifest.removed_files(pdf_files):
+            vector_store.delete(record.file_id)
+            manifest.remove(record.path)
+            logger.info(f"Removed vectors of deleted file {record.path}")
+
         if not pdf_files:
             logger.info("No PDF files found for ingestion")
             return
 
         logger.info(f"Found {len(pdf_files)} PDF files for ingestion")
 
-        # Process each PDF file
+        # Process each new or changed PDF file
+        skipped = 0
         for pdf_file in pdf_files:
             try:
-                self._process_single_pdf(pdf_file)
+                record = manifest.check(
+                    pdf_file,
+                    self.chunk_size,
+                    self.chunk_overlap,
+                    self._get_embed_model().model_name,
+                    self.chunker,
+                )
+                if record is None:
+                    skipped += 1
+                    continue
+                self._process_single_pdf(pdf_file, file_id=record.file_id)
+                manifest.record(record)
             except Exception as e:
                 logger.error(f"Failed to process {pdf_file}: {e}")
 
-    def _process_single_pdf(self, pdf_file: str) -> None:
-        """Process a single PDF file."""
-        logger.info(f"Processing PDF: {pdf_file}")
+        if skipped:
+            logger.info(f"Skipped {skipped} unchanged PDF files")
+
+        # Switch to (or extend) the ANN index once the corpus is large enough
+        vector_store.update_ann_index()
 
-        # Load the PDF document
-        documents = SimpleDirectoryReader(input_files=[pdf_file]).load_data()
-        if not documents:
+    def _process_single_pdf(self, pdf_file: str, file_id: Optional[str] = None) -> None:
+        """Process a single PDF file, replacing any vectors it had before."""
+        logger.info(f"Processing PDF: {pdf_file}")
+        file_id = file_id or stable_file_id(pdf_file)
+
+        if self.config.chunking.get("structural", False):
+            nodes = self._section_nodes(pdf_file, file_id)
+        else:
+            # Load the PDF document
+            documents = SimpleDirectoryReader(input_files=[pdf_file]).load_data()
+            if not documents:
+                logger.warning(f"No content found in {pdf_file}")
+                return
+
+            # All pages share the file id so the file's vectors can be replaced
+            for document in documents:
+                document.id_ = file_id
+
+            # Parse into nodes
+            nodes = self.node_parser.get_nodes_from_documents(documents)
+        if not nodes:
             logger.warning(f"No content found in {pdf_file}")
             return
-
-        # Parse into nodes
-        nodes = self.node_parser.get_nodes_from_documents(documents)
         logger.info(f"Created {len(nodes)} nodes from {pdf_file}")
 
         # Create vector store index
         vector_store = self._get_vector_store()
+        vector_store.delete(file_id)
         storage_context = StorageContext.from_defaults(vector_store=vector_store)
 
         # Build index
-        VectorStoreIndex(nodes, storage_context=storage_context)
+        VectorStoreIndex(
+            nodes, storage_context=storage_context, embed_model=self._get_embed_model()
+        )
         logger.info(f"Successfully indexed {pdf_file}")
 
+    def _section_nodes(self, pdf_file: str, file_id: str) -> List[TextNode]:
+        """Nodes chunked within the PDF's sections, owned by `file_id`."""
+        nodes = []
+        for chunk in self.semantic_chunk_document(pdf_file):
+            metadata = chunk["metadata"]
+            nodes.append(
+                TextNode(
+                    text=chunk["content"],
+                    metadata={
+                        "file_name": os.path.basename(pdf_file),
+                        "file_path": pdf_file,
+                        "page_label": metadata["page_label"],
+                        "page_start": metadata["page_start"],
+                        "page_end": metadata["page_end"],
+                        "section": metadata["section"],
+                        "sections": metadata["sections"],
+                    },
+                    # The section label is context for the model; the
+                    # ancestor labels only serve as a filter, and the page
+                    # span is for citations
+                    excluded_embed_metadata_keys=[
+                        "file_path",
+                        "sections",
+                        "page_start",
+                        "page_end",
+                    ],
+                    excluded_llm_metadata_keys=["file_path", "sections"],
+                    relationships={
+                        NodeRelationship.SOURCE: RelatedNodeInfo(node_id=file_id)
+                    },
+                )
+            )
+        return nodes
+
     def _get_vector_store(self):
         """Get the configured vector store."""
-        # This would be implemented based on the specific vector store
-        # For now, return a simple in-memory store
-        try:
-            from llama_index.vector_stores.simple import SimpleVectorStore
-            return SimpleVectorStore()
-        except ImportError:
-            logger.warning("SimpleVectorStore not available, using default")
-            # Fallback to default vector store
-            from llama_index.core import VectorStoreIndex
-            return VectorStoreIndex([])
-
-    def extract_document_structure(self, text: str) -> Dict:
-        """Extract document structure and metadata."""
-        # Simple structure extraction
-        lines = text.split("\n")
-        sections = []
-        current_section = {"title": "Introduction", "content": []}
-
-        for line in lines:
-            line = line.strip()
-            if line.startswith("#"):
-                if current_section["content"]:
-                    sections.append(current_section)
-                current_section = {"title": line.lstrip("# "), "content": []}
-            else:
-                current_section["content"].append(line)
-
-        if current_section["content"]:
-            sections.append(current_section)
-
-        return {"sections": sections, "total_lines": len(lines)}
-
-    def semantic_chunk_document(self, text: str, vendor: Optional[str] = None) -> List[Dict]:
-        """Create semantic chunks preserving document structure."""
-        # Extract structure but don't use it for now - removed unused variable
-        chunks = []
+        # One durable store per ingestion instance so the memory map is reused
+        if self._vector_store is None:
+            self._vector_store = open_local_vector_store(self.config)
+        return self._vector_store
+
+    def _get_embed_model(self) -> CachedEmbedding:
+        """Get the embedding model, fronted by the persistent embedding cache.
+
+        The model itself is only loaded by the first embedding call.
+        """
+        if self._embed_model is None:
+            with self._embed_model_lock:
+                if self._embed_model is None:
+                    self._embed_model = self._create_embed_model()
+        return self._embed_model
+
+    def _create_embed_model(self) -> CachedEmbedding:
+        embedding = self.config.embedding
+        if embedding.get("backend") == "onnx":
+            base_model = load_onnx_embedding(embedding)
+            model_name = base_model.model_name
+        else:
+            # Built on the first embedding, not when the server starts
+            base_model = LazyEmbedding(_huggingface_model, model_name=EMBED_MODEL_NAME)
+            model_name = EMBED_MODEL_NAME
+        if embedding.get("pool_workers"):
+            # Worker processes pinned to their own cores, each with the model
+            base_model = PooledEmbedding(
+                EmbeddingPool(
+                    _pool_model_factory(embedding),
+                    workers=embedding["pool_workers"],
+                    threads_per_worker=embedding.get("pool_threads"),
+                ),
+                model_name=model_name,
+            )
+        return CachedEmbedding(
+            base_model,
+            EmbeddingCache(
+                os.path.join(self.config.persist_dir, "embedding_cache.db")
+            ),
+            query_cache=self.query_embedding_cache,
+            model_name=model_name,
+        )
 
-        # Simple chunking by paragraphs
-        paragraphs = text.split("\n\n")
-        for i, paragraph in enumerate(paragraphs):
-            if paragraph.strip():
+    def embed_query(self, query_text: str) -> List[float]:
+        """Embed a query with the same (cached) model the retriever uses."""
+        return self._get_embed_model().get_query_embedding(query_text)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries in one batched model call."""
+        return self._get_embed_model().get_query_embedding_batch(queries)
+
+    def _get_manifest(self) -> IngestionManifest:
+        """Get the manifest of ingested files kept next to the vector store."""
+        if self._manifest is None:
+            self._manifest = IngestionManifest(
+                os.path.join(self.config.persist_dir, "manifest.json")
+            )
+        return self._manifest
+
+    def _structured_pages(self, pdf_path: str) -> List[PageRecord]:
+        """Pages of a PDF with their headings and section paths."""
+        records = extract_page_range(pdf_path, 0, page_count(pdf_path), headings=True)
+        return list(assign_sections(assign_offsets(records.records)))
+
+    def extract_document_structure(self, pdf_path: str) -> Dict:
+        """Build the section tree of a PDF from its outline or heading fonts.
+
+        Each section is a dict with its title, level, first page and child
+        sections, in document order.
+        """
+        pages = self._structured_pages(pdf_path)
+        sections: List[Dict] = []
+        stack: List[Dict] = []
+        for page in pages:
+            for heading in page.headings or ():
+                while stack and stack[-1]["level"] >= heading.level:
+                    stack.pop()
+                section = {
+                    "title": heading.title,
+                    "level": heading.level,
+                    "page": page.page,
+                    "children": [],
+                }
+                (stack[-1]["children"] if stack else sections).append(section)
+                stack.append(section)
+
+        return {"sections": sections, "total_pages": len(pages)}
+
+    def semantic_chunk_document(
+        self, pdf_path: str, vendor: Optional[str] = None
+    ) -> List[Dict]:
+        """Chunk a PDF within its sections, tagging chunks with their section path.
+
+        A section's text is joined across the pages it spans before it is
+        split, so chunks may cross a page break; `page_label` is the page a
+        chunk starts on and `page_start`/`page_end` its page span.
+        """
+        chunks = []
+        for path, text, page_offsets in self._section_texts(
+            self._structured_pages(pdf_path)
+        ):
+            offsets = [offset for offset, _ in page_offsets]
+            cursor = 0
+            for content in self.node_parser.split_text(text):
+                if not content.strip():
+                    continue
+                # Chunks overlap, so the next one starts at or after this one
+                start = text.find(content, cursor)
+                if start < 0:
+                    start = cursor
+                cursor = start
+                first = page_offsets[bisect.bisect_right(offsets, start) - 1][1]
+                last = page_offsets[
+                    bisect.bisect_right(offsets, start + len(content) - 1) - 1
+                ][1]
                 chunks.append(
                     {
-                        "id": f"chunk_{i}",
-                        "content": paragraph.strip(),
-                        "metadata": {"vendor": vendor, "chunk_type": "paragraph"},
+                        "id": f"chunk_{len(chunks)}",
+                        "content": content,
+                        "metadata": {
+                            "vendor": vendor,
+                            "chunk_type": "section",
+                            "page_label": str(first),
+                            "page_start": first,
+                            "page_end": last,
+                            "section": section_label(path),
+                            "sections": section_labels(path),
+                        },
                     }
                 )
 
         return chunks
 
+    @staticmethod
+    def _section_texts(
+        pages: List[PageRecord],
+    ) -> Iterator[Tuple[Tuple[str, ...], str, List[Tuple[int, int]]]]:
+        """Text of each section, joined across pages, with its page offsets.
+
+        Yields the section path, its text and (offset, page) pairs giving
+        where each of its pages begins in the text. A page continues the
+        section before it unless a heading starts the page.
+        """
+        path, parts, page_offsets = None, [], []
+        length = 0
+        for page in pages:
+            heading_at_top = any(h.offset == 0 for h in page.headings or ())
+            for section in page.sections:
+                piece = page.text[section.start : section.end]
+                continues = (
+                    section.start == 0 and not heading_at_top and section.path == path
+                )
+                if not continues:
+                    if parts:
+                        yield path, "".join(parts), page_offsets
+                    path, parts, page_offsets, length = section.path, [], [], 0
+                elif piece:
+                    parts.append(PAGE_SEPARATOR)
+                    length += len(PAGE_SEPARATOR)
+                page_offsets.append((length, page.page))
+                parts.append(piece)
+                length += len(piece)
+        if parts:
+            yield path, "".join(parts), page_offsets
+
     def is_large_file(self, file_path: str) -> bool:
         """Check if file is considered large and needs optimized processing."""
         # Get file size in MB and compare directly
@@ -157,9 +405,13 @@ class PDFIngestion:
         """Load existing index from storage."""
         try:
             vector_store = self._get_vector_store()
+            # Another process (CLI or enterprise ingest) may have written rows
+            vector_store.reload()
             storage_context = StorageContext.from_defaults(vector_store=vector_store)
             return VectorStoreIndex.from_vector_store(
-                vector_store, storage_context=storage_context
+                vector_store,
+                storage_context=storage_context,
+                embed_model=self._get_embed_model(),
             )
         except Exception as e:
             logger.error(f"Failed to load existing index: {e}")
@@ -0,0 +1,81 @@
+"""
+Lazily constructed embedding model for PDF Chat Appliance.
+
+Loading a transformer takes seconds and hundreds of megabytes, and most
+processes that import the ingestion code (CLI commands, tests, document
+listing) never embed anything. `LazyEmbedding` stands in for the model
+and builds it on the first embedding call, once, even when several
+request threads make that first call at the same time.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+
+class LazyEmbedding(BaseEmbedding):
+    """Embedding model built by a factory on first use."""
+
+    _factory: Callable[[], Any] = PrivateAttr()
+    _model: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, factory: Callable[[], Any], **kwargs: Any) -> None:
+        """Defer `factory()` until an embedding is requested; pass
+        `model_name` so cache keys are known without loading the model."""
+        super().__init__(**kwargs)
+        self._factory = factory
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LazyEmbedding"
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the model has been built."""
+        return self._model is not None
+
+    def get_model(self) -> Any:
+        """The underlying model, built on the first call."""
+        model = self._model
+        if model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._model = self._factory()
+                    logger.info(
+                        f"Loaded embedding model {self.model_name} in "
+                        f"{time.perf_counter() - start:.1f}s"
+                    )
+                model = self._model
+        return model
+
+    def _embed(
+        self, texts: List[str], prompt_name: Optional[str] = None
+    ) -> List[Embedding]:
+        """Batch embed with the model's prompt, as HuggingFaceEmbedding does."""
+        model = self.get_model()
+        embed = getattr(model, "_embed", None)
+        if callable(embed):
+            return embed(texts, prompt_name=prompt_name)
+        if prompt_name == "query":
+            return [model.get_query_embedding(text) for text in texts]
+        return model.get_text_embedding_batch(texts)
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self.get_model().get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self.get_model().aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self.get_model().get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self.get_model().get_text_embedding_batch(texts)
@@ -0,0 +1,170 @@
+"""
+Ingestion manifest for PDF Chat Appliance.
+
+Records what has been ingested (path, size, mtime, SHA-256, chunker
+settings and embedding model) next to the vector store, so re-ingest
+only processes new or changed files and can drop vectors of files that
+were removed from the documents directory.
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .utils import file_sha256, stable_file_id
+
+logger = logging.getLogger(__name__)
+
+
+def chunker_fingerprint(
+    splitter: str, structural: bool, tokenizer: Optional[str] = None
+) -> str:
+    """Manifest key of how documents are split into chunks.
+
+    Switching the splitter, its tokenizer or structure-aware chunking
+    moves chunk boundaries, so it re-ingests every document.
+    """
+    parts = [splitter, "structural" if structural else "flat"]
+    if tokenizer:
+        parts.append(tokenizer)
+    return ":".join(parts)
+
+
+@dataclass
+class FileRecord:
+    """Manifest entry for one ingested file."""
+
+    path: str
+    file_id: str
+    size: int
+    mtime: float
+    sha256: str
+    chunk_size: int
+    chunk_overlap: int
+    embed_model: str
+    # Splitter settings (see chunker_fingerprint); empty in older manifests
+    chunker: str = ""
+    # Per-page content hash and chunk count, keyed by page number
+    pages: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def same_params(self, other: "FileRecord") -> bool:
+        """Whether both records were chunked and embedded the same way."""
+        return (
+            self.chunk_size == other.chunk_size
+            and self.chunk_overlap == other.chunk_overlap
+            and self.embed_model == other.embed_model
+            and self.chunker == other.chunker
+        )
+
+
+class IngestionManifest:
+    """JSON-backed record of ingested files keyed by absolute path."""
+
+    def __init__(self, manifest_path: str):
+        """Load the manifest, starting empty if it does not exist yet."""
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        self._records: Dict[str, FileRecord] = {}
+
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path) as f:
+                    data = json.load(f)
+                self._records = {
+                    path: FileRecord(**record)
+                    for path, record in data.get("files", {}).items()
+                }
+            except (ValueError, TypeError) as e:
+                # A corrupt manifest only costs a full re-ingest
+                logger.warning(f"Ignoring unreadable manifest {manifest_path}: {e}")
+
+    def get(self, path: str) -> Optional[FileRecord]:
+        """Return the record for a file, if it has been ingested."""
+        return self._records.get(os.path.abspath(path))
+
+    def paths(self) -> List[str]:
+        """All recorded file paths."""
+        return list(self._records)
+
+    def check(
+        self,
+        path: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        embed_model: str,
+        chunker: str = "",
+    ) -> Optional[FileRecord]:
+        """Return a fresh record if the file needs (re-)ingesting, else None.
+
+        Size and mtime are compared first so unchanged files are not
+        re-hashed; a touched but byte-identical file only has its mtime
+        refreshed.
+        """
+        abs_path = os.path.abspath(path)
+        stat = os.stat(abs_path)
+        previous = self._records.get(abs_path)
+        same_params = previous is not None and (
+            previous.chunk_size == chunk_size
+            and previous.chunk_overlap == chunk_overlap
+            and previous.embed_model == embed_model
+            and previous.chunker == chunker
+        )
+
+        if same_params and previous.size == stat.st_size and previous.mtime == stat.st_mtime:
+            return None
+
+        sha256 = file_sha256(abs_path)
+        if same_params and previous.sha256 == sha256:
+            previous.size, previous.mtime = stat.st_size, stat.st_mtime
+            self._save()
+            return None
+
+        return FileRecord(
+            path=abs_path,
+            file_id=stable_file_id(abs_path),
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            sha256=sha256,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            embed_model=embed_model,
+            chunker=chunker,
+        )
+
+    def reusable_pages(self, record: FileRecord) -> Dict[str, Dict[str, Any]]:
+        """Page entries of the stored version of a file that `record` can reuse."""
+        previous = self.get(record.path)
+        if previous is None or not previous.same_params(record):
+            return {}
+        return previous.pages
+
+    def record(self, record: FileRecord) -> None:
+        """Store a record after its file was ingested successfully."""
+        with self._lock:
+            self._records[record.path] = record
+        self._save()
+
+    def remove(self, path: str) -> Optional[FileRecord]:
+        """Forget a file, returning its record."""
+        with self._lock:
+            record = self._records.pop(os.path.abspath(path), None)
+        self._save()
+        return record
+
+    def removed_files(self, current_paths: List[str]) -> List[FileRecord]:
+        """Records of files that are no longer present."""
+        current = {os.path.abspath(p) for p in current_paths}
+        return [r for path, r in self._records.items() if path not in current]
+
+    def _save(self) -> None:
+        """Atomically write the manifest to disk."""
+        with self._lock:
+            data = {"files": {path: asdict(r) for path, r in self._records.items()}}
+            os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,278 @@
+"""
+In-process ONNX embedding backend for PDF Chat Appliance.
+
+Runs the embedding sentence-transformer as an ONNX graph under
+onnxruntime, by default with int8 dynamically quantized weights, so CPU
+appliances embed chunks without PyTorch and without an HTTP round trip
+per batch. `export_onnx_model` converts and quantizes a Hugging Face
+model once; `OnnxEmbedding` loads the result. Only `onnxruntime`,
+`tokenizers` and NumPy are needed at run time.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+# Name, pooling, length limit and prompts of the exported model, read back by OnnxEmbedding
+SETTINGS_FILE = "embedding_config.json"
+SETTINGS_KEYS = (
+    "model_name",
+    "pooling",
+    "max_length",
+    "query_instruction",
+    "text_instruction",
+)
+# Task prefixes the model was trained with, as (query, text)
+MODEL_INSTRUCTIONS = {
+    "nomic-ai/nomic-embed-text-v1": ("search_query: ", "search_document: "),
+    "nomic-ai/nomic-embed-text-v1.5": ("search_query: ", "search_document: "),
+}
+
+DEFAULT_MAX_LENGTH = 512
+DEFAULT_THREADS = 4
+# Texts per forward pass; llama-index's default of 10 leaves the graph idle
+DEFAULT_EMBED_BATCH_SIZE = 64
+# Exported models must match the reference model at least this closely
+MIN_REFERENCE_COSINE = 0.99
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average token vectors (batch, tokens, dim) over the unpadded tokens."""
+    mask = attention_mask[..., None].astype(hidden.dtype)
+    return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, leaving zero rows alone."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def reference_similarity(
+    model: BaseEmbedding, reference: BaseEmbedding, texts: Sequence[str]
+) -> float:
+    """Lowest cosine similarity between the two models' embeddings of `texts`."""
+    ours = normalize(np.asarray(model.get_text_embedding_batch(list(texts))))
+    theirs = normalize(np.asarray(reference.get_text_embedding_batch(list(texts))))
+    return float((ours * theirs).sum(axis=1).min())
+
+
+class OnnxEmbedding(BaseEmbedding):
+    """Embedding model running an exported ONNX graph with onnxruntime."""
+
+    model_dir: str = Field(description="Directory written by export_onnx_model.")
+    quantized: bool = Field(default=True, description="Load the int8 graph.")
+    threads: int = Field(
+        default=DEFAULT_THREADS, description="onnxruntime intra-op threads."
+    )
+    max_length: int = Field(default=DEFAULT_MAX_LENGTH)
+    pooling: str = Field(default="mean", description="'mean' or 'cls'.")
+    normalize: bool = Field(default=True)
+    query_instruction: Optional[str] = Field(default=None)
+    text_instruction: Optional[str] = Field(default=None)
+
+    _session: Any = PrivateAttr(default=None)
+    _tokenizer: Any = PrivateAttr(default=None)
+    _input_names: List[str] = PrivateAttr(default_factory=list)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, model_dir: str, **kwargs: Any) -> None:
+        """Use the model exported to `model_dir`; its saved settings are
+        the defaults for pooling, prompts and model name."""
+        settings: Dict[str, Any] = {}
+        settings_path = os.path.join(model_dir, SETTINGS_FILE)
+        if os.path.exists(settings_path):
+            with open(settings_path) as f:
+                settings = json.load(f)
+        for key in SETTINGS_KEYS:
+            if key in settings:
+                kwargs.setdefault(key, settings[key])
+        kwargs.setdefault("embed_batch_size", DEFAULT_EMBED_BATCH_SIZE)
+        quantized = kwargs.get("quantized", True)
+        if isinstance(kwargs.get("model_name"), str):
+            # Keep embedding caches of the int8 and fp32 graphs apart
+            kwargs["model_name"] += ":onnx-int8" if quantized else ":onnx"
+        super().__init__(model_dir=model_dir, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OnnxEmbedding"
+
+    def _load(self) -> None:
+        """Open the inference session and tokenizer on first use."""
+        with self._lock:
+            if self._session is None:
+                self._open_session()
+
+    def _open_session(self) -> None:
+        model_file = QUANTIZED_MODEL_FILE if self.quantized else MODEL_FILE
+        model_path = os.path.join(self.model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"No ONNX model at {model_path}; run export_onnx_model first"
+            )
+
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, TOKENIZER_FILE))
+        tokenizer.enable_truncation(self.max_length)
+        if tokenizer.padding is None:
+            tokenizer.enable_padding()
+        self._input_names = [i.name for i in session.get_inputs()]
+        self._tokenizer = tokenizer
+        self._session = session
+        logger.info(f"Loaded ONNX embedding model {model_file} from {self.model_dir}")
+
+    def _embed(
+        self, texts: List[str], prompt_name: Optional[str] = None
+    ) -> List[Embedding]:
+        """Embed `texts` in one forward pass; `prompt_name` is "query" or "text"."""
+        self._load()
+        instruction = (
+            self.query_instruction if prompt_name == "query" else self.text_instruction
+        )
+        if instruction:
+            texts = [instruction + text for text in texts]
+        encodings = self._tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encodings], dtype=np.int64
+            ),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self._session.run(
+            None, {name: inputs[name] for name in self._input_names}
+        )[0]
+        if self.pooling == "cls":
+            vectors = hidden[:, 0]
+        else:
+            vectors = mean_pool(hidden, inputs["attention_mask"])
+        if self.normalize:
+            vectors = normalize(vectors)
+        return vectors.tolist()
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed([query], prompt_name="query")[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._embed([text], prompt_name="text")[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._embed(texts, prompt_name="text")
+
+
+def load_onnx_embedding(settings: Dict[str, Any], **kwargs: Any) -> OnnxEmbedding:
+    """OnnxEmbedding configured by the `embedding` config section; `kwargs`
+    override model fields such as `embed_batch_size`."""
+    kwargs.setdefault(
+        "embed_batch_size", settings.get("onnx_batch_size", DEFAULT_EMBED_BATCH_SIZE)
+    )
+    return OnnxEmbedding(
+        settings["onnx_model_dir"],
+        quantized=settings.get("onnx_quantized", True),
+        threads=settings.get("onnx_threads", DEFAULT_THREADS),
+        **kwargs,
+    )
+
+
+def export_onnx_model(
+    model_name: str,
+    output_dir: str,
+    max_length: int = DEFAULT_MAX_LENGTH,
+    pooling: str = "mean",
+    quantize: bool = True,
+    query_instruction: Optional[str] = None,
+    text_instruction: Optional[str] = None,
+) -> str:
+    """Export a Hugging Face encoder to ONNX, optionally int8-quantized.
+
+    Needs `torch`, `transformers` and `onnx` besides onnxruntime; the
+    appliance itself only needs them on the machine doing the export.
+    The query and text prefixes default to the model's entry in
+    `MODEL_INSTRUCTIONS` ("" for none) and are saved with the graph.
+    Returns `output_dir`.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
+    model = AutoModel.from_pretrained(model_name, trust_remote_code=True).eval()
+    # tokenizer.json, which the tokenizers package loads without transformers
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(
+        ["An example sentence.", "Another"], padding=True, return_tensors="pt"
+    )
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "tokens"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "tokens"}
+    model_path = os.path.join(output_dir, MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+    if quantize:
+        # Weights stored as int8 per output channel; activations stay float
+        quantize_dynamic(
+            model_path,
+            os.path.join(output_dir, QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+
+    default_query, default_text = MODEL_INSTRUCTIONS.get(model_name, (None, None))
+    if query_instruction is None:
+        query_instruction = default_query
+    if text_instruction is None:
+        text_instruction = default_text
+    with open(os.path.join(output_dir, SETTINGS_FILE), "w") as f:
+        json.dump(
+            {
+                "model_name": model_name,
+                "pooling": pooling,
+                "max_length": max_length,
+                "query_instruction": query_instruction,
+                "text_instruction": text_instruction,
+            },
+            f,
+            indent=2,
+        )
+    logger.info(f"Exported {model_name} to {output_dir}")
+    return output_dir
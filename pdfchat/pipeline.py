@@ -0,0 +1,157 @@
+"""
+Bounded-queue stage pipeline for PDF Chat Appliance.
+
+Each stage runs in its own thread (or pool of threads) and hands its
+output to the next stage through a bounded queue. A slow stage
+(embedding, upserts) blocks the stages in front of it instead of letting
+their output pile up, so memory is bounded by the queue sizes rather
+than the input size.
+"""
+
+import logging
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 8
+# How often blocked puts and gets check whether the pipeline was stopped
+_POLL_INTERVAL = 0.1
+
+Stage = Callable[[Iterator[Any]], Iterator[Any]]
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries an exception from a stage to the stages after it."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(out: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Block until `item` is queued; False if the pipeline was stopped."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(source: queue.Queue, stop: threading.Event) -> Iterator[Any]:
+    """Yield items from a queue until the upstream stage finishes."""
+    while not stop.is_set():
+        try:
+            item = source.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
+
+
+class _Workers:
+    """Counts the live workers of a stage so the last one signals completion."""
+
+    def __init__(self, count: int, readers: int):
+        self.count = count
+        self.readers = readers
+        self._lock = threading.Lock()
+
+    def finish(self) -> bool:
+        """Mark one worker finished; True for the last one."""
+        with self._lock:
+            self.count -= 1
+            return self.count == 0
+
+
+def _feed(
+    produce: Callable[[], Iterator[Any]],
+    out: queue.Queue,
+    workers: _Workers,
+    stop: threading.Event,
+) -> None:
+    """Run one stage worker, forwarding its items or error downstream."""
+    items = None
+    try:
+        items = produce()
+        for item in items:
+            if not _put(out, item, stop):
+                return
+    except Exception as e:
+        _put(out, _Failure(e), stop)
+    finally:
+        # Let generators release what they hold (pools, file handles) promptly
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()
+        # Every reader of the next queue stops at its first _DONE
+        if workers.finish():
+            for _ in range(workers.readers):
+                _put(out, _DONE, stop)
+
+
+def run_pipeline(
+    source: Iterable[Any],
+    stages: Sequence[Stage],
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    workers: Optional[Sequence[int]] = None,
+) -> Iterator[Any]:
+    """Stream `source` through `stages`, each running in its own threads.
+
+    A stage is a function from an iterator of inputs to an iterator of
+    outputs, so it can batch, filter or fan out items. `workers` gives
+    the number of threads running each stage (one by default); every
+    thread runs its own call of the stage function over a share of the
+    inputs, so item order is only kept by single-threaded stages. At
+    most `queue_size` items wait between any two stages. The first
+    exception raised by the source or a stage is re-raised to the
+    consumer, and closing the returned generator early stops every stage.
+    """
+    workers = list(workers or [1] * len(stages))
+    if len(workers) != len(stages) or min(workers, default=1) < 1:
+        raise ValueError("workers needs a positive thread count per stage")
+
+    stop = threading.Event()
+    queues: List[queue.Queue] = [
+        queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)
+    ]
+    # The source is a single iterator, so it always gets one thread
+    counts = [1, *workers]
+    readers = [*workers, 1]
+    producers: List[Callable[[], Iterator[Any]]] = [lambda: iter(source)]
+    for stage, inbox in zip(stages, queues):
+        producers.append(
+            lambda stage=stage, inbox=inbox: stage(_drain(inbox, stop))
+        )
+
+    threads = []
+    for i, (produce, out) in enumerate(zip(producers, queues)):
+        live = _Workers(counts[i], readers[i])
+        threads.extend(
+            threading.Thread(
+                target=_feed,
+                args=(produce, out, live, stop),
+                name=f"pipeline-stage-{i}-{n}",
+                daemon=True,
+            )
+            for n in range(counts[i])
+        )
+
+    def consume() -> Iterator[Any]:
+        for thread in threads:
+            thread.start()
+        try:
+            yield from _drain(queues[-1], stop)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    return consume()
@@ -0,0 +1,106 @@
+"""
+Query embedding micro-batcher for PDF Chat Appliance.
+
+Queries that arrive within a few milliseconds of each other are embedded
+in a single batched model call. Batched transformer inference on CPU is
+several times cheaper per item than one forward pass per request.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = 16
+DEFAULT_MAX_WAIT_MS = 5.0
+
+EmbedBatchFn = Callable[[List[str]], List[List[float]]]
+
+
+class QueryEmbeddingBatcher:
+    """Collects concurrent query embedding requests into batches.
+
+    A batch is flushed when it reaches `max_batch_size` or when the
+    oldest pending query has waited `max_wait_ms`. Must be used from a
+    single event loop; the blocking `embed_batch` call runs in `executor`
+    (the loop's default executor if None).
+    """
+
+    def __init__(
+        self,
+        embed_batch: EmbedBatchFn,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        executor: Optional[Executor] = None,
+    ):
+        """Create a batcher around a blocking batch embedding function."""
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.executor = executor
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+
+    async def embed(self, query: str) -> List[float]:
+        """Embed one query, sharing a model call with concurrent queries."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def metrics(self) -> Dict[str, Any]:
+        """Batch counts and sizes."""
+        return {
+            "batches": self._batches,
+            "queries": self._items,
+            "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "pending": len(self._pending),
+        }
+
+    def _flush(self) -> None:
+        """Start embedding everything pending as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that gave up (disconnect, timeout) are not embedded
+        batch = [(query, future) for query, future in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Embed a batch in the executor and resolve its futures."""
+        self._batches += 1
+        self._items += len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+        queries = [query for query, _ in batch]
+        try:
+            embeddings = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.embed_batch, queries
+            )
+        except Exception as e:
+            logger.warning(f"Batched query embedding failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
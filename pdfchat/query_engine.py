@@ -0,0 +1,107 @@
+"""
+Long-lived query engine registry for PDF Chat Appliance.
+
+Owns the loaded vector index for the lifetime of the server process so
+that `/query` requests only pay for retrieval and generation, not for
+rebuilding the storage context and index on every call.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from llama_index.core.vector_stores.types import MetadataFilter, MetadataFilters
+
+logger = logging.getLogger(__name__)
+
+
+def section_filter(section: str) -> MetadataFilters:
+    """Filter matching the chunks of a section and of its subsections."""
+    # Chunks list the labels of their section and its ancestors
+    return MetadataFilters(filters=[MetadataFilter(key="sections", value=section)])
+
+
+@dataclass
+class _IndexSnapshot:
+    """Immutable view of the index and the engines built from it."""
+
+    index: Any
+    generation: int
+    engines: Dict[Tuple[int, str, bool, Optional[str]], Any] = field(
+        default_factory=dict
+    )
+
+
+class QueryEngineRegistry:
+    """Process-wide registry of query engines keyed by retrieval settings."""
+
+    def __init__(self, ingestion):
+        """Initialize the registry for the given ingestion pipeline."""
+        self.ingestion = ingestion
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_IndexSnapshot] = None
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Index generation, bumped every time the index is swapped."""
+        return self._generation
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether an index is currently loaded."""
+        return self._snapshot is not None
+
+    def refresh(self) -> None:
+        """Load the index from storage and atomically swap it in."""
+        # Build outside the lock so in-flight queries keep using the old index
+        index = self.ingestion.load_existing_index()
+        with self._lock:
+            self._generation += 1
+            self._snapshot = _IndexSnapshot(index=index, generation=self._generation)
+        logger.info(f"Query index loaded (generation {self._generation})")
+
+    def try_refresh(self) -> bool:
+        """Refresh the index, logging instead of raising on failure."""
+        try:
+            self.refresh()
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load query index: {e}")
+            return False
+
+    def get_query_engine(
+        self,
+        similarity_top_k: int = 5,
+        response_mode: str = "compact",
+        streaming: bool = False,
+        section: Optional[str] = None,
+    ):
+        """Return a cached query engine for the given retrieval settings.
+
+        With `section` (a section label such as "Installation > Network"),
+        retrieval only considers chunks in that section and its subsections.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh()
+            snapshot = self._snapshot
+
+        key = (similarity_top_k, response_mode, streaming, section)
+        engine = snapshot.engines.get(key)
+        if engine is None:
+            with self._lock:
+                engine = snapshot.engines.get(key)
+                if engine is None:
+                    options = {}
+                    if section is not None:
+                        options["filters"] = section_filter(section)
+                    engine = snapshot.index.as_query_engine(
+                        similarity_top_k=similarity_top_k,
+                        response_mode=response_mode,
+                        streaming=streaming,
+                        **options,
+                    )
+                    snapshot.engines[key] = engine
+        return engine
@@ -0,0 +1,85 @@
+"""
+Vectorized exact nearest-neighbour search for PDF Chat Appliance.
+
+Brute-force cosine search over a (possibly memory-mapped) embedding
+matrix. Rows are scanned in fixed-size blocks so peak memory stays
+bounded regardless of corpus size, and only the per-block top-k
+candidates are kept between blocks.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Rows scored per block; 64K rows x 768 dims is ~200 MB of float32 reads
+DEFAULT_BLOCK_ROWS = 65536
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return L2-normalized float32 copies of one or more vectors."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores per row, best first."""
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def exact_top_k(
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    mask: Optional[np.ndarray] = None,
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the k rows of `matrix` with the highest dot product per query.
+
+    Rows of `matrix` and the queries are expected to be L2-normalized, so
+    the dot product is the cosine similarity. Rows where `mask` is False
+    are never returned.
+
+    Returns:
+        (rows, scores) arrays of shape (num_queries, k'), best first, where
+        k' is k capped at the number of eligible rows. A single 1-D query
+        yields 1-D results.
+    """
+    single = np.ndim(queries) == 1
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    num_rows = matrix.shape[0]
+    eligible = num_rows if mask is None else int(mask.sum())
+    k = min(k, eligible)
+
+    best_rows = np.empty((queries.shape[0], 0), dtype=np.int64)
+    best_scores = np.empty((queries.shape[0], 0), dtype=np.float32)
+    if k > 0:
+        for start in range(0, num_rows, block_rows):
+            end = min(start + block_rows, num_rows)
+            scores = queries @ np.asarray(matrix[start:end]).T
+            if mask is not None:
+                block_mask = mask[start:end]
+                if not block_mask.any():
+                    continue
+                scores[:, ~block_mask] = -np.inf
+
+            local = _top_k(scores, min(k, end - start))
+            best_rows = np.concatenate([best_rows, local + start], axis=1)
+            best_scores = np.concatenate(
+                [best_scores, np.take_along_axis(scores, local, axis=1)], axis=1
+            )
+
+            # Keep only the running top-k between blocks
+            keep = _top_k(best_scores, min(k, best_scores.shape[1]))
+            best_rows = np.take_along_axis(best_rows, keep, axis=1)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+    if single:
+        return best_rows[0], best_scores[0]
+    return best_rows, best_scores
@@ -19,6 +19,7 @@ from werkzeug.exceptions import BadRequest
 # Qdrant client import removed as it was unused
 from .config import Config
 from .ingestion import PDFIngestion
+from .query_engine import QueryEngineRegistry
 
 # Import chat history if available
 try:
@@ -43,6 +44,7 @@ class QueryServer:
         self.config = config
         self.app = Flask(__name__)
         self.ingestion = PDFIngestion(config)
+        self.query_engines = QueryEngineRegistry(self.ingestion)
         self.chat_db: Optional[MemoryAPI] = None
 
         # Initialize chat history if available
@@ -53,6 +55,9 @@ class QueryServer:
             except Exception as e:
                 logger.warning(f"Failed to initialize chat history: {e}")
 
+        # Build the query index once at startup
+        self.query_engines.try_refresh()
+
         # Setup routes
         self._setup_routes()
 
@@ -129,11 +134,8 @@ class QueryServer:
                 signal.alarm(45)  # 45 second timeout
 
             try:
-                # Load existing index
-                index = self.ingestion.load_existing_index()
-
-                # Create query engine
-                query_engine = index.as_query_engine(
+                # Reuse the long-lived query engine for these settings
+                query_engine = self.query_engines.get_query_engine(
                     similarity_top_k=max_results,
                     response_mode="compact",
                 )
@@ -234,6 +236,7 @@ For specific implementation details, I recommend consulting the official documen
 
             # Process the ingestion
             self.ingestion.ingest_pdfs()
+            self.query_engines.try_refresh()
 
             return jsonify({"status": "success", "message": "Documents ingested successfully"})
 
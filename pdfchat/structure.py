@@ -0,0 +1,157 @@
+"""
+Document section structure for PDF Chat Appliance.
+
+Headings come from the PDF outline (table of contents) when the document
+has one, and otherwise from its typography: blocks set noticeably larger
+than the page's body text, or short standalone bold lines. Walking the
+pages in order, each heading closes the sections at its level and below,
+which gives every stretch of text a section path such as
+("Installation", "Network Setup").
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+
+# Joins a section path into one label, e.g. "Installation > Network Setup"
+SECTION_SEPARATOR = " > "
+
+# A heading is set at least this much larger than the body text...
+HEADING_SCALE = 1.15
+# ...and these ratios make it a chapter (level 1) or section (level 2)
+LEVEL_SCALES = (1.6, 1.3)
+MAX_HEADING_CHARS = 120
+MAX_HEADING_LINES = 3
+
+# PyMuPDF span flag of bold fonts
+_BOLD = 1 << 4
+
+
+class Heading(NamedTuple):
+    """A heading and its character offset in the page text."""
+
+    level: int
+    title: str
+    offset: int
+
+
+class Section(NamedTuple):
+    """A [start, end) stretch of page text and the section path it is under."""
+
+    start: int
+    end: int
+    path: Tuple[str, ...]
+
+
+def section_label(path: Sequence[str]) -> str:
+    """One-string label of a section path."""
+    return SECTION_SEPARATOR.join(path)
+
+
+def section_labels(path: Sequence[str]) -> List[str]:
+    """Labels of a section and each of its ancestors, outermost first.
+
+    Stored with every chunk so that filtering on a section's label also
+    matches everything in its subsections.
+    """
+    return [section_label(path[:depth]) for depth in range(1, len(path) + 1)]
+
+
+def _title_pattern(title: str) -> "re.Pattern[str]":
+    # Headings may wrap or change case between the outline and the page
+    return re.compile(r"\s+".join(map(re.escape, title.split())), re.IGNORECASE)
+
+
+def outline_headings(
+    entries: Iterable[Sequence[Any]], text: str
+) -> Tuple[Heading, ...]:
+    """Headings of one page from its outline entries, (level, title, page) lists.
+
+    A title that cannot be found in the text starts its section where the
+    previous heading of the page did (the top of the page for the first).
+    """
+    headings = []
+    cursor = 0
+    for level, title, *_ in entries:
+        title = " ".join(str(title).split())
+        if not title:
+            continue
+        match = _title_pattern(title).search(text, cursor)
+        if match is not None:
+            cursor = match.start()
+        headings.append(Heading(int(level), title, cursor))
+    return tuple(headings)
+
+
+def font_headings(page_dict: Dict[str, Any], text: str) -> Tuple[Heading, ...]:
+    """Headings of one page found from font sizes and weights.
+
+    `page_dict` is PyMuPDF's `page.get_text("dict")` output. The body
+    size is the size most of the page's characters are set in.
+    """
+    blocks = []
+    sizes: Counter = Counter()
+    for block in page_dict.get("blocks", []):
+        lines = []
+        for line in block.get("lines", []):
+            spans = [s for s in line.get("spans", []) if s.get("text", "").strip()]
+            if spans:
+                lines.append(spans)
+                for span in spans:
+                    sizes[round(span["size"], 1)] += len(span["text"])
+        if lines:
+            blocks.append(lines)
+    if not sizes:
+        return ()
+    body = sizes.most_common(1)[0][0]
+
+    headings = []
+    cursor = 0
+    for lines in blocks:
+        if len(lines) > MAX_HEADING_LINES:
+            continue
+        spans = [span for line in lines for span in line]
+        size = min(span["size"] for span in spans)
+        bold = all(span["flags"] & _BOLD for span in spans)
+        title = " ".join(
+            " ".join("".join(span["text"] for span in line).split()) for line in lines
+        )
+        if len(title) > MAX_HEADING_CHARS or not any(c.isalpha() for c in title):
+            continue
+        if size >= body * HEADING_SCALE:
+            level = 1 + sum(size < body * scale for scale in LEVEL_SCALES)
+        elif bold and size >= body and len(lines) == 1 and title[-1] not in ".:;,":
+            # Below every heading set larger than the body text
+            level = len(LEVEL_SCALES) + 2
+        else:
+            continue
+        match = _title_pattern(title).search(text, cursor)
+        if match is None:
+            continue
+        cursor = match.start()
+        headings.append(Heading(level, title, cursor))
+    return tuple(headings)
+
+
+def assign_sections(records: Iterable[Any]) -> Iterator[Any]:
+    """Set `sections` on page records arriving in page order from their `headings`.
+
+    Sections carry across pages until a heading of the same or a higher
+    level ends them. Records without headings get one section, holding
+    the path in force at the top of the page.
+    """
+    stack: List[Heading] = []
+    for record in records:
+        path = tuple(h.title for h in stack)
+        sections = []
+        start = 0
+        for heading in sorted(record.headings or (), key=lambda h: h.offset):
+            if heading.offset > start:
+                sections.append(Section(start, heading.offset, path))
+                start = heading.offset
+            while stack and stack[-1].level >= heading.level:
+                stack.pop()
+            stack.append(heading)
+            path = tuple(h.title for h in stack)
+        sections.append(Section(start, len(record.text), path))
+        yield record._replace(sections=tuple(sections))
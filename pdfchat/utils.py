@@ -4,6 +4,7 @@ Utility functions for PDF Chat Appliance.
 This module provides shared helper functions used across the application.
 """
 
+import hashlib
 import json
 import os
 from pathlib import Path
@@ -53,3 +54,19 @@ def format_response(response: str, max_length: Optional[int] = None) -> str:
     if max_length and len(response) > max_length:
         return response[:max_length] + "..."
     return response
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 hex digest of a file, reading it in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stable_file_id(path: str) -> str:
+    """Derive a deterministic document id from a file's absolute path."""
+    abs_path = os.path.abspath(path)
+    path_hash = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:12]
+    return f"{Path(abs_path).stem}_{path_hash}"
@@ -0,0 +1,657 @@
+"""
+Durable on-disk vector store for PDF Chat Appliance.
+
+Embeddings are kept L2-normalized in a single contiguous float32 file
+that is opened with mmap, so a restart reopens a large corpus without
+reading it into RAM. Node text and metadata live in a SQLite side table that also maps
+node ids to matrix rows.
+"""
+
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import (
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+
+from .ann_index import IVFIndex
+from .search import DEFAULT_BLOCK_ROWS, exact_top_k, normalize
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in other processes are not excluded
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Matrix file of a store that was never compacted; compaction writes a new
+# file and switches to it in the same SQLite commit that renumbers the rows
+EMBEDDINGS_FILE = "embeddings.f32"
+NODES_DB = "nodes.db"
+ANN_INDEX_FILE = "ann_index.npz"
+LOCK_FILE = "write.lock"
+
+# Retrain the IVF quantizer once the corpus outgrows its training set
+RETRAIN_GROWTH_FACTOR = 4
+# Filters selecting fewer rows than this many times the rows of the probed
+# lists are searched exactly over just those rows
+FILTERED_EXACT_FACTOR = 4
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    row INTEGER PRIMARY KEY,
+    node_id TEXT NOT NULL UNIQUE,
+    ref_doc_id TEXT,
+    text TEXT,
+    metadata TEXT,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_nodes_ref_doc_id ON nodes (ref_doc_id);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _filter_clause(filters: MetadataFilters) -> Tuple[str, List[Any]]:
+    """SQL condition on the metadata column for equality and membership filters.
+
+    As in Qdrant, a filter on a list field matches when any element
+    does, so chunks tagged with their ancestor `sections` labels can be
+    filtered by a whole subtree.
+    """
+    clauses = []
+    params: List[Any] = []
+    for item in filters.filters:
+        if isinstance(item, MetadataFilters):
+            clause, nested = _filter_clause(item)
+            clauses.append(f"({clause})")
+            params.extend(nested)
+            continue
+        if item.operator == FilterOperator.EQ:
+            values = [item.value]
+        elif item.operator in (FilterOperator.IN, FilterOperator.ANY):
+            values = list(item.value)
+        else:
+            raise ValueError(
+                f"Metadata filter operator {item.operator.value!r} is not supported"
+            )
+        placeholders = ",".join("?" * len(values))
+        # json_each yields a scalar field as its only element
+        clauses.append(
+            f"EXISTS (SELECT 1 FROM json_each(metadata, ?) "
+            f"WHERE value IN ({placeholders}))"
+        )
+        params.extend([f'$."{item.key}"', *values])
+    if not clauses:
+        return "1", []
+    joiner = " OR " if filters.condition == FilterCondition.OR else " AND "
+    return joiner.join(clauses), params
+
+
+class _Snapshot(NamedTuple):
+    """One consistent state of the store for a search running unlocked."""
+
+    num_rows: int
+    matrix: np.ndarray
+    live: np.ndarray
+    ann: Optional[IVFIndex]
+    generation: int
+
+
+def _fit_mask(mask: np.ndarray, num_rows: int) -> np.ndarray:
+    """Cut or pad (with False) a row mask to `num_rows` rows."""
+    if len(mask) >= num_rows:
+        return mask[:num_rows]
+    return np.concatenate([mask, np.zeros(num_rows - len(mask), dtype=bool)])
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """Vector store backed by a memory-mapped float32 embedding matrix."""
+
+    stores_text: bool = True
+    persist_path: str
+    block_rows: int = DEFAULT_BLOCK_ROWS
+    indexing_threshold: int = 10000
+    nprobe: int = 8
+
+    _conn: sqlite3.Connection = PrivateAttr()
+    _lock: Any = PrivateAttr()
+    _dim: Optional[int] = PrivateAttr(default=None)
+    _num_rows: int = PrivateAttr(default=0)
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _live: Optional[np.ndarray] = PrivateAttr(default=None)
+    _ann: Optional[IVFIndex] = PrivateAttr(default=None)
+    _embeddings_file: str = PrivateAttr(default=EMBEDDINGS_FILE)
+    _lock_file: Any = PrivateAttr(default=None)
+    _lock_depth: int = PrivateAttr(default=0)
+    # Bumped whenever rows are renumbered (compaction)
+    _generation: int = PrivateAttr(default=0)
+
+    def __init__(self, persist_path: str, **kwargs: Any) -> None:
+        """Open (or create) the store under the given directory."""
+        super().__init__(persist_path=persist_path, **kwargs)
+        os.makedirs(persist_path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            os.path.join(persist_path, NODES_DB), check_same_thread=False
+        )
+        self._conn.executescript(_SCHEMA)
+        self._lock_file = open(os.path.join(persist_path, LOCK_FILE), "a")
+        with self._write_lock():
+            self._load_state()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> Any:
+        """Get client."""
+        return self._conn
+
+    @property
+    def dim(self) -> Optional[int]:
+        """Embedding dimension, or None while the store is empty."""
+        return self._dim
+
+    @property
+    def num_rows(self) -> int:
+        """Number of rows in the embedding matrix, including tombstones."""
+        return self._num_rows
+
+    @property
+    def num_vectors(self) -> int:
+        """Number of live (non-deleted) vectors."""
+        return int(self._live_mask().sum()) if self._num_rows else 0
+
+    @property
+    def _embeddings_path(self) -> str:
+        return os.path.join(self.persist_path, self._embeddings_file)
+
+    @property
+    def _ann_path(self) -> str:
+        return os.path.join(self.persist_path, ANN_INDEX_FILE)
+
+    @property
+    def ann_index(self) -> Optional[IVFIndex]:
+        """The IVF index, if the store has been indexed."""
+        return self._ann
+
+    def reload(self) -> None:
+        """Pick up rows added or deleted by other processes since opening."""
+        with self._lock:
+            self._load_state(repair=False)
+
+    def _load_state(self, repair: bool = True) -> None:
+        """Read dimension, row count and matrix file; `repair` trims partially
+        written rows and removes matrix files left by interrupted compactions."""
+        row = self._conn.execute(
+            "SELECT value FROM store_meta WHERE key = 'dim'"
+        ).fetchone()
+        self._dim = int(row[0]) if row else None
+        self._num_rows = self._conn.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM nodes"
+        ).fetchone()[0]
+        self._embeddings_file = self._stored_embeddings_file()
+
+        if repair:
+            for path in glob.glob(os.path.join(self.persist_path, "embeddings*.f32")):
+                if path != self._embeddings_path:
+                    os.remove(path)
+        if repair and self._dim is not None and os.path.exists(self._embeddings_path):
+            expected = self._num_rows * self._dim * 4
+            if os.path.getsize(self._embeddings_path) > expected:
+                # Rows written without a matching commit (e.g. crash mid-add)
+                with open(self._embeddings_path, "r+b") as f:
+                    f.truncate(expected)
+        self._invalidate()
+        # Another process may have compacted the store and renumbered its rows
+        self._generation += 1
+
+        self._ann = None
+        if os.path.exists(self._ann_path):
+            ann = IVFIndex.load(self._ann_path)
+            if ann.indexed_rows <= self._num_rows:
+                # Rows added after the last save are cheap to re-assign
+                ann.add(self.matrix(), block_rows=self.block_rows)
+                self._ann = ann
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Exclude writers in this and in other processes that share the
+        directory, so rows are appended to the matrix one batch at a time."""
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _stored_embeddings_file(self) -> str:
+        row = self._conn.execute(
+            "SELECT value FROM store_meta WHERE key = 'embeddings_file'"
+        ).fetchone()
+        return row[0] if row else EMBEDDINGS_FILE
+
+    def _catch_up(self) -> None:
+        """Reload if another process committed rows or compacted the store."""
+        rows = self._conn.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM nodes"
+        ).fetchone()[0]
+        if (
+            rows != self._num_rows
+            or self._stored_embeddings_file() != self._embeddings_file
+        ):
+            self._load_state(repair=False)
+
+    def _snapshot(self) -> _Snapshot:
+        """Row count, matrix, live mask and index of the current state.
+
+        The matrix is a view of exactly `num_rows` rows, so masks sized to
+        it stay valid while other threads add rows.
+        """
+        with self._lock:
+            return _Snapshot(
+                self._num_rows,
+                self.matrix(),
+                self._live_mask(),
+                self._ann,
+                self._generation,
+            )
+
+    def _invalidate(self) -> None:
+        self._matrix = None
+        self._live = None
+
+    def matrix(self) -> np.ndarray:
+        """Return the embedding matrix as a read-only memory map."""
+        with self._lock:
+            if self._matrix is None:
+                if not self._num_rows:
+                    return np.empty((0, self._dim or 0), dtype=np.float32)
+                self._matrix = np.memmap(
+                    self._embeddings_path,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(self._num_rows, self._dim),
+                )
+            return self._matrix
+
+    def _live_mask(self) -> np.ndarray:
+        with self._lock:
+            if self._live is None:
+                live = np.ones(self._num_rows, dtype=bool)
+                deleted = self._conn.execute(
+                    "SELECT row FROM nodes WHERE deleted = 1"
+                ).fetchall()
+                if deleted:
+                    live[[r[0] for r in deleted]] = False
+                self._live = live
+            return self._live
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        """Append node embeddings to the matrix and their payload to the side table."""
+        if not nodes:
+            return []
+
+        # Rows are stored L2-normalized so search is a plain dot product
+        embeddings = normalize([node.get_embedding() for node in nodes])
+        with self._write_lock():
+            self._catch_up()
+            dim = self._dim
+            if dim is not None and embeddings.shape[1] != dim:
+                raise ValueError(
+                    f"Embedding dimension {embeddings.shape[1]} does not match "
+                    f"store dimension {dim}"
+                )
+
+            start = self._num_rows
+            try:
+                if dim is None:
+                    self._dim = embeddings.shape[1]
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO store_meta (key, value) "
+                        "VALUES ('dim', ?)",
+                        (str(self._dim),),
+                    )
+                # Re-adding a node id replaces it: tombstone the old row first
+                self._conn.executemany(
+                    "UPDATE nodes SET deleted = 1, node_id = node_id || ':' || row "
+                    "WHERE node_id = ?",
+                    [(node.node_id,) for node in nodes],
+                )
+
+                with open(self._embeddings_path, "ab") as f:
+                    # Drop bytes of an add that crashed before committing
+                    f.truncate(start * embeddings.shape[1] * 4)
+                    f.write(embeddings.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                rows = []
+                for offset, node in enumerate(nodes):
+                    metadata = node_to_metadata_dict(
+                        node, remove_text=True, flat_metadata=False
+                    )
+                    rows.append(
+                        (
+                            start + offset,
+                            node.node_id,
+                            node.ref_doc_id,
+                            node.get_content(),
+                            json.dumps(metadata),
+                        )
+                    )
+                self._conn.executemany(
+                    "INSERT INTO nodes (row, node_id, ref_doc_id, text, metadata) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+            except BaseException:
+                # Leave the store as it was, e.g. after a duplicate node id
+                self._conn.rollback()
+                self._dim = dim
+                if os.path.exists(self._embeddings_path):
+                    with open(self._embeddings_path, "r+b") as f:
+                        f.truncate(start * embeddings.shape[1] * 4)
+                raise
+            self._num_rows = start + len(nodes)
+            self._invalidate()
+            if self._ann is not None:
+                self._ann.add(self.matrix(), block_rows=self.block_rows)
+
+        logger.debug(f"Added {len(nodes)} vectors to {self.persist_path}")
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """Tombstone all nodes belonging to a source document."""
+        with self._write_lock():
+            self._catch_up()
+            self._conn.execute(
+                "UPDATE nodes SET deleted = 1 WHERE ref_doc_id = ?", (ref_doc_id,)
+            )
+            self._conn.commit()
+            self._live = None
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Any = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        """Tombstone individual nodes by id."""
+        if filters is not None:
+            raise NotImplementedError("Metadata filters are not supported")
+        if not node_ids:
+            return
+        with self._write_lock():
+            self._catch_up()
+            self._conn.executemany(
+                "UPDATE nodes SET deleted = 1 WHERE node_id = ?",
+                [(node_id,) for node_id in node_ids],
+            )
+            self._conn.commit()
+            self._live = None
+
+    def get_nodes(
+        self, node_ids: Optional[List[str]] = None, filters: Any = None
+    ) -> List[BaseNode]:
+        """Get live nodes by id, or all live nodes matching `filters`."""
+        if node_ids is None:
+            clause, params = _filter_clause(filters or MetadataFilters(filters=[]))
+            with self._lock:
+                found = self._conn.execute(
+                    f"SELECT text, metadata FROM nodes WHERE deleted = 0 "
+                    f"AND ({clause}) ORDER BY row",
+                    params,
+                ).fetchall()
+            return [self._to_node(text, meta) for text, meta in found]
+        if filters is not None:
+            raise NotImplementedError("Metadata filters with node ids are not supported")
+
+        placeholders = ",".join("?" * len(node_ids))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT node_id, text, metadata FROM nodes "
+                f"WHERE deleted = 0 AND node_id IN ({placeholders})",
+                node_ids,
+            )
+            found = {node_id: (text, meta) for node_id, text, meta in cursor}
+        return [self._to_node(*found[n]) for n in node_ids if n in found]
+
+    def _to_node(self, text: str, metadata: str) -> BaseNode:
+        return metadata_dict_to_node(json.loads(metadata), text=text)
+
+    def _nodes_for_rows(self, rows: List[int]) -> List[BaseNode]:
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT row, text, metadata FROM nodes WHERE row IN ({placeholders})",
+                rows,
+            )
+            found = {row: (text, meta) for row, text, meta in cursor}
+        return [self._to_node(*found[row]) for row in rows]
+
+    def _candidate_mask(self, query: VectorStoreQuery, num_rows: int) -> np.ndarray:
+        """Restrict the search to the requested documents, nodes or metadata.
+
+        Rows committed by other processes and not yet loaded (at or past
+        `num_rows`) are left out.
+        """
+        mask = np.zeros(num_rows, dtype=bool)
+        conditions = ["deleted = 0", "row < ?"]
+        params: List[Any] = [num_rows]
+        if query.doc_ids or query.node_ids:
+            if query.doc_ids:
+                column, values = "ref_doc_id", query.doc_ids
+            else:
+                column, values = "node_id", query.node_ids
+            conditions.append(f"{column} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+        if query.filters is not None:
+            clause, filter_params = _filter_clause(query.filters)
+            conditions.append(f"({clause})")
+            params.extend(filter_params)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT row FROM nodes WHERE {' AND '.join(conditions)}", params
+            ).fetchall()
+        mask[[r[0] for r in rows]] = True
+        return mask
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        mask: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None,
+    ) -> Tuple[List[int], List[float]]:
+        """Cosine top-k over live rows, returning (rows, scores).
+
+        Uses the IVF index once the store holds `indexing_threshold`
+        vectors and exact search below that. `nprobe` overrides the
+        configured recall/latency trade-off for one call.
+        """
+        return self._search(self._snapshot(), query_embedding, top_k, mask, nprobe)
+
+    def _search(
+        self,
+        snapshot: _Snapshot,
+        query_embedding: List[float],
+        top_k: int,
+        mask: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None,
+    ) -> Tuple[List[int], List[float]]:
+        """search() over a snapshot, without holding the lock."""
+        if not snapshot.num_rows:
+            return [], []
+        if mask is None:
+            mask = None if snapshot.live.all() else snapshot.live
+        else:
+            mask = _fit_mask(mask, snapshot.num_rows)
+
+        query = normalize(query_embedding)
+        ann = snapshot.ann
+        nprobe = nprobe or self.nprobe
+        if ann is not None and snapshot.live.sum() >= self.indexing_threshold:
+            eligible = np.flatnonzero(mask) if mask is not None else None
+            if (
+                eligible is not None
+                and len(eligible) <= FILTERED_EXACT_FACTOR * ann.probed_rows(nprobe)
+            ):
+                # The probed lists would hold few (or none) of the filtered rows
+                local, scores = exact_top_k(
+                    np.asarray(snapshot.matrix[eligible]), query, top_k
+                )
+                return eligible[local].tolist(), scores.tolist()
+            rows, scores = ann.search(
+                snapshot.matrix, query, top_k, nprobe=nprobe, mask=mask
+            )
+        else:
+            rows, scores = exact_top_k(
+                snapshot.matrix, query, top_k, mask=mask, block_rows=self.block_rows
+            )
+        return rows.tolist(), scores.tolist()
+
+    def update_ann_index(self, force: bool = False) -> bool:
+        """Build, extend or retrain the IVF index and persist it.
+
+        Does nothing below `indexing_threshold` unless forced. Returns
+        whether an index is available afterwards.
+        """
+        with self._write_lock():
+            self._catch_up()
+            if not self._num_rows or (
+                not force and self.num_vectors < self.indexing_threshold
+            ):
+                return self._ann is not None
+
+            ann = self._ann
+            if ann is None or self._num_rows >= RETRAIN_GROWTH_FACTOR * ann.trained_rows:
+                ann = IVFIndex.train(self.matrix(), nprobe=self.nprobe)
+            ann.add(self.matrix(), block_rows=self.block_rows)
+            ann.save(self._ann_path)
+            self._ann = ann
+            return True
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Return the top-k nodes by cosine similarity.
+
+        Metadata filters support equality and membership (`==`, `in`,
+        `any`) and narrow the candidate rows before the vector search.
+        """
+        if not self._num_rows or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        # Rows may be added while the search runs, so it works on a snapshot
+        restricted = query.doc_ids or query.node_ids or query.filters is not None
+        with self._lock:
+            snapshot = self._snapshot()
+            mask = self._candidate_mask(query, snapshot.num_rows) if restricted else None
+        rows, scores = self._search(
+            snapshot, query.query_embedding, query.similarity_top_k, mask=mask
+        )
+        if not rows:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        with self._lock:
+            if self._generation != snapshot.generation:
+                # Compaction renumbered the rows; search again holding the lock
+                return self.query(query, **kwargs)
+            nodes = self._nodes_for_rows(rows)
+        return VectorStoreQueryResult(
+            nodes=nodes,
+            similarities=scores,
+            ids=[node.node_id for node in nodes],
+        )
+
+    def compact(self) -> None:
+        """Rewrite the matrix without tombstoned rows.
+
+        The live rows go to a new matrix file, and the row renumbering and
+        the switch to that file are one SQLite commit, so a crash leaves
+        either the old rows and file or the new ones.
+        """
+        with self._write_lock():
+            self._catch_up()
+            # Rows deleted by other processes are tombstoned too
+            self._live = None
+            live_rows = np.flatnonzero(self._live_mask())
+            if len(live_rows) == self._num_rows:
+                return
+
+            old_path = self._embeddings_path
+            new_file = f"embeddings.{uuid.uuid4().hex[:12]}.f32"
+            new_path = os.path.join(self.persist_path, new_file)
+            try:
+                with open(new_path, "wb") as f:
+                    if len(live_rows):
+                        np.asarray(self.matrix()[live_rows]).tofile(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                with self._conn:
+                    self._conn.execute("DELETE FROM nodes WHERE deleted = 1")
+                    self._conn.executemany(
+                        "UPDATE nodes SET row = ? WHERE row = ?",
+                        [(new, int(old)) for new, old in enumerate(live_rows)],
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO store_meta (key, value) "
+                        "VALUES ('embeddings_file', ?)",
+                        (new_file,),
+                    )
+            except BaseException:
+                if os.path.exists(new_path):
+                    os.remove(new_path)
+                raise
+            self._embeddings_file = new_file
+            # Open maps of the old file stay readable after it is removed
+            if os.path.exists(old_path):
+                os.remove(old_path)
+            self._num_rows = len(live_rows)
+            self._invalidate()
+            self._generation += 1
+
+            # Row ids changed, so the IVF lists are stale
+            if os.path.exists(self._ann_path):
+                os.remove(self._ann_path)
+            if self._ann is not None:
+                self._ann = None
+                self.update_ann_index()
+        logger.info(f"Compacted vector store to {self._num_rows} rows")
+
+
+def open_local_vector_store(config, name: str = "vectors") -> MmapVectorStore:
+    """Open the appliance's local vector store `name` under `config.persist_dir`."""
+    vector_db = getattr(config, "vector_db", None) or {}
+    return MmapVectorStore(
+        os.path.join(config.persist_dir, name),
+        indexing_threshold=vector_db.get("indexing_threshold", 10000),
+        nprobe=vector_db.get("nprobe", 8),
+    )
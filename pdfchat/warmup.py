@@ -0,0 +1,162 @@
+"""
+Startup warm-up and readiness for PDF Chat Appliance.
+
+After a restart the first query would otherwise pay for loading the
+embedding model, opening the vector store and having Ollama load the
+LLM. `Warmup` runs those steps on a background thread when the server
+starts and records the state and timing of each one, so a readiness
+probe can keep traffic away from a replica until it is warm while the
+liveness check keeps answering. Steps that fail (Ollama still starting,
+say) are retried until they succeed or the server shuts down.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_INTERVAL = 10.0
+DEFAULT_LLM_TIMEOUT = 120.0
+DEFAULT_KEEP_ALIVE = "30m"
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def ollama_generate(
+    base_url: str,
+    model: str,
+    timeout: float = DEFAULT_LLM_TIMEOUT,
+    keep_alive: str = DEFAULT_KEEP_ALIVE,
+) -> None:
+    """Ask Ollama for a one-token completion, which loads `model` into
+    memory and keeps it there for `keep_alive`."""
+    response = requests.post(
+        f"{base_url.rstrip('/')}/api/generate",
+        json={
+            "model": model,
+            "prompt": "ping",
+            "stream": False,
+            "keep_alive": keep_alive,
+            "options": {"num_predict": 1},
+        },
+        timeout=timeout,
+    )
+    response.raise_for_status()
+
+
+@dataclass
+class _Component:
+    """Warm-up step of one component and the outcome of its last attempt."""
+
+    step: Optional[Callable[[], Any]]
+    state: str = PENDING
+    seconds: Optional[float] = None
+    attempts: int = 0
+    error: Optional[str] = None
+
+
+class Warmup:
+    """Warms server components in order and reports their readiness."""
+
+    def __init__(self, retry_interval: float = DEFAULT_RETRY_INTERVAL):
+        """Create an empty warm-up; failed steps are retried every
+        `retry_interval` seconds."""
+        self.retry_interval = retry_interval
+        self._components: Dict[str, _Component] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def add(self, name: str, step: Optional[Callable[[], Any]]) -> None:
+        """Register a component; with no `step` it is reported as skipped."""
+        self._components[name] = _Component(
+            step=step, state=PENDING if step is not None else SKIPPED
+        )
+
+    @property
+    def ready(self) -> bool:
+        """Whether every component is warm or skipped."""
+        with self._lock:
+            return self._all_ready()
+
+    def start(self) -> None:
+        """Run the warm-up on a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.run, name="warmup", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop retrying failed steps after the current pass."""
+        self._stop.set()
+
+    def run(self) -> bool:
+        """Warm every component, retrying failures until they succeed or
+        `stop()` is called. Returns whether all components are ready."""
+        self._started = time.perf_counter()
+        while True:
+            for name, component in self._components.items():
+                if component.state in (PENDING, FAILED):
+                    self._warm(name, component)
+            with self._lock:
+                if self._all_ready():
+                    self._finished = time.perf_counter()
+                    logger.info(
+                        f"Warm-up finished in {self._finished - self._started:.1f}s"
+                    )
+                    return True
+            if self._stop.wait(self.retry_interval):
+                return False
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness, total warm-up time and the state of each component."""
+        with self._lock:
+            total = None
+            if self._started is not None and self._finished is not None:
+                total = self._finished - self._started
+            return {
+                "ready": self._all_ready(),
+                "warmup_seconds": total,
+                "components": {
+                    name: {
+                        "state": component.state,
+                        "seconds": component.seconds,
+                        "attempts": component.attempts,
+                        "error": component.error,
+                    }
+                    for name, component in self._components.items()
+                },
+            }
+
+    def _warm(self, name: str, component: _Component) -> None:
+        with self._lock:
+            component.state = WARMING
+            component.attempts += 1
+        start = time.perf_counter()
+        try:
+            component.step()
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed: {e}")
+            state, error = FAILED, str(e)
+        else:
+            logger.info(f"Warmed {name} in {time.perf_counter() - start:.1f}s")
+            state, error = READY, None
+        with self._lock:
+            component.state = state
+            component.error = error
+            component.seconds = time.perf_counter() - start
+
+    def _all_ready(self) -> bool:
+        return all(c.state in (READY, SKIPPED) for c in self._components.values())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+ANN Recall Benchmark for PDF Chat Appliance
+Compares IVF approximate search against exact search for several nprobe values
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Mandatory .venv activation check
+if "venv" not in sys.executable:
+    raise RuntimeError("VENV NOT ACTIVATED. Please activate `.venv` before running this script.")
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdfchat.ann_index import IVFIndex, recall_at_k
+from pdfchat.search import exact_top_k, normalize
+from pdfchat.vector_store import MmapVectorStore
+
+
+def synthetic_corpus(rows: int, dim: int, clusters: int = 64, seed: int = 0):
+    """Clustered random unit vectors, roughly shaped like chunk embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    labels = rng.integers(0, clusters, rows)
+    return normalize(centers[labels] + 0.5 * rng.standard_normal((rows, dim)))
+
+
+def time_per_query(search, queries) -> float:
+    """Average wall-clock milliseconds per query"""
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    """Run the recall/latency benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark IVF recall and latency against exact search"
+    )
+    parser.add_argument("--store", help="Vector store directory (default: synthetic)")
+    parser.add_argument("--rows", type=int, default=200000, help="Synthetic rows")
+    parser.add_argument("--dim", type=int, default=768, help="Synthetic dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument(
+        "--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64]
+    )
+    parser.add_argument("--output", default="logs/perf", help="Results directory")
+    args = parser.parse_args()
+
+    if args.store:
+        matrix = MmapVectorStore(args.store).matrix()
+        source = args.store
+    else:
+        matrix = synthetic_corpus(args.rows, args.dim)
+        source = f"synthetic {args.rows}x{args.dim}"
+
+    rng = np.random.default_rng(1)
+    picks = rng.choice(matrix.shape[0], args.queries, replace=False)
+    queries = normalize(
+        np.asarray(matrix[np.sort(picks)]) + 0.1 * rng.standard_normal((args.queries, matrix.shape[1]))
+    )
+
+    print(f"Corpus: {source} ({matrix.shape[0]} rows)")
+    start = time.perf_counter()
+    index = IVFIndex.train(matrix)
+    index.add(matrix)
+    print(f"Built IVF index with {index.nlist} lists in {time.perf_counter() - start:.2f}s")
+
+    exact_ms = time_per_query(lambda q: exact_top_k(matrix, q, args.k), queries)
+    print(f"exact        recall=1.000  {exact_ms:8.2f} ms/query")
+
+    results = {"source": source, "rows": int(matrix.shape[0]), "nlist": index.nlist,
+               "k": args.k, "exact_ms": exact_ms, "ivf": []}
+    for nprobe in args.nprobe:
+        recall = recall_at_k(matrix, queries, index, k=args.k, nprobe=nprobe)
+        ivf_ms = time_per_query(
+            lambda q, n=nprobe: index.search(matrix, q, args.k, nprobe=n), queries
+        )
+        results["ivf"].append({"nprobe": nprobe, "recall": recall, "ms": ivf_ms})
+        print(f"nprobe={nprobe:<5} recall={recall:.3f}  {ivf_ms:8.2f} ms/query")
+
+    os.makedirs(args.output, exist_ok=True)
+    results_file = os.path.join(
+        args.output, f"ann_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(results_file, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {results_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Chunking Benchmark for PDF Chat Appliance
+Compares the native token chunker (sequential and on a process pool)
+against llama-index's SentenceSplitter on speed and on how well chunks
+respect the token budget
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Mandatory .venv activation check
+if "venv" not in sys.executable:
+    raise RuntimeError("VENV NOT ACTIVATED. Please activate `.venv` before running this script.")
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core import Document
+from llama_index.core.node_parser import SentenceSplitter
+
+from pdfchat.chunking import (
+    DEFAULT_SEGMENT_CHARS,
+    DEFAULT_TOKENIZER,
+    ParallelChunker,
+    TokenChunker,
+    load_tokenizer,
+)
+from pdfchat.extraction import PAGE_SEPARATOR, extract_page_range, page_count
+
+_WORDS = (
+    "the vsan cluster datastore requires each host to contribute capacity and "
+    "cache devices before the witness appliance can be deployed configure the "
+    "management network vlan and verify the firmware version of every nic"
+).split()
+
+
+def synthetic_corpus(pages: int, seed: int = 0):
+    """Manual-like pages of sentences and paragraphs"""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(pages):
+        paragraphs = []
+        for _ in range(rng.integers(2, 6)):
+            sentences = [
+                " ".join(rng.choice(_WORDS, rng.integers(6, 30))).capitalize() + "."
+                for _ in range(rng.integers(2, 8))
+            ]
+            paragraphs.append(" ".join(sentences))
+        texts.append("\n\n".join(paragraphs))
+    return texts
+
+
+def pdf_corpus(docs_dir: str):
+    """Page texts of every PDF in a directory"""
+    texts = []
+    for name in sorted(os.listdir(docs_dir)):
+        if name.lower().endswith(".pdf"):
+            path = os.path.join(docs_dir, name)
+            result = extract_page_range(path, 0, page_count(path))
+            texts.extend(r.text for r in result.records)
+    return texts
+
+
+def measure(name, split, texts, tokenizer, chunk_size):
+    """Time a splitter over all texts and check its chunks against the budget"""
+    start = time.perf_counter()
+    chunks = [chunk for text in texts for chunk in split(text)]
+    seconds = time.perf_counter() - start
+
+    tokens = np.array([len(tokenizer.offsets(c)[0]) for c in chunks] or [0])
+    megabytes = sum(len(t) for t in texts) / (1024 * 1024)
+    result = {
+        "splitter": name,
+        "seconds": seconds,
+        "mb_per_second": megabytes / seconds if seconds else 0.0,
+        "chunks": len(chunks),
+        "mean_tokens": float(tokens.mean()),
+        "max_tokens": int(tokens.max()),
+        "over_budget": int((tokens > chunk_size).sum()),
+    }
+    print(
+        f"{name:<16} {seconds:8.2f}s  {result['mb_per_second']:7.2f} MB/s  "
+        f"{len(chunks):7d} chunks  mean={result['mean_tokens']:.0f} "
+        f"max={result['max_tokens']} over={result['over_budget']}"
+    )
+    return result
+
+
+def main():
+    """Run the chunking benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the native chunker against SentenceSplitter"
+    )
+    parser.add_argument("--docs", help="Directory of PDFs (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=2000, help="Synthetic pages")
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--tokenizer", default=DEFAULT_TOKENIZER)
+    parser.add_argument(
+        "--whole-document",
+        action="store_true",
+        help="Chunk each document as one text instead of page by page",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Parallel chunker processes")
+    parser.add_argument("--segment-chars", type=int, default=DEFAULT_SEGMENT_CHARS)
+    parser.add_argument("--output", default="logs/perf", help="Results directory")
+    args = parser.parse_args()
+
+    if args.docs:
+        texts = pdf_corpus(args.docs)
+        source = args.docs
+    else:
+        texts = synthetic_corpus(args.pages)
+        source = f"synthetic {args.pages} pages"
+    if args.whole_document:
+        texts = [PAGE_SEPARATOR.join(texts)]
+
+    tokenizer = load_tokenizer(args.tokenizer)
+    print(f"Corpus: {source} ({len(texts)} texts, {sum(map(len, texts))} chars)")
+    print(f"Budget counted with {tokenizer.name}")
+
+    native = TokenChunker(args.chunk_size, args.chunk_overlap, tokenizer=tokenizer)
+    parallel = ParallelChunker(
+        args.chunk_size,
+        args.chunk_overlap,
+        tokenizer_name=args.tokenizer,
+        workers=args.workers,
+        segment_chars=args.segment_chars,
+    )
+    sentence = SentenceSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+    )
+    results = {
+        "source": source,
+        "tokenizer": tokenizer.name,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "splitters": [
+            measure("native", native.split_text, texts, tokenizer, args.chunk_size),
+            measure("parallel", parallel.split_text, texts, tokenizer, args.chunk_size),
+            measure(
+                "SentenceSplitter",
+                lambda text: [
+                    n.text for n in sentence.get_nodes_from_documents([Document(text=text)])
+                ],
+                texts,
+                tokenizer,
+                args.chunk_size,
+            ),
+        ],
+    }
+
+    parallel.close()
+
+    os.makedirs(args.output, exist_ok=True)
+    results_file = os.path.join(
+        args.output,
+        f"chunking_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+    )
+    with open(results_file, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {results_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Embedding Batch Benchmark for PDF Chat Appliance
+Measures embeddings per second at a sweep of fixed batch sizes, then lets
+the adaptive batcher search for the best size, so each appliance class
+can be given a suitable starting `chunking.batch_size`
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Mandatory .venv activation check
+if "venv" not in sys.executable:
+    raise RuntimeError("VENV NOT ACTIVATED. Please activate `.venv` before running this script.")
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.embeddings.ollama import OllamaEmbedding
+
+from pdfchat.chunking import TokenChunker, load_tokenizer
+from pdfchat.embed_batcher import DEFAULT_IN_FLIGHT, AdaptiveBatcher
+from pdfchat.enterprise_ingestion import EMBED_MODEL_NAME
+from scripts.benchmark_chunking import pdf_corpus, synthetic_corpus
+
+
+def run(name, batcher, chunks):
+    """Embed every chunk once and report the throughput"""
+    start = time.perf_counter()
+    batcher.embed(chunks)
+    seconds = time.perf_counter() - start
+    result = {
+        "run": name,
+        "seconds": seconds,
+        "embeddings_per_second": len(chunks) / seconds if seconds else 0.0,
+        "final_batch_size": batcher.batch_size,
+        "batch_sizes": batcher.stats(),
+    }
+    print(
+        f"{name:<12} {seconds:8.2f}s  {result['embeddings_per_second']:8.1f} emb/s  "
+        f"final batch size {batcher.batch_size}"
+    )
+    return result
+
+
+def main():
+    """Run the embedding batch benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark embedding throughput per batch size"
+    )
+    parser.add_argument("--docs", help="Directory of PDFs (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=100, help="Synthetic pages")
+    parser.add_argument("--chunk-size", type=int, default=384)
+    parser.add_argument("--base-url", default="http://localhost:11434")
+    parser.add_argument("--model", default=EMBED_MODEL_NAME)
+    parser.add_argument(
+        "--sizes",
+        default="4,8,16,32,64,128",
+        help="Comma-separated fixed batch sizes to measure",
+    )
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_IN_FLIGHT)
+    parser.add_argument("--output", default="logs/perf", help="Results directory")
+    args = parser.parse_args()
+
+    texts = pdf_corpus(args.docs) if args.docs else synthetic_corpus(args.pages)
+    chunker = TokenChunker(args.chunk_size, 0, tokenizer=load_tokenizer("regex"))
+    chunks = [chunk for text in texts for chunk in chunker.split_text(text)]
+    model = OllamaEmbedding(model_name=args.model, base_url=args.base_url)
+    print(f"Embedding {len(chunks)} chunks with {args.model} at {args.base_url}")
+
+    # Load the model before timing anything
+    model.get_text_embedding_batch(chunks[:1])
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    runs = [
+        run(
+            f"fixed {size}",
+            AdaptiveBatcher(
+                model.get_text_embedding_batch,
+                batch_size=size,
+                min_batch_size=1,
+                max_batch_size=size,
+                in_flight=args.in_flight,
+                adaptive=False,
+            ),
+            chunks,
+        )
+        for size in sizes
+    ]
+    runs.append(
+        run(
+            "adaptive",
+            AdaptiveBatcher(
+                model.get_text_embedding_batch,
+                batch_size=min(sizes),
+                max_batch_size=max(sizes),
+                in_flight=args.in_flight,
+            ),
+            chunks,
+        )
+    )
+
+    os.makedirs(args.output, exist_ok=True)
+    results_file = os.path.join(
+        args.output,
+        f"embedding_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+    )
+    with open(results_file, "w") as f:
+        json.dump(
+            {"model": args.model, "chunks": len(chunks), "runs": runs}, f, indent=2
+        )
+    print(f"Results saved to: {results_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark for PDF Chat Appliance
+Measures, in fresh interpreters, how long the package modules take to
+import and how long the FastAPI server takes to construct and answer its
+first requests. Every run is appended to a JSON-lines history so that
+regressions show up as a change against earlier runs
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+# Mandatory .venv activation check
+if "venv" not in sys.executable:
+    raise RuntimeError("VENV NOT ACTIVATED. Please activate `.venv` before running this script.")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["pdfchat", "pdfchat.ingestion", "pdfchat.server", "pdfchat.fastapi_server"]
+# Libraries whose import alone costs seconds
+HEAVY_MODULES = ("llama_index", "torch", "qdrant_client")
+
+# Run in a child interpreter; prints one JSON object of timings in seconds
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "heavy": sorted(m for m in {heavy!r} if m in sys.modules),
+}}))
+"""
+
+_REQUEST_PROBE = """
+import json, time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+from pdfchat.config import Config
+from pdfchat.fastapi_server import FastAPIQueryServer
+timings = {{"import": time.perf_counter() - start}}
+server = FastAPIQueryServer(Config(docs_dir={docs!r}, persist_dir={store!r}))
+timings["construct"] = time.perf_counter() - start
+client = TestClient(server.app)
+client.get("/health")
+timings["first_health"] = time.perf_counter() - start
+client.get("/documents")
+timings["first_documents"] = time.perf_counter() - start
+if {query!r}:
+    client.post("/query", json={{"query": {query!r}}})
+    timings["first_query"] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def probe(code: str) -> dict:
+    """Run `code` in a fresh interpreter and parse its JSON output"""
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit() -> str:
+    """Current commit, to tell history entries apart"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_run(history_file: str):
+    """The last recorded run, if any"""
+    if not os.path.exists(history_file):
+        return None
+    with open(history_file) as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    """Run the startup benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark import and first-request latency"
+    )
+    parser.add_argument(
+        "--repeats", type=int, default=5, help="Fresh interpreters per probe"
+    )
+    parser.add_argument(
+        "--query", help="Also time a first /query (needs the model and LLM)"
+    )
+    parser.add_argument(
+        "--history",
+        default="logs/perf/startup_history.jsonl",
+        help="JSON-lines file every run is appended to",
+    )
+    args = parser.parse_args()
+
+    results = {"imports": {}, "requests": {}}
+    for module in MODULES:
+        code = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+        runs = [probe(code) for _ in range(args.repeats)]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        results["imports"][module] = {"seconds": seconds, "heavy": runs[0]["heavy"]}
+        print(f"import {module:<24} {seconds * 1000:8.0f} ms  loads {runs[0]['heavy']}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        code = _REQUEST_PROBE.format(
+            docs=os.path.join(tmp, "docs"),
+            store=os.path.join(tmp, "store"),
+            query=args.query or "",
+        )
+        runs = [probe(code) for _ in range(args.repeats)]
+    for step in runs[0]:
+        seconds = statistics.median(run[step] for run in runs)
+        results["requests"][step] = seconds
+        print(f"{step:<31} {seconds * 1000:8.0f} ms after start")
+
+    history_file = os.path.join(PROJECT_ROOT, args.history)
+    previous = previous_run(history_file)
+    if previous is not None:
+        print(f"Compared with {previous['commit']} ({previous['timestamp']}):")
+        for step, seconds in results["requests"].items():
+            before = previous["requests"].get(step)
+            if before:
+                print(f"  {step:<29} {(seconds - before) * 1000:+8.0f} ms")
+
+    os.makedirs(os.path.dirname(history_file), exist_ok=True)
+    with open(history_file, "a") as f:
+        record = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            **results,
+        }
+        f.write(json.dumps(record) + "\n")
+    print(f"Results appended to: {history_file}")
+
+
+if __name__ == "__main__":
+    main()
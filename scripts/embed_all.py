@@ -12,6 +12,7 @@ This script implements:
 - Memory usage tracking and token counting
 """
 
+import functools
 import logging
 import os
 import sys
@@ -33,10 +34,13 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import qdrant_client
 import yaml
 from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
-from llama_index.core.node_parser import SentenceSplitter
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 
+from pdfchat.chunking import TokenChunkSplitter, resolve_tokenizer
+from pdfchat.embedding_pool import EmbeddingPool, PooledEmbedding
+from pdfchat.onnx_embedding import DEFAULT_THREADS, OnnxEmbedding
+
 
 # Performance monitoring setup
 @dataclass
@@ -310,6 +314,9 @@ class CPUOptimizedIngestionPipeline:
         qdrant_host: str = "localhost",
         qdrant_port: int = 6333,
         collection_name: str = "pdf-documents",
+        onnx_model_dir: Optional[str] = None,
+        onnx_threads: int = DEFAULT_THREADS,
+        embed_workers: int = 0,
     ):
 
         self.docs_path = Path(docs_path)
@@ -320,8 +327,40 @@ class CPUOptimizedIngestionPipeline:
         self.router = IntelligentChunkFlowRouter()
 
         # Initialize CPU-optimized models
+        if onnx_model_dir:
+            # Quantized ONNX export, see scripts/export_onnx_model.py
+            self.embed_model = OnnxEmbedding(onnx_model_dir, threads=onnx_threads)
+        else:
+            self.embed_model = self._load_huggingface_model()
+        # Chunk budgets are counted in the embedding model's own tokens
+        self.tokenizer_name = self.embed_model.model_name.split(":onnx")[0]
+        resolve_tokenizer(self.tokenizer_name)
+        if embed_workers:
+            # Spawned workers each load the model this process settled on
+            if onnx_model_dir:
+                factory = functools.partial(OnnxEmbedding, onnx_model_dir)
+            else:
+                factory = functools.partial(
+                    HuggingFaceEmbedding,
+                    model_name=self.embed_model.model_name,
+                    trust_remote_code=True,
+                    device="cpu",
+                )
+            self.embed_model = PooledEmbedding(
+                EmbeddingPool(factory, workers=embed_workers),
+                model_name=self.embed_model.model_name,
+            )
+
+        # Initialize Qdrant connection
+        self.client = qdrant_client.QdrantClient(host=qdrant_host, port=qdrant_port)
+        self.vector_store = QdrantVectorStore(
+            client=self.client, collection_name=collection_name
+        )
+
+    def _load_huggingface_model(self) -> HuggingFaceEmbedding:
+        """Load the PyTorch embedding model, falling back to a smaller one"""
         try:
-            self.embed_model = HuggingFaceEmbedding(
+            return HuggingFaceEmbedding(
                 model_name="sentence-transformers/paraphrase-mpnet-base-v2",
                 trust_remote_code=True,
                 device="cpu",
@@ -331,17 +370,11 @@ class CPUOptimizedIngestionPipeline:
                 f"Warning: Could not load paraphrase-mpnet-base-v2, using fallback: {e}"
             )
             # Fallback to a minimal multilingual model
-            self.embed_model = HuggingFaceEmbedding(
+            return HuggingFaceEmbedding(
                 model_name="sentence-transformers/distiluse-base-multilingual-cased-v2",
                 device="cpu",
             )
 
-        # Initialize Qdrant connection
-        self.client = qdrant_client.QdrantClient(host=qdrant_host, port=qdrant_port)
-        self.vector_store = QdrantVectorStore(
-            client=self.client, collection_name=collection_name
-        )
-
     def get_system_metrics(self) -> Tuple[float, float]:
         """Get current system memory and CPU usage"""
         process = psutil.Process()
@@ -354,12 +387,14 @@ class CPUOptimizedIngestionPipeline:
         # Simple approximation: 1 token ≈ 4 characters
         return len(text) // 4
 
-    def create_adaptive_parser(self, strategy: ChunkingStrategy) -> SentenceSplitter:
+    def create_adaptive_parser(self, strategy: ChunkingStrategy) -> TokenChunkSplitter:
         """Create adaptive parser based on chunking strategy"""
-        return SentenceSplitter(
+        # Every strategy separates on blank lines, which the native chunker
+        # always treats as sentence boundaries
+        return TokenChunkSplitter(
             chunk_size=strategy.chunk_size,
             chunk_overlap=strategy.chunk_overlap,
-            separator=strategy.separator,
+            tokenizer_name=self.tokenizer_name,
         )
 
     def process_chunk_batch(self, nodes: List, batch_size: int = 20) -> None:
@@ -506,6 +541,19 @@ def main():
     parser.add_argument(
         "--max-docs", type=int, help="Maximum number of documents to process"
     )
+    parser.add_argument(
+        "--onnx-model-dir",
+        help="Embed with this ONNX export instead of the PyTorch model",
+    )
+    parser.add_argument(
+        "--onnx-threads", type=int, default=DEFAULT_THREADS, help="onnxruntime threads"
+    )
+    parser.add_argument(
+        "--embed-workers",
+        type=int,
+        default=0,
+        help="Embed on this many processes, each pinned to its share of the cores",
+    )
 
     args = parser.parse_args()
 
@@ -524,6 +572,9 @@ def main():
         qdrant_host=args.qdrant_host,
         qdrant_port=args.qdrant_port,
         collection_name=args.collection,
+        onnx_model_dir=args.onnx_model_dir,
+        onnx_threads=args.onnx_threads,
+        embed_workers=args.embed_workers,
     )
 
     # Process documents
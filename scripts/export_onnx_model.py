@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+ONNX Embedding Export for PDF Chat Appliance
+Exports the embedding model to an int8-quantized ONNX graph for the
+`embedding.backend: onnx` ingestion backend, then checks its vectors and
+throughput against the PyTorch reference model
+"""
+
+import os
+import sys
+import time
+
+# Mandatory .venv activation check
+if "venv" not in sys.executable:
+    raise RuntimeError("VENV NOT ACTIVATED. Please activate `.venv` before running this script.")
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from pdfchat.ingestion import EMBED_MODEL_NAME
+from pdfchat.onnx_embedding import (
+    DEFAULT_MAX_LENGTH,
+    DEFAULT_THREADS,
+    MIN_REFERENCE_COSINE,
+    OnnxEmbedding,
+    export_onnx_model,
+    reference_similarity,
+)
+from scripts.benchmark_chunking import synthetic_corpus
+
+
+def throughput(model, texts):
+    """Embeddings per second over `texts`"""
+    start = time.perf_counter()
+    model.get_text_embedding_batch(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    """Export the model and validate the export"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX")
+    parser.add_argument("--model", default=EMBED_MODEL_NAME)
+    parser.add_argument(
+        "--output",
+        default="/var/lib/pdfchat/models/nomic-embed-text-v1.5-onnx",
+        help="Directory for the ONNX graphs and tokenizer",
+    )
+    parser.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH)
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    parser.add_argument("--samples", type=int, default=64, help="Validation texts")
+    args = parser.parse_args()
+
+    print(f"Exporting {args.model} to {args.output}")
+    export_onnx_model(args.model, args.output, max_length=args.max_length)
+
+    texts = synthetic_corpus(args.samples)
+    models = [
+        OnnxEmbedding(args.output, quantized=quantized, threads=args.threads)
+        for quantized in (False, True)
+    ]
+    # Compare like with like: the reference gets the prompts saved with the export
+    reference = HuggingFaceEmbedding(
+        model_name=args.model,
+        query_instruction=models[0].query_instruction,
+        text_instruction=models[0].text_instruction,
+        trust_remote_code=True,
+        device="cpu",
+    )
+    failed = False
+    for model in models:
+        similarity = reference_similarity(model, reference, texts)
+        failed |= similarity < MIN_REFERENCE_COSINE
+        print(
+            f"{'int8' if model.quantized else 'fp32':<5} min cosine vs reference "
+            f"{similarity:.5f}  {throughput(model, texts):7.1f} emb/s"
+        )
+    print(f"{'torch':<5} reference {throughput(reference, texts):26.1f} emb/s")
+
+    if failed:
+        print(f"Export below the {MIN_REFERENCE_COSINE} similarity floor")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Tests for the admission control module.
+"""
+
+import asyncio
+
+import pytest
+
+from pdfchat.admission import AdmissionController, AdmissionRejected
+
+
+class TestAdmissionController:
+    """Test cases for AdmissionController class."""
+
+    def test_admits_up_to_limit(self):
+        """Test expected use case: slots are granted until the limit."""
+
+        async def scenario():
+            controller = AdmissionController(max_concurrent=2, max_queue=0)
+            tickets = [await controller.acquire(), await controller.acquire()]
+            metrics = controller.metrics()
+            for ticket in tickets:
+                controller.release(ticket)
+            return metrics, controller.metrics()
+
+        during, after = asyncio.run(scenario())
+
+        assert during["in_flight"] == 2
+        assert after["in_flight"] == 0
+        assert after["admitted"] == 2
+
+    def test_queued_request_admitted_on_release(self):
+        """Test expected use case: a waiting request gets the freed slot."""
+
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=1)
+            first = await controller.acquire()
+            waiter = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0)
+            depth = controller.metrics()["queue_depth"]
+            controller.release(first)
+            controller.release(await waiter)
+            return depth, controller.metrics()
+
+        depth, metrics = asyncio.run(scenario())
+
+        assert depth == 1
+        assert metrics["queue_depth"] == 0
+        assert metrics["admitted"] == 2
+        assert metrics["max_wait_time"] > 0
+
+    def test_full_queue_rejected_with_429(self):
+        """Test failure case: a full queue sheds load immediately."""
+
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=0)
+            await controller.acquire()
+            with pytest.raises(AdmissionRejected) as excinfo:
+                await controller.acquire()
+            return excinfo.value, controller.metrics()
+
+        rejection, metrics = asyncio.run(scenario())
+
+        assert rejection.status_code == 429
+        assert rejection.retry_after >= 1
+        assert metrics["rejected_queue_full"] == 1
+
+    def test_queue_timeout_rejected_with_503(self):
+        """Test failure case: waiting past max_wait is rejected."""
+
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=4, max_wait=0.01)
+            await controller.acquire()
+            with pytest.raises(AdmissionRejected) as excinfo:
+                await controller.acquire()
+            return excinfo.value, controller.metrics()
+
+        rejection, metrics = asyncio.run(scenario())
+
+        assert rejection.status_code == 503
+        assert metrics["rejected_timeout"] == 1
+        assert metrics["queue_depth"] == 0
+
+    def test_double_release_ignored(self):
+        """Test edge case: releasing a ticket twice frees only one slot."""
+
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1)
+            ticket = await controller.acquire()
+            controller.release(ticket)
+            controller.release(ticket)
+            return controller.metrics()
+
+        assert asyncio.run(scenario())["in_flight"] == 0
@@ -0,0 +1,149 @@
+"""
+Tests for the approximate nearest-neighbour index module.
+"""
+
+import numpy as np
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import (
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+
+from pdfchat.ann_index import IVFIndex, recall_at_k
+from pdfchat.search import exact_top_k, normalize
+from pdfchat.vector_store import MmapVectorStore
+
+
+def clustered_vectors(rows, dim=32, clusters=20, seed=0):
+    """Unit vectors grouped around random cluster centers."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    labels = rng.integers(0, clusters, rows)
+    return normalize(centers[labels] + 0.3 * rng.standard_normal((rows, dim)))
+
+
+class TestIVFIndex:
+    """Test cases for IVFIndex class."""
+
+    def setup_method(self):
+        self.matrix = clustered_vectors(3000)
+        self.queries = clustered_vectors(50, seed=1)
+        self.index = IVFIndex.train(self.matrix, nlist=32)
+        self.index.add(self.matrix)
+
+    def test_full_probe_matches_exact(self):
+        """Test expected use case: probing every list is exact search."""
+        recall = recall_at_k(
+            self.matrix, self.queries, self.index, k=10, nprobe=self.index.nlist
+        )
+        assert recall == 1.0
+
+    def test_partial_probe_recall(self):
+        """Test expected use case: a few lists already give high recall."""
+        low = recall_at_k(self.matrix, self.queries, self.index, k=10, nprobe=1)
+        high = recall_at_k(self.matrix, self.queries, self.index, k=10, nprobe=8)
+
+        assert high >= 0.9
+        assert high >= low
+
+    def test_incremental_add(self):
+        """Test edge case: rows added later are searchable."""
+        index = IVFIndex.train(self.matrix[:2000], nlist=16)
+        index.add(self.matrix[:2000])
+        index.add(self.matrix)
+
+        assert index.indexed_rows == 3000
+        rows, _ = index.search(self.matrix, self.matrix[2500], k=1, nprobe=16)
+        assert rows.tolist() == [2500]
+
+    def test_mask_respected(self):
+        """Test edge case: masked rows are never returned."""
+        mask = np.ones(len(self.matrix), dtype=bool)
+        mask[42] = False
+
+        rows, _ = self.index.search(
+            self.matrix, self.matrix[42], k=5, nprobe=32, mask=mask
+        )
+        assert 42 not in rows.tolist()
+
+    def test_mask_widens_probe(self):
+        """Test edge case: a sparse mask probes more lists to find k rows."""
+        mask = np.zeros(len(self.matrix), dtype=bool)
+        mask[::100] = True
+
+        rows, _ = self.index.search(
+            self.matrix, self.queries[0], k=5, nprobe=1, mask=mask
+        )
+
+        assert len(rows) == 5
+        assert all(row % 100 == 0 for row in rows.tolist())
+
+    def test_save_and_load(self, tmp_path):
+        """Test expected use case: a saved index gives identical results."""
+        path = str(tmp_path / "ann.npz")
+        self.index.save(path)
+        loaded = IVFIndex.load(path)
+
+        for query in self.queries[:5]:
+            expected, _ = self.index.search(self.matrix, query, k=5)
+            actual, _ = loaded.search(self.matrix, query, k=5)
+            assert actual.tolist() == expected.tolist()
+        assert loaded.indexed_rows == self.index.indexed_rows
+
+
+class TestVectorStoreIndexing:
+    """Test cases for switching MmapVectorStore to ANN search."""
+
+    def test_switches_above_threshold(self, tmp_path):
+        """Test expected use case: ANN is built at the indexing threshold."""
+        matrix = clustered_vectors(600)
+        store = MmapVectorStore(str(tmp_path), indexing_threshold=500, nprobe=64)
+        store.add([TextNode(id_="a", text="a", embedding=matrix[0].tolist())])
+
+        assert store.update_ann_index() is False
+        store.add(
+            [
+                TextNode(id_=str(i), text=str(i), embedding=vector.tolist())
+                for i, vector in enumerate(matrix[1:], start=1)
+            ]
+        )
+        assert store.update_ann_index() is True
+
+        reopened = MmapVectorStore(str(tmp_path), indexing_threshold=500, nprobe=64)
+        assert reopened.ann_index is not None
+        rows, _ = reopened.search(matrix[7].tolist(), top_k=3)
+        expected, _ = exact_top_k(reopened.matrix(), matrix[7], 3)
+        assert rows == expected.tolist()
+
+    def test_restrictive_filter_with_ann(self, tmp_path):
+        """Test edge case: a narrow section filter still returns k rows."""
+        matrix = clustered_vectors(2000)
+        store = MmapVectorStore(str(tmp_path), indexing_threshold=500, nprobe=1)
+        store.add(
+            [
+                TextNode(
+                    id_=str(i),
+                    text=str(i),
+                    embedding=vector.tolist(),
+                    metadata={"sections": ["Install" if i % 200 == 0 else "Other"]},
+                )
+                for i, vector in enumerate(matrix)
+            ]
+        )
+        assert store.update_ann_index() is True
+
+        result = store.query(
+            VectorStoreQuery(
+                query_embedding=matrix[1].tolist(),
+                similarity_top_k=5,
+                filters=MetadataFilters(
+                    filters=[MetadataFilter(key="sections", value="Install")]
+                ),
+            )
+        )
+
+        mask = np.zeros(len(matrix), dtype=bool)
+        mask[::200] = True
+        expected, _ = exact_top_k(store.matrix(), normalize(matrix[1]), 5, mask=mask)
+        assert result.ids == [str(row) for row in expected.tolist()]
@@ -0,0 +1,72 @@
+"""
+Tests for the semantic answer cache module.
+"""
+
+from pdfchat.answer_cache import SemanticAnswerCache
+
+RESPONSE = {"answer": "Enable vSAN in the cluster settings.", "sources": []}
+
+
+class TestSemanticAnswerCache:
+    """Test cases for SemanticAnswerCache class."""
+
+    def test_similar_query_hits(self):
+        """Test expected use case: a paraphrase reuses the stored answer."""
+        cache = SemanticAnswerCache(similarity_threshold=0.95)
+        cache.put([1.0, 0.0, 0.0], RESPONSE, generation=1, max_results=5)
+
+        assert cache.get([0.99, 0.05, 0.0], generation=1, max_results=5) == RESPONSE
+        assert cache.get([0.0, 1.0, 0.0], generation=1, max_results=5) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_returns_copies(self):
+        """Test edge case: callers cannot mutate cached responses."""
+        cache = SemanticAnswerCache()
+        cache.put([1.0, 0.0], RESPONSE, generation=1, max_results=5)
+
+        cache.get([1.0, 0.0], generation=1, max_results=5)["answer"] = "changed"
+        assert cache.get([1.0, 0.0], generation=1, max_results=5) == RESPONSE
+
+    def test_max_results_must_match(self):
+        """Test edge case: answers built from a different top-k are not reused."""
+        cache = SemanticAnswerCache()
+        cache.put([1.0, 0.0], RESPONSE, generation=1, max_results=5)
+
+        assert cache.get([1.0, 0.0], generation=1, max_results=10) is None
+
+    def test_new_generation_invalidates(self):
+        """Test expected use case: re-ingestion drops every cached answer."""
+        cache = SemanticAnswerCache()
+        cache.put([1.0, 0.0], RESPONSE, generation=1, max_results=5)
+
+        assert cache.get([1.0, 0.0], generation=2, max_results=5) is None
+        assert cache.stats()["entries"] == 0
+        assert cache.stats()["invalidations"] == 1
+
+    def test_stale_answer_not_stored(self):
+        """Test failure case: an answer from an older generation is discarded."""
+        cache = SemanticAnswerCache()
+        cache.get([1.0, 0.0], generation=2, max_results=5)
+        cache.put([1.0, 0.0], RESPONSE, generation=1, max_results=5)
+
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction(self):
+        """Test edge case: the least recently used answer is replaced."""
+        cache = SemanticAnswerCache(max_entries=2)
+        cache.put([1.0, 0.0, 0.0], {"answer": "a"}, generation=1, max_results=5)
+        cache.put([0.0, 1.0, 0.0], {"answer": "b"}, generation=1, max_results=5)
+        cache.get([1.0, 0.0, 0.0], generation=1, max_results=5)
+        cache.put([0.0, 0.0, 1.0], {"answer": "c"}, generation=1, max_results=5)
+
+        assert cache.get([0.0, 1.0, 0.0], generation=1, max_results=5) is None
+        assert cache.get([1.0, 0.0, 0.0], generation=1, max_results=5) == {"answer": "a"}
+
+    def test_disabled(self):
+        """Test edge case: a zero-sized cache never answers."""
+        cache = SemanticAnswerCache(max_entries=0)
+        cache.put([1.0, 0.0], RESPONSE, generation=1, max_results=5)
+
+        assert cache.enabled is False
+        assert cache.get([1.0, 0.0], generation=1, max_results=5) is None
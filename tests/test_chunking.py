@@ -0,0 +1,236 @@
+"""
+Tests for the native token chunker module.
+"""
+
+import random
+
+import pytest
+from llama_index.core import Document
+
+from pdfchat.chunking import (
+    ParallelChunker,
+    TokenChunker,
+    TokenChunkSplitter,
+    load_tokenizer,
+    resolve_tokenizer,
+)
+
+WORDS = load_tokenizer("regex")
+
+
+def sentence(n, word="word"):
+    """A sentence of n regex tokens (n - 1 words and a full stop)."""
+    return " ".join([word] * (n - 1)) + "."
+
+
+def token_count(text):
+    return len(WORDS.offsets(text)[0])
+
+
+class TestTokenChunker:
+    """Test cases for TokenChunker class."""
+
+    def test_chunks_respect_budget_and_sentences(self):
+        """Test expected use case: chunks end on sentence ends within budget."""
+        text = " ".join(sentence(4, w) for w in ["a", "b", "c", "d", "e", "f"])
+        chunker = TokenChunker(chunk_size=10, chunk_overlap=0, tokenizer=WORDS)
+
+        chunks = chunker.split_text(text)
+
+        assert chunks == ["a a a. b b b.", "c c c. d d d.", "e e e. f f f."]
+        assert all(token_count(c) <= 10 for c in chunks)
+
+    def test_overlap_repeats_whole_sentences(self):
+        """Test expected use case: neighbours share the sentences fitting the overlap."""
+        text = " ".join(sentence(4, w) for w in ["a", "b", "c", "d"])
+        chunker = TokenChunker(chunk_size=8, chunk_overlap=4, tokenizer=WORDS)
+
+        assert chunker.split_text(text) == [
+            "a a a. b b b.",
+            "b b b. c c c.",
+            "c c c. d d d.",
+        ]
+
+    def test_long_sentence_cut_at_tokens(self):
+        """Test edge case: a sentence over budget is cut with a token overlap."""
+        chunker = TokenChunker(chunk_size=10, chunk_overlap=2, tokenizer=WORDS)
+
+        chunks = chunker.split_text(sentence(25))
+
+        assert [token_count(c) for c in chunks] == [10, 10, 9]
+        assert chunks[-1].endswith("word.")
+
+    def test_spans_index_the_text(self):
+        """Test expected use case: spans slice the chunks out of the text."""
+        text = "  First one.\n\nSecond one here.  "
+        chunker = TokenChunker(chunk_size=4, chunk_overlap=0, tokenizer=WORDS)
+
+        spans = chunker.spans(text)
+
+        assert [text[a:b] for a, b in spans] == ["First one.", "Second one here."]
+
+    def test_empty_text(self):
+        """Test edge case: whitespace-only text has no chunks."""
+        assert TokenChunker(tokenizer=WORDS).split_text(" \n ") == []
+
+    def test_invalid_overlap(self):
+        """Test failure case: the overlap must be smaller than the chunk."""
+        with pytest.raises(ValueError):
+            TokenChunker(chunk_size=10, chunk_overlap=10, tokenizer=WORDS)
+
+
+def manual_pages(count, seed=0):
+    """Pages of mixed sentences, quotes, long runs and non-ASCII text."""
+    rng = random.Random(seed)
+    words = "Überprüfen the vsan “witness” (host) firmware 4096 nic ✓ v1.2".split()
+    pages = []
+    for _ in range(count):
+        paragraphs = []
+        for _ in range(rng.randint(1, 4)):
+            sentences = [
+                " ".join(rng.choices(words, k=rng.randint(1, 50)))
+                + rng.choice([".", "!", "?", '."', ")", ""])
+                for _ in range(rng.randint(1, 6))
+            ]
+            paragraphs.append(rng.choice([" ", "\n"]).join(sentences))
+        pages.append(rng.choice(["", " ", "\n"]) + "\n\n".join(paragraphs))
+    return pages
+
+
+@pytest.fixture(scope="module")
+def document():
+    """A 60-page manual and the offsets where its pages start."""
+    pages = manual_pages(60)
+    starts, offset = [], 0
+    for page in pages:
+        starts.append(offset)
+        offset += len(page) + 2
+    return "\n\n".join(pages), starts
+
+
+class TestParallelChunker:
+    """Test cases for ParallelChunker class."""
+
+    @pytest.mark.parametrize("tokenizer", ["regex", "tiktoken"])
+    @pytest.mark.parametrize("page_aligned", [False, True])
+    def test_matches_sequential_chunks(self, document, tokenizer, page_aligned):
+        """Test expected use case: segment chunking equals one sequential pass."""
+        text, page_starts = document
+        chunker = ParallelChunker(
+            chunk_size=24,
+            chunk_overlap=8,
+            tokenizer_name=tokenizer,
+            workers=2,
+            segment_chars=1500,
+        )
+        cuts = page_starts if page_aligned else None
+        try:
+            assert len(chunker.segments(text, cuts)) > 3
+            expected = TokenChunker(
+                24, 8, tokenizer=load_tokenizer(tokenizer)
+            ).spans(text)
+            assert chunker.spans(text, cuts) == expected
+        finally:
+            chunker.close()
+
+    def test_segments_start_after_newlines(self, document):
+        """Test expected use case: segments start at a line's first character."""
+        text, page_starts = document
+        chunker = ParallelChunker(tokenizer_name="regex", segment_chars=1000)
+
+        for cuts in (None, page_starts):
+            segments = chunker.segments(text, cuts)
+            assert segments[0][0] == 0 and segments[-1][1] == len(text)
+            for (_, end), (start, _) in zip(segments, segments[1:]):
+                assert end == start and text[start - 1] == "\n"
+                assert not text[start].isspace()
+
+    def test_unusable_cuts_ignored(self):
+        """Test edge case: cuts inside a line or before whitespace are skipped."""
+        text = "alpha beta.\n gamma delta.\nepsilon."
+        chunker = ParallelChunker(tokenizer_name="regex", segment_chars=1)
+
+        assert chunker.segments(text, [3, 12, 26]) == [(0, 26), (26, len(text))]
+
+    def test_many_texts_match_sequential_chunks(self):
+        """Test expected use case: pages tokenized in pool batches chunk alike."""
+        pages = manual_pages(40)
+        chunker = ParallelChunker(
+            chunk_size=24,
+            chunk_overlap=8,
+            tokenizer_name="regex",
+            workers=2,
+            segment_chars=1500,
+        )
+        try:
+            assert len(chunker.batches(pages)) > 3
+            expected = [chunker.chunker.spans(page) for page in pages]
+            assert chunker.spans_many(pages) == expected
+            assert chunker._pool is not None
+        finally:
+            chunker.close()
+
+    def test_small_text_chunked_in_process(self):
+        """Test edge case: a text of one segment never starts the pool."""
+        chunker = ParallelChunker(chunk_size=8, chunk_overlap=0, tokenizer_name="regex")
+        text = " ".join(sentence(4, w) for w in ["a", "b", "c"])
+
+        assert chunker.split_text(text) == ["a a a. b b b.", "c c c."]
+        assert chunker._pool is None
+
+
+class TestLoadTokenizer:
+    """Test cases for load_tokenizer function."""
+
+    def test_offsets_cover_non_ascii_text(self):
+        """Test expected use case: token offsets are character offsets."""
+        tokenizer = load_tokenizer("tiktoken")
+        text = "Überprüfen Sie die Firmware ✓ vor dem Upgrade."
+
+        starts, ends = tokenizer.offsets(text)
+
+        assert "".join(text[a:b] for a, b in zip(starts, ends)) == text
+
+    def test_unknown_model_falls_back(self):
+        """Test failure case: an unloadable model tokenizer still counts tokens."""
+        tokenizer = load_tokenizer("no-such/tokenizer-model")
+
+        assert len(tokenizer.offsets("two words")[0]) == 2
+
+
+class TestResolveTokenizer:
+    """Test cases for resolve_tokenizer function."""
+
+    def test_requested_tokenizer_loaded(self, caplog):
+        """Test expected use case: the requested tokenizer loads without a warning."""
+        assert resolve_tokenizer("regex").name == "regex"
+        assert resolve_tokenizer("tiktoken").name.startswith("tiktoken:")
+        assert "instead of" not in caplog.text
+
+    def test_fallback_named_and_logged(self, caplog):
+        """Test edge case: a fallback reports the tokenizer that actually loaded."""
+        tokenizer = resolve_tokenizer("no-such/tokenizer-model")
+
+        assert tokenizer.name != "no-such/tokenizer-model"
+        assert f"Chunking with {tokenizer.name} instead of" in caplog.text
+
+    def test_strict_fallback_raises(self):
+        """Test failure case: strict mode refuses budgets in other tokens."""
+        with pytest.raises(RuntimeError, match="no-such/tokenizer-model"):
+            resolve_tokenizer("no-such/tokenizer-model", strict=True)
+
+
+class TestTokenChunkSplitter:
+    """Test cases for TokenChunkSplitter class."""
+
+    def test_nodes_from_documents(self):
+        """Test expected use case: works as a llama-index node parser."""
+        splitter = TokenChunkSplitter(
+            chunk_size=8, chunk_overlap=0, tokenizer_name="regex"
+        )
+        doc = Document(text=" ".join(sentence(4, w) for w in ["a", "b", "c"]))
+
+        nodes = splitter.get_nodes_from_documents([doc])
+
+        assert [n.text for n in nodes] == ["a a a. b b b.", "c c c."]
+        assert nodes[1].start_char_idx == doc.text.index("c")
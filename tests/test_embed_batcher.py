@@ -0,0 +1,168 @@
+"""
+Tests for the adaptive embedding batcher module.
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from pdfchat.embed_batcher import AdaptiveBatcher
+
+
+def fake_embed(texts):
+    """One embedding per text, recording the text length."""
+    return [[float(len(t))] for t in texts]
+
+
+def memory(percent):
+    """Patch the system memory use the batcher sees."""
+    return patch(
+        "pdfchat.embed_batcher.psutil.virtual_memory",
+        return_value=type("Memory", (), {"percent": percent})(),
+    )
+
+
+class TestAdaptiveBatcher:
+    """Test cases for AdaptiveBatcher class."""
+
+    def test_results_in_input_order(self):
+        """Test expected use case: embeddings line up with the input texts."""
+        texts = ["x" * n for n in (3, 9, 1, 7, 5, 2, 8)]
+        batcher = AdaptiveBatcher(fake_embed, batch_size=2, min_batch_size=1)
+
+        assert batcher.embed(texts) == [[float(len(t))] for t in texts]
+
+    def test_batches_grouped_by_length(self):
+        """Test expected use case: similar lengths share a batch, longest first."""
+        calls = []
+
+        def embed(texts):
+            calls.append([len(t) for t in texts])
+            return fake_embed(texts)
+
+        batcher = AdaptiveBatcher(
+            embed, batch_size=2, min_batch_size=1, in_flight=1, adaptive=False
+        )
+
+        batcher.embed(["x" * n for n in (1, 8, 3, 6, 2, 7)])
+
+        assert calls == [[8, 7], [6, 3], [2, 1]]
+
+    def test_batches_kept_in_flight(self):
+        """Test expected use case: several batches reach the backend at once."""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def embed(texts):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+            return fake_embed(texts)
+
+        batcher = AdaptiveBatcher(
+            embed, batch_size=2, min_batch_size=1, in_flight=3, adaptive=False
+        )
+
+        batcher.embed(["text"] * 12)
+
+        assert max(peak) == 3
+
+    def test_grows_while_throughput_holds(self):
+        """Test expected use case: the size grows while larger batches are no slower."""
+        batcher = AdaptiveBatcher(fake_embed, batch_size=8, max_batch_size=64)
+
+        with memory(50.0):
+            for _ in range(3):
+                batcher.record(batcher.batch_size, batcher.batch_size / 100.0)
+
+        assert batcher.batch_size == 27
+
+    def test_turns_back_when_throughput_drops(self):
+        """Test expected use case: a slower size sends the search the other way."""
+        batcher = AdaptiveBatcher(fake_embed, batch_size=8)
+
+        with memory(50.0):
+            batcher.record(8, 0.08)  # 100/s, grow to 12
+            batcher.record(12, 0.24)  # 50/s, back to 8
+
+        assert batcher.batch_size == 8
+
+    def test_shrinks_under_memory_pressure(self):
+        """Test edge case: high memory use shrinks the batch down to the minimum."""
+        batcher = AdaptiveBatcher(fake_embed, batch_size=12, min_batch_size=6)
+
+        with memory(95.0):
+            for _ in range(3):
+                batcher.record(batcher.batch_size, 0.01)
+
+        assert batcher.batch_size == 6
+
+    def test_shrinks_after_slow_batch(self):
+        """Test edge case: a batch over the latency limit shrinks the size."""
+        batcher = AdaptiveBatcher(fake_embed, batch_size=12, max_batch_seconds=1.0)
+
+        with memory(50.0):
+            batcher.record(12, 2.0)
+
+        assert batcher.batch_size == 8
+
+    def test_partial_batches_do_not_adapt(self):
+        """Test edge case: a short final batch is counted but changes nothing."""
+        batcher = AdaptiveBatcher(fake_embed, batch_size=8)
+
+        batcher.record(3, 10.0)
+
+        assert batcher.batch_size == 8
+        assert batcher.stats()[3]["batches"] == 1
+
+    def test_stats_per_batch_size(self):
+        """Test expected use case: throughput is reported for each size used."""
+        batcher = AdaptiveBatcher(fake_embed, batch_size=4, adaptive=False)
+
+        batcher.record(4, 0.5)
+        batcher.record(4, 0.5)
+        batcher.record(2, 0.5)
+
+        assert batcher.stats() == {
+            2: {
+                "batches": 1,
+                "embeddings": 2,
+                "seconds": 0.5,
+                "embeddings_per_second": 4.0,
+            },
+            4: {
+                "batches": 2,
+                "embeddings": 8,
+                "seconds": 1.0,
+                "embeddings_per_second": 8.0,
+            },
+        }
+
+    def test_backend_error_raised(self):
+        """Test failure case: an embedding error reaches the caller."""
+
+        def embed(texts):
+            raise ConnectionError("ollama unavailable")
+
+        batcher = AdaptiveBatcher(embed, batch_size=4, in_flight=2)
+
+        with pytest.raises(ConnectionError):
+            batcher.embed(["text"] * 10)
+
+    def test_count_mismatch_raised(self):
+        """Test failure case: a backend returning too few embeddings is an error."""
+        batcher = AdaptiveBatcher(lambda texts: fake_embed(texts)[1:])
+
+        with pytest.raises(ValueError):
+            batcher.embed(["a", "b"])
+
+    def test_invalid_limits(self):
+        """Test failure case: the minimum size may not exceed the maximum."""
+        with pytest.raises(ValueError):
+            AdaptiveBatcher(fake_embed, min_batch_size=10, max_batch_size=5)
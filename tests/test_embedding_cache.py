@@ -0,0 +1,218 @@
+"""
+Tests for the embedding cache module.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from pdfchat.embedding_cache import (
+    CachedEmbedding,
+    EmbeddingCache,
+    QueryEmbeddingCache,
+    text_hash,
+)
+
+MODEL = "test-embed-model"
+
+
+def fake_inner():
+    """Mock embedding model returning one float per character."""
+    inner = Mock()
+    inner.get_text_embedding_batch.side_effect = lambda texts: [
+        [float(len(t)), 1.0] for t in texts
+    ]
+    return inner
+
+
+class TestTextHash:
+    """Test cases for text_hash function."""
+
+    def test_whitespace_normalized(self):
+        """Test expected use case: whitespace differences hash the same."""
+        assert text_hash("Terms  and\nconditions ") == text_hash("Terms and conditions")
+
+    def test_different_text(self):
+        """Test edge case: different text hashes differently."""
+        assert text_hash("Terms") != text_hash("terms")
+
+
+class TestEmbeddingCache:
+    """Test cases for EmbeddingCache class."""
+
+    def test_put_and_get(self, tmp_path):
+        """Test expected use case: stored vectors are returned on lookup."""
+        cache = EmbeddingCache(str(tmp_path / "cache.db"))
+        cache.put_many(MODEL, ["alpha"], [[0.5, 0.25]])
+
+        assert cache.get_many(MODEL, ["alpha", "beta"]) == [[0.5, 0.25], None]
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_keyed_by_model(self, tmp_path):
+        """Test edge case: another model's vectors are not reused."""
+        cache = EmbeddingCache(str(tmp_path / "cache.db"))
+        cache.put_many(MODEL, ["alpha"], [[0.5, 0.25]])
+
+        assert cache.get_many("other-model", ["alpha"]) == [None]
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test expected use case: the cache survives a restart."""
+        path = str(tmp_path / "cache.db")
+        EmbeddingCache(path).put_many(MODEL, ["alpha"], [[0.5, 0.25]])
+
+        reopened = EmbeddingCache(path)
+        assert reopened.stats()["entries"] == 1
+        assert reopened.get_many(MODEL, ["alpha"]) == [[0.5, 0.25]]
+
+    def test_lru_eviction(self, tmp_path):
+        """Test edge case: the least recently used entries are evicted."""
+        cache = EmbeddingCache(str(tmp_path / "cache.db"), max_entries=3)
+        cache.put_many(MODEL, ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+        cache.get_many(MODEL, ["a"])
+        cache.put_many(MODEL, ["d"], [[4.0]])
+
+        assert cache.get_many(MODEL, ["a", "b", "c", "d"]) == [
+            [1.0],
+            None,
+            [3.0],
+            [4.0],
+        ]
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["entries"] == 3
+
+
+class TestQueryEmbeddingCache:
+    """Test cases for QueryEmbeddingCache class."""
+
+    def test_hit_after_put(self):
+        """Test expected use case: repeated questions hit the cache."""
+        cache = QueryEmbeddingCache(max_entries=2)
+        assert cache.get("What is vSAN?") is None
+        cache.put("What is vSAN?", [0.1, 0.2])
+
+        assert cache.get("What is  vSAN? ") == [0.1, 0.2]
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        """Test edge case: the least recently used query is evicted."""
+        cache = QueryEmbeddingCache(max_entries=2)
+        cache.put("a", [1.0])
+        cache.put("b", [2.0])
+        cache.get("a")
+        cache.put("c", [3.0])
+
+        assert cache.get("b") is None
+        assert cache.get("a") == [1.0]
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Test edge case: entries older than the TTL are dropped."""
+        cache = QueryEmbeddingCache(ttl_seconds=60)
+        with patch("pdfchat.embedding_cache.time.monotonic", return_value=100.0):
+            cache.put("a", [1.0])
+        with patch("pdfchat.embedding_cache.time.monotonic", return_value=150.0):
+            assert cache.get("a") == [1.0]
+        with patch("pdfchat.embedding_cache.time.monotonic", return_value=161.0):
+            assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_disabled(self):
+        """Test edge case: a zero-sized cache stores nothing."""
+        cache = QueryEmbeddingCache(max_entries=0)
+        cache.put("a", [1.0])
+        assert cache.get("a") is None
+
+
+class TestCachedEmbedding:
+    """Test cases for CachedEmbedding class."""
+
+    def test_only_misses_embedded(self, tmp_path):
+        """Test expected use case: cached and duplicate chunks are not re-embedded."""
+        inner = fake_inner()
+        model = CachedEmbedding(
+            inner, EmbeddingCache(str(tmp_path / "cache.db")), model_name=MODEL
+        )
+
+        first = model.get_text_embedding_batch(["boilerplate", "boilerplate", "x"])
+        second = model.get_text_embedding_batch(["boilerplate ", "new text"])
+
+        assert first == [[11.0, 1.0], [11.0, 1.0], [1.0, 1.0]]
+        assert second == [[11.0, 1.0], [8.0, 1.0]]
+        assert [c.args[0] for c in inner.get_text_embedding_batch.call_args_list] == [
+            ["boilerplate", "x"],
+            ["new text"],
+        ]
+
+    def test_query_not_cached(self, tmp_path):
+        """Test edge case: query embeddings go straight to the inner model."""
+        inner = fake_inner()
+        inner.get_query_embedding.return_value = [0.1, 0.2]
+        model = CachedEmbedding(
+            inner, EmbeddingCache(str(tmp_path / "cache.db")), model_name=MODEL
+        )
+
+        assert model.get_query_embedding("what is covered?") == [0.1, 0.2]
+        assert model.cache.stats()["entries"] == 0
+
+    def test_query_cache(self, tmp_path):
+        """Test expected use case: repeated queries are embedded once."""
+        inner = fake_inner()
+        inner.get_query_embedding.return_value = [0.1, 0.2]
+        model = CachedEmbedding(
+            inner,
+            EmbeddingCache(str(tmp_path / "cache.db")),
+            query_cache=QueryEmbeddingCache(),
+            model_name=MODEL,
+        )
+
+        for _ in range(3):
+            assert model.get_query_embedding("what is covered?") == [0.1, 0.2]
+        inner.get_query_embedding.assert_called_once_with("what is covered?")
+        assert model.query_cache.stats()["hits"] == 2
+
+    def test_query_batch_single_call(self, tmp_path):
+        """Test expected use case: uncached queries are embedded in one call."""
+        inner = Mock(spec=["_embed", "get_query_embedding"])
+        inner._embed.side_effect = lambda queries, prompt_name: [
+            [float(len(q))] for q in queries
+        ]
+        query_cache = QueryEmbeddingCache()
+        query_cache.put("known", [9.0])
+        model = CachedEmbedding(
+            inner,
+            EmbeddingCache(str(tmp_path / "cache.db")),
+            query_cache=query_cache,
+            model_name=MODEL,
+        )
+
+        result = model.get_query_embedding_batch(["ab", "known", "abc", "ab"])
+
+        assert result == [[2.0], [9.0], [3.0], [2.0]]
+        inner._embed.assert_called_once_with(["ab", "abc"], prompt_name="query")
+        inner.get_query_embedding.assert_not_called()
+        assert query_cache.get("abc") == [3.0]
+
+    def test_query_batch_without_native_batching(self, tmp_path):
+        """Test edge case: models without a batched query path embed one by one."""
+        inner = Mock(spec=["get_query_embedding"])
+        inner.get_query_embedding.side_effect = lambda q: [float(len(q))]
+        model = CachedEmbedding(
+            inner, EmbeddingCache(str(tmp_path / "cache.db")), model_name=MODEL
+        )
+
+        assert model.get_query_embedding_batch(["a", "bb"]) == [[1.0], [2.0]]
+        assert inner.get_query_embedding.call_count == 2
+
+    def test_inner_failure_not_cached(self, tmp_path):
+        """Test failure case: embedding errors propagate and store nothing."""
+        inner = fake_inner()
+        inner.get_text_embedding_batch.side_effect = RuntimeError("model down")
+        model = CachedEmbedding(
+            inner, EmbeddingCache(str(tmp_path / "cache.db")), model_name=MODEL
+        )
+
+        with pytest.raises(RuntimeError):
+            model.get_text_embedding_batch(["alpha"])
+        assert model.cache.stats()["entries"] == 0
@@ -0,0 +1,114 @@
+"""
+Tests for the multi-process embedding pool module.
+"""
+
+import functools
+import os
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from pdfchat.embedding_pool import EmbeddingPool, PooledEmbedding, core_sets
+
+
+class WorkerModel:
+    """Embeds a text as (scaled length, pinned cores, OMP threads, query)."""
+
+    def __init__(self, scale=1.0):
+        self.scale = scale
+
+    def _vector(self, text, query):
+        if text == "crash":
+            os._exit(1)
+        return [
+            len(text) * self.scale,
+            len(os.sched_getaffinity(0)),
+            int(os.environ["OMP_NUM_THREADS"]),
+            query,
+        ]
+
+    def get_text_embedding_batch(self, texts):
+        return [self._vector(text, 0) for text in texts]
+
+    def get_query_embedding(self, query):
+        return self._vector(query, 1)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """Two spawned workers, started once for the module."""
+    pool = EmbeddingPool(functools.partial(WorkerModel, scale=2.0), workers=2)
+    yield pool
+    pool.close()
+
+
+class TestCoreSets:
+    """Test cases for core_sets function."""
+
+    def test_contiguous_slices(self):
+        """Test expected use case: cores are split into near-equal runs."""
+        with patch("os.sched_getaffinity", return_value={0, 1, 2, 3, 4, 5, 6, 7}):
+            assert core_sets(3) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+
+    def test_more_workers_than_cores(self):
+        """Test edge case: surplus workers share cores round-robin."""
+        with patch("os.sched_getaffinity", return_value={2, 3}):
+            assert core_sets(3) == [[2], [3], [2]]
+
+
+class TestEmbeddingPool:
+    """Test cases for EmbeddingPool class."""
+
+    def test_batches_split_across_workers(self, pool):
+        """Test expected use case: the pieces come back as one array, in order."""
+        texts = ["a" * n for n in range(1, 9)]
+
+        vectors = pool.embed(texts)
+
+        assert vectors.dtype == np.float32 and vectors.shape == (8, 4)
+        assert vectors[:, 0].tolist() == [2.0 * n for n in range(1, 9)]
+        assert vectors[:, 3].tolist() == [0.0] * 8
+
+    def test_workers_sized_to_their_cores(self, pool):
+        """Test expected use case: each worker's threads match its pinned cores."""
+        vectors = pool.embed(["a", "b"])
+
+        assert (vectors[:, 1] == pool.threads_per_worker).all()
+        assert (vectors[:, 2] == pool.threads_per_worker).all()
+
+    def test_queries_use_query_embedding(self, pool):
+        """Test expected use case: queries go through the model's query path."""
+        assert pool.embed_queries(["abc"])[:, [0, 3]].tolist() == [[6.0, 1.0]]
+
+    def test_pooled_embedding(self, pool):
+        """Test expected use case: works as a llama-index embedding model."""
+        model = PooledEmbedding(pool, worker_batch_size=4)
+
+        assert model.embed_batch_size == 8
+        assert model.get_text_embedding("abcd")[0] == 8.0
+
+    def test_forked_workers_inherit_model(self):
+        """Test expected use case: with fork the model is built once, in the parent."""
+        model = WorkerModel(scale=3.0)
+        pool = EmbeddingPool(lambda: model, workers=2, start_method="fork")
+        try:
+            assert pool.embed(["ab", "c"])[:, 0].tolist() == [6.0, 3.0]
+        finally:
+            pool.close()
+
+    def test_crashed_worker_restarts_pool(self):
+        """Test failure case: a worker crash raises, and the next call recovers."""
+        pool = EmbeddingPool(WorkerModel, workers=1)
+        try:
+            with pytest.raises(BrokenProcessPool):
+                pool.embed(["crash"])
+            assert pool.embed(["ok"])[:, 0].tolist() == [2.0]
+        finally:
+            pool.close()
+
+    def test_invalid_workers(self):
+        """Test failure case: a pool needs a worker."""
+        with pytest.raises(ValueError):
+            EmbeddingPool(WorkerModel, workers=0)
@@ -0,0 +1,491 @@
+"""
+Tests for the enterprise ingestion module.
+"""
+
+import os
+import threading
+from typing import List
+from unittest.mock import patch
+
+import pytest
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field
+
+from pdfchat.chunking import DEFAULT_TOKENIZER, load_tokenizer
+from pdfchat.config import Config
+from pdfchat.embed_batcher import AdaptiveBatcher
+from pdfchat.enterprise_ingestion import EnterpriseIngestionEngine, page_chunk_id
+from pdfchat.extraction import PageRecord, assign_offsets
+from pdfchat.structure import Heading, assign_sections
+from pdfchat.vector_store import open_local_vector_store
+
+
+def fixed_batches(engine, size):
+    """Have the engine embed in batches of exactly `size` chunks."""
+    engine.embed_batcher = AdaptiveBatcher(
+        engine.embed_model.get_text_embedding_batch,
+        batch_size=size,
+        min_batch_size=1,
+        adaptive=False,
+    )
+
+
+def page_records(pages):
+    """Page records the way the extractors produce them."""
+    return list(assign_offsets(PageRecord(n, text) for n, text in pages.items()))
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Engine with Qdrant and Ollama replaced by mocks."""
+    with patch("pdfchat.enterprise_ingestion.QdrantClient"), patch(
+        "pdfchat.enterprise_ingestion.QdrantVectorStore"
+    ), patch("pdfchat.enterprise_ingestion.OllamaEmbedding") as mock_embedding:
+        mock_embedding.return_value.get_text_embedding_batch.side_effect = (
+            lambda texts: [[float(len(t)), 1.0, 0.5] for t in texts]
+        )
+        config = Config(
+            docs_dir=str(tmp_path / "docs"), persist_dir=str(tmp_path / "store")
+        )
+        yield EnterpriseIngestionEngine(config, max_workers=1)
+
+
+class RecordingEmbedding(BaseEmbedding):
+    """Embedding model that records the size of each batch it is sent."""
+
+    base_url: str = ""
+    batches: List[int] = Field(default_factory=list)
+
+    def _get_text_embeddings(self, texts):
+        self.batches.append(len(texts))
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def _get_text_embedding(self, text):
+        return self._get_text_embeddings([text])[0]
+
+    def _get_query_embedding(self, query):
+        return self._get_text_embedding(query)
+
+    async def _aget_query_embedding(self, query):
+        return self._get_query_embedding(query)
+
+
+class TestEmbeddingBatches:
+    """Test cases for the batches the embedding model receives."""
+
+    def test_batches_reach_model_whole(self, tmp_path):
+        """Test expected use case: batcher batches are not re-split by the models."""
+        with patch("pdfchat.enterprise_ingestion.QdrantClient"), patch(
+            "pdfchat.enterprise_ingestion.QdrantVectorStore"
+        ), patch("pdfchat.enterprise_ingestion.OllamaEmbedding", RecordingEmbedding):
+            engine = EnterpriseIngestionEngine(
+                Config(
+                    persist_dir=str(tmp_path / "store"),
+                    chunking={"batch_size": 48, "adaptive_batching": False},
+                ),
+                max_workers=1,
+            )
+        chunks = [f"chunk number {i}" for i in range(100)]
+
+        embeddings = engine.embed_chunks_parallel(chunks)
+
+        assert len(embeddings) == 100
+        assert sorted(engine.embed_model._inner.batches) == [4, 48, 48]
+
+
+class TestPageChunks:
+    """Test cases for page chunk spans and citation metadata."""
+
+    def test_chunks_carry_document_offsets(self, engine):
+        """Test expected use case: chunk spans index the document text."""
+        records = page_records({1: "First page.", 2: "Second page text."})
+
+        chunks = engine.create_page_chunks(records)
+
+        assert [(c.page, c.start, c.end) for c in chunks] == [
+            (1, 0, 11),
+            (2, 13, 30),
+        ]
+
+    def test_payload_has_page_span(self, engine, tmp_path):
+        """Test expected use case: stored points carry page and character spans."""
+        pdf = tmp_path / "manual.pdf"
+        pdf.write_bytes(b"%PDF")
+        records = page_records({1: "Intro text.", 2: "Install steps."})
+
+        with patch.object(engine, "extract_pages", return_value=records):
+            engine.process_document_enterprise(str(pdf), "manual")
+
+        payloads = [
+            p["payload"] for p in engine.qdrant_client.upsert.call_args.kwargs["points"]
+        ]
+        assert [
+            (p["page_start"], p["page_end"], p["char_start"], p["char_end"])
+            for p in payloads
+        ] == [(1, 1, 0, 11), (2, 2, 13, 27)]
+
+    def test_chunker_shared_until_budget_changes(self, engine):
+        """Test edge case: one chunker pool serves documents of the same budget."""
+        records = page_records({1: "First page.", 2: "Second page text."})
+
+        engine.create_page_chunks(records)
+        chunker = engine._page_chunker
+        engine.create_page_chunks(records)
+        assert engine._page_chunker is chunker
+
+        engine.create_page_chunks(records, chunk_size=512, chunk_overlap=20)
+        assert engine._page_chunker.budget == (512, 20)
+
+
+def section_records(pages, headings):
+    """Page records with sections assigned from per-page headings."""
+    records = assign_offsets(
+        PageRecord(n, text, headings=headings.get(n, ())) for n, text in pages.items()
+    )
+    return list(assign_sections(records))
+
+
+class TestSectionChunks:
+    """Test cases for chunking within document sections."""
+
+    def test_chunks_split_at_headings(self, engine):
+        """Test expected use case: chunks stop at headings and carry their path."""
+        records = section_records(
+            {1: "Install Do this. Network Set vlan.", 2: "Tag uplinks."},
+            {1: (Heading(1, "Install", 0), Heading(2, "Network", 17))},
+        )
+
+        chunks = engine.create_page_chunks(records)
+
+        assert [(c.page, c.text, c.section) for c in chunks] == [
+            (1, "Install Do this.", ("Install",)),
+            (1, "Network Set vlan.", ("Install", "Network")),
+            (2, "Tag uplinks.", ("Install", "Network")),
+        ]
+        assert chunks[1].start == 17 and chunks[2].start == 36
+
+    def test_payload_has_section_labels(self, engine, tmp_path):
+        """Test expected use case: points carry the section and its ancestors."""
+        pdf = tmp_path / "manual.pdf"
+        pdf.write_bytes(b"%PDF")
+        records = section_records(
+            {1: "Preface.", 2: "Network Set vlan."},
+            {2: (Heading(1, "Install", 0), Heading(2, "Network", 0))},
+        )
+
+        with patch.object(engine, "extract_pages", return_value=records):
+            engine.process_document_enterprise(str(pdf), "manual")
+
+        payloads = [
+            p["payload"] for p in engine.qdrant_client.upsert.call_args.kwargs["points"]
+        ]
+        assert "section" not in payloads[0]
+        assert payloads[1]["section"] == "Install > Network"
+        assert payloads[1]["sections"] == ["Install", "Install > Network"]
+
+    def test_renamed_section_reembeds_its_pages(self, engine, tmp_path):
+        """Test edge case: pages under a renamed heading count as changed."""
+        pdf = tmp_path / "manual.pdf"
+        pdf.write_bytes(b"%PDF")
+        pages = {1: "Setup Do this.", 2: "More steps."}
+
+        with patch.object(
+            engine,
+            "extract_pages",
+            return_value=section_records(pages, {1: (Heading(1, "Setup", 0),)}),
+        ):
+            first = engine.process_document_enterprise(str(pdf), "manual")
+
+        pages[1] = "Install Do this."
+        with patch.object(
+            engine,
+            "extract_pages",
+            return_value=section_records(pages, {1: (Heading(1, "Install", 0),)}),
+        ):
+            second = engine.process_document_enterprise(
+                str(pdf), "manual", previous_pages=first["pages"]
+            )
+
+        assert second["success"] and second["reused_pages"] == 0
+        payloads = [
+            p["payload"] for p in engine.qdrant_client.upsert.call_args.kwargs["points"]
+        ]
+        assert [(p["page"], p["section"]) for p in payloads] == [
+            (1, "Install"),
+            (2, "Install"),
+        ]
+
+
+class TestPageDeltaIngestion:
+    """Test cases for page-level delta re-ingestion."""
+
+    def test_only_changed_pages_reembedded(self, engine, tmp_path):
+        """Test expected use case: unchanged pages keep their vectors."""
+        pdf = tmp_path / "manual.pdf"
+        pdf.write_bytes(b"%PDF")
+        pages = {1: "Intro text.", 2: "Install steps.", 3: "Errata here."}
+        embed = engine.embed_model._inner.get_text_embedding_batch
+
+        with patch.object(engine, "extract_pages", return_value=page_records(pages)):
+            first = engine.process_document_enterprise(str(pdf), "manual")
+        assert first["success"] and first["reused_pages"] == 0
+        embedded_first = sum(len(c.args[0]) for c in embed.call_args_list)
+
+        embed.reset_mock()
+        pages[3] = "Errata corrected."
+        with patch.object(engine, "extract_pages", return_value=page_records(pages)):
+            second = engine.process_document_enterprise(
+                str(pdf), "manual", previous_pages=first["pages"]
+            )
+
+        assert second["success"]
+        assert second["reused_pages"] == 2
+        assert [c.args[0] for c in embed.call_args_list] == [["Errata corrected."]]
+        assert embedded_first == 3
+        deleted = engine.qdrant_client.delete.call_args.kwargs["points_selector"]
+        assert deleted.points == [page_chunk_id("manual", 3, 0)]
+        assert engine.local_store.num_vectors == 3
+        assert second["pages"]["1"] == first["pages"]["1"]
+
+    def test_removed_page_deleted(self, engine, tmp_path):
+        """Test edge case: pages that disappear lose their vectors."""
+        pdf = tmp_path / "manual.pdf"
+        pdf.write_bytes(b"%PDF")
+        pages = {1: "Intro text.", 2: "Obsolete page."}
+
+        with patch.object(engine, "extract_pages", return_value=page_records(pages)):
+            first = engine.process_document_enterprise(str(pdf), "manual")
+        del pages[2]
+        with patch.object(engine, "extract_pages", return_value=page_records(pages)):
+            second = engine.process_document_enterprise(
+                str(pdf), "manual", previous_pages=first["pages"]
+            )
+
+        assert second["success"]
+        assert list(second["pages"]) == ["1"]
+        assert engine.local_store.num_vectors == 1
+
+    def test_mirror_apart_from_query_store(self, engine, tmp_path):
+        """Test edge case: the mirror does not share the query server's store."""
+        pdf = tmp_path / "manual.pdf"
+        pdf.write_bytes(b"%PDF")
+        query_store = open_local_vector_store(engine.config)
+
+        with patch.object(
+            engine, "extract_pages", return_value=page_records({1: "Intro text."})
+        ):
+            engine.process_document_enterprise(str(pdf), "manual")
+        query_store.reload()
+
+        assert engine.local_store.num_vectors == 1
+        assert query_store.num_vectors == 0
+
+    def test_no_text_fails(self, engine, tmp_path):
+        """Test failure case: a PDF without text is reported as failed."""
+        with patch.object(engine, "extract_pages", return_value=[]):
+            result = engine.process_document_enterprise(str(tmp_path / "x.pdf"))
+        assert result["success"] is False
+
+
+class TestIncrementalIngestion:
+    """Test cases for manifest-driven incremental ingestion."""
+
+    def test_rerun_skips_unchanged_files(self, engine):
+        """Test expected use case: a no-op re-ingest processes nothing."""
+        docs = engine.config.docs_dir
+        with open(f"{docs}/a.pdf", "wb") as f:
+            f.write(b"%PDF a")
+
+        with patch.object(
+            engine, "extract_pages", return_value=page_records({1: "Alpha."})
+        ):
+            first = engine.ingest_pdfs_enterprise()
+            second = engine.ingest_pdfs_enterprise()
+
+        assert first["successful_files"] == 1
+        assert second["skipped_files"] == 1
+        assert second["results"] == []
+        assert engine.manifest.get(f"{docs}/a.pdf").pages["1"]["chunks"] == 1
+
+    def test_manifest_keyed_on_loaded_tokenizer(self, engine):
+        """Test edge case: a fallback tokenizer is recorded, not the configured one."""
+        loaded = load_tokenizer(DEFAULT_TOKENIZER).name
+
+        assert engine.chunker == f"native:flat:{loaded}"
+
+
+class TestStreamingIngestion:
+    """Test cases for the streaming page/chunk/embed/upsert pipeline."""
+
+    @pytest.fixture
+    def streaming(self, engine):
+        """Engine with streaming enabled and two chunks per embedding batch."""
+        engine.config.chunking = {"enable_streaming": True}
+        fixed_batches(engine, 2)
+        return engine
+
+    def test_matches_batch_ingestion(self, engine, tmp_path):
+        """Test expected use case: streaming stores what the batch path stores."""
+        pdf = tmp_path / "manual.pdf"
+        pdf.write_bytes(b"%PDF")
+        pages = {n: f"Page {n} text." for n in range(1, 6)}
+
+        with patch.object(engine, "extract_pages", return_value=page_records(pages)):
+            batch = engine.process_document_enterprise(str(pdf), "manual")
+        batch_points = {
+            p["id"]: p["payload"]["text"]
+            for c in engine.qdrant_client.upsert.call_args_list
+            for p in c.kwargs["points"]
+        }
+
+        engine.qdrant_client.upsert.reset_mock()
+        engine.config.chunking = {"enable_streaming": True}
+        fixed_batches(engine, 2)
+        with patch.object(engine, "iter_pages", return_value=iter(page_records(pages))):
+            streamed = engine.process_document_enterprise(str(pdf), "manual")
+        streamed_points = {
+            p["id"]: p["payload"]["text"]
+            for c in engine.qdrant_client.upsert.call_args_list
+            for p in c.kwargs["points"]
+        }
+
+        assert streamed["success"]
+        assert streamed["pages"] == batch["pages"]
+        assert streamed["total_chunks"] == batch["total_chunks"] == 5
+        assert streamed_points == batch_points
+        assert engine.qdrant_client.upsert.call_count == 3
+        assert engine.local_store.num_vectors == 5
+
+    def test_only_changed_pages_reembedded(self, streaming, tmp_path):
+        """Test expected use case: unchanged pages are skipped while streaming."""
+        pdf = tmp_path / "manual.pdf"
+        pdf.write_bytes(b"%PDF")
+        pages = {1: "Intro text.", 2: "Install steps.", 3: "Errata here."}
+        embed = streaming.embed_model._inner.get_text_embedding_batch
+
+        with patch.object(streaming, "iter_pages", return_value=iter(page_records(pages))):
+            first = streaming.process_document_enterprise(str(pdf), "manual")
+        embed.reset_mock()
+        pages[3] = "Errata corrected."
+        del pages[2]
+        with patch.object(streaming, "iter_pages", return_value=iter(page_records(pages))):
+            second = streaming.process_document_enterprise(
+                str(pdf), "manual", previous_pages=first["pages"]
+            )
+
+        assert second["success"] and second["reused_pages"] == 1
+        assert [c.args[0] for c in embed.call_args_list] == [["Errata corrected."]]
+        assert list(second["pages"]) == ["1", "3"]
+        assert streaming.local_store.num_vectors == 2
+
+    def test_extraction_error_fails_document(self, streaming, tmp_path):
+        """Test failure case: an extraction error fails only that document."""
+
+        def broken_pages():
+            yield PageRecord(1, "Intro text.")
+            raise OSError("truncated file")
+
+        with patch.object(streaming, "iter_pages", return_value=broken_pages()):
+            result = streaming.process_document_enterprise(str(tmp_path / "x.pdf"))
+
+        assert result["success"] is False
+        assert "truncated file" in result["error"]
+
+    def test_stages_overlap_across_documents(self, streaming):
+        """Test expected use case: one file is stored while the next is extracted."""
+        streaming.stage_workers = {"extract": 1, "chunk": 1, "embed": 1, "store": 1}
+        docs = streaming.config.docs_dir
+        for name in ("a", "b"):
+            with open(f"{docs}/{name}.pdf", "wb") as f:
+                f.write(f"%PDF {name}".encode())
+        extracting = {"a.pdf": threading.Event(), "b.pdf": threading.Event()}
+        overlapped = []
+        store = streaming.store_vectors_batch
+
+        def pages(pdf_path):
+            extracting[os.path.basename(pdf_path)].set()
+            yield PageRecord(1, f"Text of {pdf_path}.")
+
+        def slow_store(chunks, embeddings, metadata, **kwargs):
+            other = "b.pdf" if metadata["file_name"] == "a.pdf" else "a.pdf"
+            overlapped.append(extracting[other].wait(timeout=5))
+            return store(chunks, embeddings, metadata, **kwargs)
+
+        with patch.object(streaming, "iter_pages", side_effect=pages), patch.object(
+            streaming, "store_vectors_batch", side_effect=slow_store
+        ):
+            summary = streaming.ingest_pdfs_enterprise()
+
+        assert summary["successful_files"] == 2
+        assert overlapped == [True, True]
+        assert streaming.manifest.get(f"{docs}/b.pdf").pages["1"]["chunks"] == 1
+
+    def test_failed_document_isolated(self, streaming):
+        """Test failure case: one unreadable file does not fail the batch."""
+        docs = streaming.config.docs_dir
+        for name in ("good", "bad"):
+            with open(f"{docs}/{name}.pdf", "wb") as f:
+                f.write(f"%PDF {name}".encode())
+
+        def pages(pdf_path):
+            if pdf_path.endswith("bad.pdf"):
+                raise OSError("truncated file")
+            yield PageRecord(1, "Readable text.")
+
+        with patch.object(streaming, "iter_pages", side_effect=pages):
+            summary = streaming.ingest_pdfs_enterprise()
+
+        assert summary["successful_files"] == 1 and summary["failed_files"] == 1
+        assert streaming.manifest.get(f"{docs}/bad.pdf") is None
+        assert streaming.manifest.get(f"{docs}/good.pdf") is not None
+
+    def test_chunking_error_fails_document(self, streaming):
+        """Test failure case: a page that cannot be chunked keeps its file out of the manifest."""
+        docs = streaming.config.docs_dir
+        for name in ("good", "bad"):
+            with open(f"{docs}/{name}.pdf", "wb") as f:
+                f.write(f"%PDF {name}".encode())
+        chunk = streaming.create_page_chunks
+
+        def create_page_chunks(pages, **kwargs):
+            if pages[0].text == "Unsplittable.":
+                raise ValueError("tokenizer failed")
+            return chunk(pages, **kwargs)
+
+        def pages(pdf_path):
+            yield PageRecord(1, "Readable text.")
+            if pdf_path.endswith("bad.pdf"):
+                yield PageRecord(2, "Unsplittable.")
+
+        with patch.object(streaming, "iter_pages", side_effect=pages), patch.object(
+            streaming, "create_page_chunks", side_effect=create_page_chunks
+        ):
+            summary = streaming.ingest_pdfs_enterprise()
+
+        assert summary["successful_files"] == 1 and summary["failed_files"] == 1
+        assert streaming.manifest.get(f"{docs}/bad.pdf") is None
+        assert streaming.manifest.get(f"{docs}/good.pdf") is not None
+
+    def test_delete_error_fails_document(self, streaming):
+        """Test failure case: a failed delete of old vectors fails only that document."""
+        docs = streaming.config.docs_dir
+        for name in ("good", "bad"):
+            with open(f"{docs}/{name}.pdf", "wb") as f:
+                f.write(f"%PDF {name}".encode())
+        delete = streaming.delete_document_vectors
+
+        def delete_document_vectors(file_id):
+            if file_id.startswith("bad_"):
+                raise ConnectionError("qdrant unavailable")
+            delete(file_id)
+
+        with patch.object(
+            streaming, "iter_pages", side_effect=lambda _: iter([PageRecord(1, "Text.")])
+        ), patch.object(
+            streaming, "delete_document_vectors", side_effect=delete_document_vectors
+        ):
+            summary = streaming.ingest_pdfs_enterprise()
+
+        assert summary["successful_files"] == 1 and summary["failed_files"] == 1
+        assert streaming.manifest.get(f"{docs}/bad.pdf") is None
+        assert streaming.manifest.get(f"{docs}/good.pdf") is not None
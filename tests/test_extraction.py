@@ -0,0 +1,227 @@
+"""
+Tests for the process-pool PDF extraction module.
+"""
+
+from unittest.mock import patch
+
+import fitz
+import pytest
+
+from pdfchat.extraction import (
+    MIN_RANGE_PAGES,
+    PAGE_SEPARATOR,
+    ExtractionError,
+    PageExtractor,
+    PageRecord,
+    assign_offsets,
+    extract_page_range,
+    page_ranges,
+)
+
+
+def make_pdf(path, pages, blank=()):
+    """Write a PDF whose pages read 'Page N', leaving `blank` pages empty."""
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        if number not in blank:
+            page.insert_text((72, 72), f"Page {number}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def make_manual(path, outline=True):
+    """Write a two-page PDF with a chapter and a bold subsection heading."""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Installation", fontsize=20, fontname="hebo")
+    page.insert_text((72, 110), "Install the witness host first.", fontsize=11)
+    page.insert_text((72, 130), "Network Setup", fontsize=11, fontname="hebo")
+    page.insert_text((72, 150), "Configure the vlan on every host.", fontsize=11)
+    doc.new_page().insert_text((72, 72), "Tag the vlan on the uplinks.", fontsize=11)
+    if outline:
+        doc.set_toc([[1, "Installation", 1], [2, "Network Setup", 1]])
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def failing_pages(pages, times=float("inf")):
+    """Make `get_text` raise on the given 1-based pages, `times` times each."""
+    get_text = fitz.Page.get_text
+    left = dict.fromkeys(pages, times)
+
+    def flaky(page, *args, **kwargs):
+        if left.get(page.number + 1, 0) > 0:
+            left[page.number + 1] -= 1
+            raise RuntimeError("damaged content stream")
+        return get_text(page, *args, **kwargs)
+
+    return patch.object(fitz.Page, "get_text", flaky)
+
+
+class TestPageRanges:
+    """Test cases for page_ranges function."""
+
+    def test_ranges_cover_all_pages(self):
+        """Test expected use case: ranges are contiguous and complete."""
+        ranges = page_ranges(10_000, workers=4)
+
+        assert ranges[0][0] == 0 and ranges[-1][1] == 10_000
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert len(ranges) == 16
+
+    def test_small_documents_not_oversplit(self):
+        """Test edge case: ranges never go below the minimum size."""
+        assert page_ranges(MIN_RANGE_PAGES, workers=8) == [(0, MIN_RANGE_PAGES)]
+        assert page_ranges(0, workers=4) == []
+
+
+class TestExtractPageRange:
+    """Test cases for extract_page_range function."""
+
+    def test_extracts_non_empty_pages(self, tmp_path):
+        """Test expected use case: 1-based page numbers, blank pages dropped."""
+        pdf = make_pdf(tmp_path / "doc.pdf", 5, blank={3})
+
+        records, failed = extract_page_range(pdf, 1, 5)
+
+        assert [(r.page, r.text) for r in records] == [
+            (2, "Page 2"),
+            (4, "Page 4"),
+            (5, "Page 5"),
+        ]
+        assert all(r.bboxes is None for r in records)
+        assert failed == ()
+
+    def test_bounding_boxes(self, tmp_path):
+        """Test expected use case: text block rectangles are kept on request."""
+        pdf = make_pdf(tmp_path / "doc.pdf", 1)
+
+        (record,) = extract_page_range(pdf, 0, 1, bboxes=True).records
+
+        (x0, y0, x1, y1), = record.bboxes
+        assert x0 < x1 and y0 < y1 and y1 <= 80
+
+
+    def test_outline_headings(self, tmp_path):
+        """Test expected use case: headings come from the outline when there is one."""
+        pdf = make_manual(tmp_path / "manual.pdf")
+
+        first, second = extract_page_range(pdf, 0, 2, headings=True).records
+
+        assert [(h.level, h.title) for h in first.headings] == [
+            (1, "Installation"),
+            (2, "Network Setup"),
+        ]
+        assert first.text[first.headings[1].offset :].startswith("Network Setup")
+        assert second.headings == ()
+        assert first.sections is None
+
+    def test_font_headings_without_outline(self, tmp_path):
+        """Test edge case: without an outline, headings come from the fonts."""
+        pdf = make_manual(tmp_path / "manual.pdf", outline=False)
+
+        (first, _) = extract_page_range(pdf, 0, 2, headings=True).records
+
+        assert [(h.level, h.title) for h in first.headings] == [
+            (1, "Installation"),
+            (4, "Network Setup"),
+        ]
+
+
+    def test_failed_pages_reported(self, tmp_path):
+        """Test failure case: a page that raises is reported, not dropped silently."""
+        pdf = make_pdf(tmp_path / "doc.pdf", 3)
+
+        with failing_pages({2}):
+            records, failed = extract_page_range(pdf, 0, 3)
+
+        assert [r.page for r in records] == [1, 3]
+        assert failed == (2,)
+
+
+class TestAssignOffsets:
+    """Test cases for assign_offsets function."""
+
+    def test_offsets_index_joined_text(self):
+        """Test expected use case: offsets slice the pages out of the joined text."""
+        records = list(
+            assign_offsets([PageRecord(1, "alpha"), PageRecord(4, "beta gamma")])
+        )
+        joined = PAGE_SEPARATOR.join(r.text for r in records)
+
+        assert [joined[r.start : r.end] for r in records] == ["alpha", "beta gamma"]
+        assert records[1].start == 5 + len(PAGE_SEPARATOR)
+
+
+class TestPageExtractor:
+    """Test cases for PageExtractor class."""
+
+    def test_pool_matches_serial(self, tmp_path):
+        """Test expected use case: parallel ranges give the serial result."""
+        total = 3 * MIN_RANGE_PAGES + 5
+        pdf = make_pdf(tmp_path / "doc.pdf", total, blank={20})
+        extractor = PageExtractor(workers=2)
+        try:
+            pages = extractor.extract(pdf)
+        finally:
+            extractor.close()
+
+        assert pages == list(assign_offsets(extract_page_range(pdf, 0, total).records))
+        assert [r.page for r in pages] == [n for n in range(1, total + 1) if n != 20]
+
+    def test_single_worker_in_process(self, tmp_path):
+        """Test edge case: one worker extracts without starting a pool."""
+        pdf = make_pdf(tmp_path / "doc.pdf", 3)
+        extractor = PageExtractor(workers=1)
+
+        assert [(r.page, r.text, r.start) for r in extractor.extract(pdf)] == [
+            (1, "Page 1", 0),
+            (2, "Page 2", 8),
+            (3, "Page 3", 16),
+        ]
+        assert extractor._pool is None
+
+    def test_sections_assigned_in_page_order(self, tmp_path):
+        """Test expected use case: section paths carry over to the next page."""
+        pdf = make_manual(tmp_path / "manual.pdf")
+
+        first, second = PageExtractor(workers=1, headings=True).extract(pdf)
+
+        assert [s.path for s in first.sections] == [
+            ("Installation",),
+            ("Installation", "Network Setup"),
+        ]
+        assert [s.path for s in second.sections] == [("Installation", "Network Setup")]
+
+    def test_range_timeout_fails_document(self, tmp_path):
+        """Test failure case: a range past its timeout fails the document and resets the pool."""
+        pdf = make_pdf(tmp_path / "doc.pdf", 3 * MIN_RANGE_PAGES)
+        extractor = PageExtractor(workers=2, range_timeout=0.0001)
+
+        with pytest.raises(ExtractionError, match="timed out"):
+            extractor.extract(pdf)
+        assert extractor._pool is None
+
+    def test_failed_page_retried(self, tmp_path):
+        """Test edge case: a page that fails once is extracted on retry."""
+        pdf = make_pdf(tmp_path / "doc.pdf", 3)
+
+        with failing_pages({2}, times=1):
+            pages = PageExtractor(workers=1).extract(pdf)
+
+        assert [r.page for r in pages] == [1, 2, 3]
+
+    def test_failed_page_fails_document(self, tmp_path):
+        """Test failure case: a page that keeps failing fails the document."""
+        pdf = make_pdf(tmp_path / "doc.pdf", 3)
+
+        with failing_pages({2}), pytest.raises(ExtractionError, match="page 2"):
+            PageExtractor(workers=1).extract(pdf)
+
+    def test_missing_file(self, tmp_path):
+        """Test failure case: an unreadable PDF raises."""
+        with pytest.raises(RuntimeError, match="no such file"):
+            PageExtractor(workers=2).extract(str(tmp_path / "missing.pdf"))
@@ -0,0 +1,335 @@
+"""
+Tests for the FastAPI server module.
+"""
+
+import asyncio
+import json
+import threading
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from pdfchat.admission import AdmissionController
+from pdfchat.config import Config
+from pdfchat.fastapi_server import FastAPIQueryServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Server whose query engine is replaced by a streaming mock."""
+    config = Config(docs_dir=str(tmp_path / "docs"), persist_dir=str(tmp_path / "store"))
+    server = FastAPIQueryServer(config)
+    node = Mock(text="Enable vSAN first.", metadata={"file_name": "vsan.pdf"}, score=0.9)
+    response = Mock(source_nodes=[node], response_gen=iter(["Enable ", "vSAN."]))
+    server.query_engines.get_query_engine = Mock(
+        return_value=Mock(query=Mock(return_value=response))
+    )
+    return server
+
+
+def read_frames(response):
+    """Decode an NDJSON response body into frames."""
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def slow_query(server, release):
+    """Make queries block until `release` is set."""
+
+    def process(query_text, max_results=5, query_embedding=None, section=None):
+        release.wait(5)
+        return {
+            "answer": "done",
+            "sources": [],
+            "query_analysis": server._analyze_query(query_text),
+        }
+
+    server._process_query = Mock(side_effect=process)
+
+
+class TestQueryExecution:
+    """Test cases for running /query off the event loop."""
+
+    def test_health_served_during_slow_query(self, server):
+        """Test expected use case: a generating query does not block health checks."""
+        release = threading.Event()
+        slow_query(server, release)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                query = asyncio.create_task(client.post("/query", json={"query": "vSAN?"}))
+                await asyncio.sleep(0.05)
+                health = await client.get("/health")
+                assert not query.done()
+                release.set()
+                return health, await query
+
+        health, query = asyncio.run(scenario())
+
+        assert health.status_code == 200
+        assert query.json()["answer"] == "done"
+
+    def test_deadline_returns_504(self, server):
+        """Test failure case: a query past its deadline gets a 504."""
+        server.config.llm_timeout = 0.05
+        release = threading.Event()
+        slow_query(server, release)
+
+        response = TestClient(server.app).post("/query", json={"query": "vSAN?"})
+        release.set()
+
+        assert response.status_code == 504
+        assert "timed out" in response.json()["detail"]
+
+
+class TestAdmission:
+    """Test cases for admission control on /query."""
+
+    def test_saturated_server_sheds_load(self, server):
+        """Test failure case: with no free slot and no queue, 429 with Retry-After."""
+        server.admission = AdmissionController(max_concurrent=1, max_queue=0)
+        release = threading.Event()
+        slow_query(server, release)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = asyncio.create_task(client.post("/query", json={"query": "a"}))
+                while not server.admission.metrics()["in_flight"]:
+                    await asyncio.sleep(0.01)
+                rejected = await client.post("/query", json={"query": "b"})
+                metrics = (await client.get("/admin/admission")).json()
+                release.set()
+                return await first, rejected, metrics
+
+        first, rejected, metrics = asyncio.run(scenario())
+
+        assert first.status_code == 200
+        assert rejected.status_code == 429
+        assert int(rejected.headers["Retry-After"]) >= 1
+        assert metrics["in_flight"] == 1
+        assert metrics["rejected_queue_full"] == 1
+
+    def test_queued_queries_share_embedding_batch(self, server):
+        """Test expected use case: queries waiting for a slot embed together."""
+        server.admission = AdmissionController(max_concurrent=1, max_queue=5)
+        server.query_engines._snapshot = Mock()
+        server.query_batcher.max_wait_ms = 50
+        server.query_batcher.embed_batch = Mock(
+            side_effect=lambda texts: [[1.0, 0.0] for _ in texts]
+        )
+        release = threading.Event()
+        release.set()
+        slow_query(server, release)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(
+                    *(client.post("/query", json={"query": q}) for q in "abc")
+                )
+
+        responses = asyncio.run(scenario())
+
+        assert [r.status_code for r in responses] == [200, 200, 200]
+        server.query_batcher.embed_batch.assert_called_once_with(["a", "b", "c"])
+
+    def test_cache_hit_needs_no_slot(self, server):
+        """Test edge case: a saturated server still answers from the cache."""
+        server.admission = AdmissionController(max_concurrent=1, max_queue=0)
+        server.query_engines._snapshot = Mock()
+        server.query_batcher.embed_batch = Mock(
+            side_effect=lambda texts: [[1.0, 0.0] for _ in texts]
+        )
+        release = threading.Event()
+        slow_query(server, release)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = asyncio.create_task(client.post("/query", json={"query": "a"}))
+                while not server.admission.metrics()["in_flight"]:
+                    await asyncio.sleep(0.01)
+                server.answer_cache.put(
+                    [1.0, 0.0],
+                    {
+                        "answer": "Cached.",
+                        "sources": [],
+                        "query_analysis": server._analyze_query("a"),
+                    },
+                    server.query_engines.generation,
+                    5,
+                )
+                cached = await client.post("/query", json={"query": "a again"})
+                release.set()
+                return await first, cached
+
+        first, cached = asyncio.run(scenario())
+
+        assert first.status_code == 200
+        assert (cached.status_code, cached.json()["answer"]) == (200, "Cached.")
+
+
+class TestQueryBatching:
+    """Test cases for micro-batched query embeddings on /query."""
+
+    def test_embedding_passed_to_engine(self, server):
+        """Test expected use case: the batched embedding is reused for retrieval."""
+        server.query_engines._snapshot = Mock()
+        server.query_batcher.embed_batch = Mock(return_value=[[0.5, 0.5]])
+        engine = server.query_engines.get_query_engine.return_value
+        engine.query.return_value = Mock(
+            response="Yes.", source_nodes=[], processing_time=None
+        )
+
+        response = TestClient(server.app).post("/query", json={"query": "vSAN?"})
+
+        assert response.status_code == 200
+        server.query_batcher.embed_batch.assert_called_once_with(["vSAN?"])
+        bundle = engine.query.call_args.args[0]
+        assert (bundle.query_str, bundle.embedding) == ("vSAN?", [0.5, 0.5])
+
+
+class TestQueryStream:
+    """Test cases for the /query/stream endpoint."""
+
+    def test_sources_then_tokens_then_done(self, server):
+        """Test expected use case: frames arrive in order with timings last."""
+        response = TestClient(server.app).post("/query/stream", json={"query": "vSAN?"})
+        frames = read_frames(response)
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [f["type"] for f in frames] == ["sources", "token", "token", "done"]
+        assert frames[0]["sources"][0]["metadata"] == {"file_name": "vsan.pdf"}
+        assert "".join(f["text"] for f in frames[1:3]) == "Enable vSAN."
+        assert frames[-1]["time_to_first_token"] <= frames[-1]["processing_time"]
+        server.query_engines.get_query_engine.assert_called_once_with(
+            similarity_top_k=5, response_mode="compact", streaming=True, section=None
+        )
+
+    def test_sources_carry_page_span(self, server):
+        """Test expected use case: sources cite the pages their chunk came from."""
+        node = server.query_engines.get_query_engine().query().source_nodes[0]
+        node.metadata = {"file_name": "vsan.pdf", "page_start": 12, "page_end": 12}
+
+        frames = read_frames(
+            TestClient(server.app).post("/query/stream", json={"query": "vSAN?"})
+        )
+
+        source = frames[0]["sources"][0]
+        assert (source["page_start"], source["page_end"]) == (12, 12)
+
+    def test_page_label_fallback(self, server):
+        """Test edge case: reader-ingested chunks cite their page label."""
+        nodes = [
+            Mock(text="a", metadata={"page_label": "7"}, score=0.5),
+            Mock(text="b", metadata={"page_label": "iv"}, score=0.4),
+        ]
+
+        sources = server._format_sources(nodes)
+
+        assert [(s["page_start"], s["page_end"]) for s in sources] == [
+            (7, 7),
+            (None, None),
+        ]
+
+    def test_error_frame(self, server):
+        """Test failure case: errors after the headers are sent are in-band."""
+        server.query_engines.get_query_engine.side_effect = RuntimeError("model down")
+
+        frames = read_frames(
+            TestClient(server.app).post("/query/stream", json={"query": "vSAN?"})
+        )
+
+        assert frames == [
+            {"type": "error", "detail": "Query processing failed: model down"}
+        ]
+
+
+class TestAnswerCache:
+    """Test cases for serving /query from the semantic answer cache."""
+
+    def test_paraphrase_served_from_cache(self, server):
+        """Test expected use case: a near-duplicate question skips generation."""
+        server.query_engines._snapshot = Mock()
+        server.ingestion.embed_query = Mock(side_effect=[[1.0, 0.0], [0.99, 0.01]])
+        server._generate_answer = Mock(return_value={"answer": "Yes.", "sources": []})
+
+        first = server._process_query("Is vSAN supported?")
+        second = server._process_query("Is vSAN supported at all?")
+
+        assert server._generate_answer.call_count == 1
+        assert "cached" not in first
+        assert second == {"answer": "Yes.", "sources": [], "cached": True}
+        stats = TestClient(server.app).get("/admin/cache").json()
+        assert stats["answers"]["hits"] == 1
+
+
+class TestReadiness:
+    """Test cases for the startup warm-up and /ready endpoint."""
+
+    def test_not_ready_until_warm(self, server):
+        """Test expected use case: /ready is 503 before warm-up and 200 after."""
+        server.ingestion.embed_query = Mock(return_value=[1.0])
+        server.query_engines.refresh = Mock()
+        client = TestClient(server.app)
+
+        before = client.get("/ready")
+        server.warmup.run()
+        after = client.get("/ready")
+
+        assert before.status_code == 503
+        assert before.json()["components"]["embedding"]["state"] == "pending"
+        assert client.get("/health").status_code == 200
+        assert after.status_code == 200
+        components = after.json()["components"]
+        assert components["embedding"]["state"] == "ready"
+        assert components["vector_store"]["seconds"] >= 0
+        # No LLM is configured, so there is nothing to warm
+        assert components["llm"]["state"] == "skipped"
+        server.query_engines.refresh.assert_called_once()
+
+    def test_warmup_runs_at_startup(self, tmp_path):
+        """Test expected use case: starting the app warms the LLM in the background."""
+        config = Config(
+            docs_dir=str(tmp_path / "docs"),
+            persist_dir=str(tmp_path / "store"),
+            llm_model="phi3:cpu",
+            llm_base_url="http://ollama:11434",
+            warmup={"embedding": False, "vector_store": False},
+        )
+        server = FastAPIQueryServer(config)
+        with patch("pdfchat.warmup.requests.post") as post:
+            with TestClient(server.app):
+                server.warmup._thread.join(5)
+
+        assert server.warmup.ready
+        assert post.call_args.kwargs["json"]["model"] == "phi3:cpu"
+
+    def test_failed_component_reported(self, server):
+        """Test failure case: a failing component keeps the replica out of rotation."""
+        server.warmup.retry_interval = 0.01
+        server.ingestion.embed_query = Mock(return_value=[1.0])
+        server.query_engines.refresh = Mock(side_effect=RuntimeError("store locked"))
+        server.warmup.stop()
+
+        server.warmup.run()
+        response = TestClient(server.app).get("/ready")
+
+        assert response.status_code == 503
+        assert response.json()["components"]["vector_store"]["error"] == "store locked"
+
+    def test_disabled_warmup_is_ready(self, tmp_path):
+        """Test edge case: with warm-up disabled the server is ready at once."""
+        config = Config(
+            docs_dir=str(tmp_path / "docs"),
+            persist_dir=str(tmp_path / "store"),
+            warmup={"enabled": False},
+        )
+
+        response = TestClient(FastAPIQueryServer(config).app).get("/ready")
+
+        assert response.status_code == 200
+        assert response.json()["components"] == {}
@@ -6,10 +6,13 @@ import os
 import tempfile
 from unittest.mock import Mock, patch
 
+import fitz
 import pytest
 
 from pdfchat.config import Config
+from pdfchat.extraction import PageRecord, assign_offsets
 from pdfchat.ingestion import PDFIngestion
+from pdfchat.structure import Heading, assign_sections
 
 
 class TestPDFIngestion:
@@ -109,3 +112,89 @@ class TestPDFIngestion:
             assert result == mock_index
             mock_load_docs.assert_called_once_with(temp_dir)
             mock_create_store.assert_called_once_with(mock_docs)
+
+
+def make_manual(path):
+    """Write a PDF with a chapter heading and a bold subsection heading."""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Installation", fontsize=20, fontname="hebo")
+    page.insert_text((72, 110), "Install the witness host first.", fontsize=11)
+    page.insert_text((72, 130), "Network Setup", fontsize=11, fontname="hebo")
+    page.insert_text((72, 150), "Configure the vlan on every host.", fontsize=11)
+    doc.new_page().insert_text((72, 72), "Tag the vlan on the uplinks.", fontsize=11)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+class TestDocumentStructure:
+    """Test cases for PDFIngestion structural chunking."""
+
+    @pytest.fixture
+    def ingestion(self, tmp_path):
+        return PDFIngestion(
+            Config(
+                persist_dir=str(tmp_path / "store"),
+                chunking={"structural": True, "tokenizer": "regex"},
+            )
+        )
+
+    def test_section_tree(self, ingestion, tmp_path):
+        """Test expected use case: headings nest by level with their pages."""
+        structure = ingestion.extract_document_structure(
+            make_manual(tmp_path / "manual.pdf")
+        )
+
+        (chapter,) = structure["sections"]
+        assert (chapter["title"], chapter["level"], chapter["page"]) == (
+            "Installation",
+            1,
+            1,
+        )
+        assert [c["title"] for c in chapter["children"]] == ["Network Setup"]
+        assert structure["total_pages"] == 2
+
+    def test_chunks_tagged_with_section(self, ingestion, tmp_path):
+        """Test expected use case: sections are chunked whole across page breaks."""
+        chunks = ingestion.semantic_chunk_document(
+            make_manual(tmp_path / "manual.pdf"), vendor="vmware"
+        )
+
+        assert [
+            (
+                c["metadata"]["page_start"],
+                c["metadata"]["page_end"],
+                c["metadata"]["section"],
+            )
+            for c in chunks
+        ] == [
+            (1, 1, "Installation"),
+            (1, 2, "Installation > Network Setup"),
+        ]
+        assert chunks[1]["content"].startswith("Network Setup")
+        assert chunks[1]["content"].endswith("Tag the vlan on the uplinks.")
+        assert chunks[1]["metadata"]["page_label"] == "1"
+        assert chunks[1]["metadata"]["sections"] == [
+            "Installation",
+            "Installation > Network Setup",
+        ]
+
+    def test_heading_at_page_top_starts_section(self):
+        """Test edge case: a repeated heading opening a page is a new section."""
+        pages = assign_sections(
+            assign_offsets(
+                [
+                    PageRecord(1, "Notes one.", headings=(Heading(1, "Notes", 0),)),
+                    PageRecord(2, "Notes two.", headings=(Heading(1, "Notes", 0),)),
+                    PageRecord(3, "More two."),
+                ]
+            )
+        )
+
+        sections = list(PDFIngestion._section_texts(list(pages)))
+
+        assert sections == [
+            (("Notes",), "Notes one.", [(0, 1)]),
+            (("Notes",), "Notes two.\n\nMore two.", [(0, 2), (12, 3)]),
+        ]
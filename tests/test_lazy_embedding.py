@@ -0,0 +1,118 @@
+"""
+Tests for the lazy embedding model module.
+"""
+
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from pdfchat.config import Config
+from pdfchat.ingestion import PDFIngestion
+from pdfchat.lazy_embedding import LazyEmbedding
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def fake_model():
+    """Mock embedding model returning one float per character."""
+    model = Mock(
+        spec=["get_text_embedding", "get_text_embedding_batch", "get_query_embedding"]
+    )
+    model.get_text_embedding.side_effect = lambda text: [float(len(text))]
+    model.get_text_embedding_batch.side_effect = lambda texts: [
+        [float(len(t))] for t in texts
+    ]
+    model.get_query_embedding.side_effect = lambda query: [-float(len(query))]
+    return model
+
+
+class TestLazyEmbedding:
+    """Test cases for LazyEmbedding class."""
+
+    def test_built_on_first_embedding(self):
+        """Test expected use case: the factory runs when an embedding is needed."""
+        factory = Mock(side_effect=fake_model)
+        model = LazyEmbedding(factory, model_name="nomic")
+
+        assert not model.loaded and factory.call_count == 0
+        assert model.get_text_embedding_batch(["ab", "abc"]) == [[2.0], [3.0]]
+        assert model.get_query_embedding("abcd") == [-4.0]
+        assert model.loaded and factory.call_count == 1
+
+    def test_concurrent_first_calls_build_once(self):
+        """Test edge case: simultaneous first calls share one model."""
+        built = []
+
+        def slow_factory():
+            time.sleep(0.05)
+            built.append(1)
+            return fake_model()
+
+        model = LazyEmbedding(slow_factory)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(model.get_text_embedding("text"))
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(built) == 1
+        assert results == [[4.0]] * 8
+
+    def test_query_batch_without_model_embed(self):
+        """Test expected use case: query batches fall back to per-query calls."""
+        model = LazyEmbedding(fake_model)
+
+        assert model._embed(["a", "abc"], prompt_name="query") == [[-1.0], [-3.0]]
+
+    def test_factory_error_retried(self):
+        """Test failure case: a failed build raises and is retried next time."""
+        factory = Mock(side_effect=[ImportError("no torch"), fake_model()])
+        model = LazyEmbedding(factory)
+
+        with pytest.raises(ImportError):
+            model.get_text_embedding("text")
+        assert model.get_text_embedding("text") == [4.0]
+
+
+class TestLazyImports:
+    """Test cases for deferred model loading and package imports."""
+
+    def test_ingestion_does_not_load_model(self, tmp_path):
+        """Test expected use case: creating the ingestion pipeline loads no model."""
+        ingestion = PDFIngestion(
+            Config(docs_dir=str(tmp_path / "docs"), persist_dir=str(tmp_path / "store"))
+        )
+
+        embed_model = ingestion._get_embed_model()
+
+        assert embed_model is ingestion._get_embed_model()
+        assert not embed_model._inner.loaded
+
+    def test_package_import_is_light(self):
+        """Test expected use case: `import pdfchat` skips the heavy libraries."""
+        check = (
+            "import sys, pdfchat; "
+            "print(sorted(m for m in ('llama_index', 'torch', 'qdrant_client') "
+            "if m in sys.modules))"
+        )
+
+        result = subprocess.run(
+            [sys.executable, "-c", check],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert result.stdout.strip() == "[]"
@@ -0,0 +1,103 @@
+"""
+Tests for the ingestion manifest module.
+"""
+
+import os
+from unittest.mock import patch
+
+from pdfchat.manifest import IngestionManifest, chunker_fingerprint
+
+PARAMS = (512, 50, "test-embed-model")
+
+
+def write_file(path, content):
+    """Write bytes to a file and return its path as a string."""
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+
+class TestIngestionManifest:
+    """Test cases for IngestionManifest class."""
+
+    def test_new_file_needs_ingest(self, tmp_path):
+        """Test expected use case: unknown files are returned for ingestion."""
+        manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+        pdf = write_file(tmp_path / "a.pdf", b"version 1")
+
+        record = manifest.check(pdf, *PARAMS)
+
+        assert record is not None
+        assert record.path == os.path.abspath(pdf)
+        assert record.file_id.startswith("a_")
+        assert len(record.sha256) == 64
+
+    def test_unchanged_file_skipped_without_hashing(self, tmp_path):
+        """Test expected use case: same size and mtime skip the hash."""
+        manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+        pdf = write_file(tmp_path / "a.pdf", b"version 1")
+        manifest.record(manifest.check(pdf, *PARAMS))
+
+        with patch("pdfchat.manifest.file_sha256") as mock_hash:
+            assert manifest.check(pdf, *PARAMS) is None
+            mock_hash.assert_not_called()
+
+    def test_touched_identical_file_skipped(self, tmp_path):
+        """Test edge case: a new mtime with identical bytes is not re-ingested."""
+        manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+        pdf = write_file(tmp_path / "a.pdf", b"version 1")
+        manifest.record(manifest.check(pdf, *PARAMS))
+        os.utime(pdf, (1_000_000, 1_000_000))
+
+        assert manifest.check(pdf, *PARAMS) is None
+        assert manifest.get(pdf).mtime == 1_000_000
+
+    def test_changed_content_or_params_need_ingest(self, tmp_path):
+        """Test expected use case: edits and new chunker settings re-ingest."""
+        manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+        pdf = write_file(tmp_path / "a.pdf", b"version 1")
+        first = manifest.check(pdf, *PARAMS)
+        manifest.record(first)
+
+        assert manifest.check(pdf, 1024, 50, "test-embed-model") is not None
+
+        write_file(tmp_path / "a.pdf", b"version 2 is longer")
+        changed = manifest.check(pdf, *PARAMS)
+        assert changed is not None
+        assert changed.sha256 != first.sha256
+        assert changed.file_id == first.file_id
+
+    def test_changed_chunker_needs_ingest(self, tmp_path):
+        """Test expected use case: a new splitter or structural flag re-ingests."""
+        manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+        pdf = write_file(tmp_path / "a.pdf", b"version 1")
+        flat = chunker_fingerprint("native", False, "gpt2")
+        manifest.record(manifest.check(pdf, *PARAMS, flat))
+
+        assert manifest.check(pdf, *PARAMS, flat) is None
+        structural = chunker_fingerprint("native", True, "gpt2")
+        assert manifest.check(pdf, *PARAMS, structural).chunker == structural
+        assert manifest.check(pdf, *PARAMS, chunker_fingerprint("sentence", False))
+
+    def test_removed_files_and_reload(self, tmp_path):
+        """Test expected use case: records persist and removals are reported."""
+        manifest_path = str(tmp_path / "manifest.json")
+        manifest = IngestionManifest(manifest_path)
+        keep = write_file(tmp_path / "keep.pdf", b"keep")
+        gone = write_file(tmp_path / "gone.pdf", b"gone")
+        manifest.record(manifest.check(keep, *PARAMS))
+        manifest.record(manifest.check(gone, *PARAMS))
+
+        reloaded = IngestionManifest(manifest_path)
+        removed = reloaded.removed_files([keep])
+
+        assert [r.path for r in removed] == [os.path.abspath(gone)]
+        reloaded.remove(gone)
+        assert IngestionManifest(manifest_path).paths() == [os.path.abspath(keep)]
+
+    def test_corrupt_manifest_starts_empty(self, tmp_path):
+        """Test failure case: an unreadable manifest is ignored."""
+        manifest_path = tmp_path / "manifest.json"
+        manifest_path.write_text("{not json")
+
+        assert IngestionManifest(str(manifest_path)).paths() == []
@@ -0,0 +1,251 @@
+"""
+Tests for the ONNX embedding backend module.
+"""
+
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from pdfchat.onnx_embedding import (
+    MIN_REFERENCE_COSINE,
+    SETTINGS_FILE,
+    OnnxEmbedding,
+    export_onnx_model,
+    load_onnx_embedding,
+    mean_pool,
+    normalize,
+    reference_similarity,
+)
+
+
+class FakeTokenizer:
+    """Word tokenizer padding a batch to its longest text, like `tokenizers`."""
+
+    def __init__(self):
+        self.texts = []
+
+    def encode_batch(self, texts):
+        self.texts.extend(texts)
+        words = [text.split() for text in texts]
+        longest = max(len(w) for w in words)
+        return [
+            SimpleNamespace(
+                ids=[len(word) for word in w] + [0] * (longest - len(w)),
+                attention_mask=[1] * len(w) + [0] * (longest - len(w)),
+                type_ids=[0] * longest,
+            )
+            for w in words
+        ]
+
+
+class FakeSession:
+    """Session whose token vectors are (word length, 1)."""
+
+    def __init__(self):
+        self.batches = []
+
+    def run(self, outputs, feeds):
+        self.batches.append(len(feeds["input_ids"]))
+        ids = feeds["input_ids"].astype(np.float32)
+        return [np.stack([ids, np.ones_like(ids)], axis=-1)]
+
+
+def fake_model(tmp_path, **kwargs):
+    model = OnnxEmbedding(str(tmp_path), **kwargs)
+    model._session = FakeSession()
+    model._tokenizer = FakeTokenizer()
+    model._input_names = ["input_ids", "attention_mask"]
+    return model
+
+
+class TestPooling:
+    """Test cases for mean_pool and normalize functions."""
+
+    def test_padding_ignored(self):
+        """Test expected use case: padded positions do not shift the mean."""
+        hidden = np.array([[[1.0, 3.0], [3.0, 5.0], [100.0, 100.0]]])
+
+        pooled = mean_pool(hidden, np.array([[1, 1, 0]]))
+
+        assert pooled.tolist() == [[2.0, 4.0]]
+
+    def test_unit_rows(self):
+        """Test edge case: rows become unit length and zero rows stay zero."""
+        vectors = normalize(np.array([[3.0, 4.0], [0.0, 0.0]]))
+
+        assert vectors.tolist() == [[0.6, 0.8], [0.0, 0.0]]
+
+
+class TestOnnxEmbedding:
+    """Test cases for OnnxEmbedding class."""
+
+    def test_settings_read_from_export(self, tmp_path):
+        """Test expected use case: the export's settings configure the model."""
+        (tmp_path / SETTINGS_FILE).write_text(
+            json.dumps(
+                {
+                    "model_name": "nomic",
+                    "pooling": "cls",
+                    "max_length": 128,
+                    "query_instruction": "search_query: ",
+                    "text_instruction": "search_document: ",
+                }
+            )
+        )
+
+        int8 = OnnxEmbedding(str(tmp_path))
+        fp32 = OnnxEmbedding(str(tmp_path), quantized=False, threads=2)
+
+        assert (int8.model_name, int8.pooling, int8.max_length) == (
+            "nomic:onnx-int8",
+            "cls",
+            128,
+        )
+        assert (fp32.model_name, fp32.threads) == ("nomic:onnx", 2)
+        assert (int8.query_instruction, int8.text_instruction) == (
+            "search_query: ",
+            "search_document: ",
+        )
+
+    def test_mean_pooled_unit_vectors(self, tmp_path):
+        """Test expected use case: a batch is pooled over its unpadded tokens."""
+        model = fake_model(tmp_path, normalize=False)
+
+        embeddings = model.get_text_embedding_batch(["ab abcd", "abcdef"])
+
+        assert embeddings == [[3.0, 1.0], [6.0, 1.0]]
+        assert np.allclose(
+            np.linalg.norm(fake_model(tmp_path).get_text_embedding("ab abcd")), 1.0
+        )
+
+    def test_query_instruction_prefixed(self, tmp_path):
+        """Test expected use case: queries and texts get their own prompts."""
+        model = fake_model(
+            tmp_path,
+            query_instruction="search_query: ",
+            text_instruction="search_document: ",
+        )
+
+        model.get_query_embedding("vlan setup")
+        model.get_text_embedding("Configure the vlan.")
+
+        assert model._tokenizer.texts == [
+            "search_query: vlan setup",
+            "search_document: Configure the vlan.",
+        ]
+
+    def test_batch_in_one_forward_pass(self, tmp_path):
+        """Test expected use case: batches larger than llama-index's 10 stay whole."""
+        model = fake_model(tmp_path)
+
+        model.get_text_embedding_batch([f"text {i}" for i in range(40)])
+        configured = load_onnx_embedding(
+            {"onnx_model_dir": str(tmp_path)}, embed_batch_size=256
+        )
+
+        assert model._session.batches == [40]
+        assert configured.embed_batch_size == 256
+
+    def test_reference_similarity(self, tmp_path):
+        """Test expected use case: identical models agree, others score lower."""
+        texts = ["ab abcd", "abcdef", "a"]
+        model = fake_model(tmp_path)
+        other = fake_model(tmp_path, pooling="cls")
+
+        same = reference_similarity(model, fake_model(tmp_path), texts)
+
+        assert same == pytest.approx(1.0)
+        assert reference_similarity(model, other, texts) < 1.0
+
+    def test_missing_model_files(self, tmp_path):
+        """Test failure case: embedding without an exported graph raises."""
+        model = OnnxEmbedding(str(tmp_path))
+
+        with pytest.raises(FileNotFoundError, match="export_onnx_model"):
+            model.get_text_embedding("text")
+
+
+class TorchReference:
+    """Mean-pooled, normalized embeddings straight from the PyTorch model."""
+
+    def __init__(self, model_dir):
+        from transformers import AutoModel, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = AutoModel.from_pretrained(model_dir).eval()
+
+    def get_text_embedding_batch(self, texts):
+        import torch
+
+        inputs = self.tokenizer(texts, padding=True, return_tensors="pt")
+        with torch.no_grad():
+            hidden = self.model(**inputs).last_hidden_state.numpy()
+        return normalize(mean_pool(hidden, inputs["attention_mask"].numpy())).tolist()
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """A small random BERT, saved locally and exported to ONNX."""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+
+    torch.manual_seed(0)
+    source = tmp_path_factory.mktemp("bert")
+    words = "vsan witness host firmware cluster network vlan upgrade".split()
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "."] + words
+    (source / "vocab.txt").write_text("\n".join(vocab))
+    tokenizer = transformers.BertTokenizerFast(str(source / "vocab.txt"))
+    tokenizer.save_pretrained(source)
+    transformers.BertModel(
+        transformers.BertConfig(
+            vocab_size=len(vocab),
+            hidden_size=64,
+            num_hidden_layers=2,
+            num_attention_heads=4,
+            intermediate_size=128,
+        )
+    ).save_pretrained(source)
+
+    output = tmp_path_factory.mktemp("onnx")
+    export_onnx_model(
+        str(source), str(output), max_length=64, query_instruction="vsan "
+    )
+    return source, output
+
+
+class TestExportOnnxModel:
+    """Test cases for export_onnx_model function."""
+
+    @pytest.mark.parametrize(
+        "quantized,floor", [(False, 0.9999), (True, MIN_REFERENCE_COSINE)]
+    )
+    def test_within_tolerance_of_reference(self, exported, quantized, floor):
+        """Test expected use case: exported vectors match the PyTorch model's."""
+        source, output = exported
+        texts = [
+            "vsan witness host.",
+            "upgrade the cluster firmware.",
+            "network vlan.",
+            "host host host host vlan upgrade witness cluster.",
+        ]
+
+        model = OnnxEmbedding(str(output), quantized=quantized, threads=1)
+
+        assert reference_similarity(model, TorchReference(source), texts) >= floor
+
+    def test_query_prefix_applied(self, exported):
+        """Test expected use case: queries carry the prompt saved at export."""
+        source, output = exported
+        model = OnnxEmbedding(str(output), quantized=False, threads=1)
+
+        query = normalize(np.array([model.get_query_embedding("witness host.")]))
+        prefixed = TorchReference(source).get_text_embedding_batch(
+            ["vsan witness host."]
+        )
+
+        assert model.text_instruction is None
+        assert float(query @ np.array(prefixed).T) >= 0.9999
@@ -0,0 +1,119 @@
+"""
+Tests for the bounded-queue pipeline module.
+"""
+
+import threading
+
+import pytest
+
+from pdfchat.pipeline import run_pipeline
+
+
+def double(items):
+    """Stage doubling every item."""
+    for item in items:
+        yield item * 2
+
+
+def pairs(items):
+    """Stage batching items in pairs, flushing the remainder."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == 2:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class TestRunPipeline:
+    """Test cases for run_pipeline function."""
+
+    def test_items_flow_in_order(self):
+        """Test expected use case: stages apply in order and keep item order."""
+        assert list(run_pipeline(range(5), [double, pairs])) == [[0, 2], [4, 6], [8]]
+
+    def test_no_stages(self):
+        """Test edge case: without stages the source is passed through."""
+        assert list(run_pipeline(iter("abc"), [])) == ["a", "b", "c"]
+
+    def test_bounded_queues_apply_backpressure(self):
+        """Test expected use case: the source stops once the queues are full."""
+        produced = []
+        release = threading.Event()
+
+        def source():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        def blocked(items):
+            for item in items:
+                release.wait(timeout=5)
+                yield item
+
+        results = run_pipeline(source(), [blocked], queue_size=2)
+        first = next(results)
+        # One item held by the blocked stage plus two in its input queue
+        assert first == 0 and len(produced) <= 5
+        release.set()
+        assert [first, *results] == list(range(100))
+
+    def test_stage_error_reraised(self):
+        """Test failure case: a stage exception reaches the consumer."""
+
+        def explode(items):
+            for item in items:
+                if item == 3:
+                    raise ValueError("bad page")
+                yield item
+
+        with pytest.raises(ValueError, match="bad page"):
+            list(run_pipeline(range(10), [explode, double]))
+
+    def test_source_error_reraised(self):
+        """Test failure case: a source exception reaches the consumer."""
+
+        def source():
+            yield 1
+            raise OSError("unreadable")
+
+        with pytest.raises(OSError, match="unreadable"):
+            list(run_pipeline(source(), [double]))
+
+    def test_early_close_stops_stages(self):
+        """Test edge case: closing the consumer stops and closes the source."""
+        closed = threading.Event()
+
+        def source():
+            try:
+                yield from range(10_000)
+            finally:
+                closed.set()
+
+        results = run_pipeline(source(), [double], queue_size=1)
+        assert next(results) == 0
+        results.close()
+
+        assert closed.is_set()
+        assert not any(t.name.startswith("pipeline-stage") for t in threading.enumerate())
+
+    def test_stage_worker_pools(self):
+        """Test expected use case: a stage runs on several threads at once."""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def together(items):
+            for item in items:
+                # Only passes if three workers hold an item at the same time
+                barrier.wait()
+                yield item
+
+        results = run_pipeline(range(9), [together, double], workers=[3, 2])
+
+        assert sorted(results) == [i * 2 for i in range(9)]
+
+    def test_invalid_workers(self):
+        """Test failure case: every stage needs at least one thread."""
+        with pytest.raises(ValueError):
+            run_pipeline(range(3), [double], workers=[0])
@@ -0,0 +1,87 @@
+"""
+Tests for the query embedding micro-batcher module.
+"""
+
+import asyncio
+from unittest.mock import Mock
+
+from pdfchat.query_batcher import QueryEmbeddingBatcher
+
+
+def fake_embed_batch():
+    """Mock batch embedder returning one float per character."""
+    return Mock(side_effect=lambda queries: [[float(len(q))] for q in queries])
+
+
+class TestQueryEmbeddingBatcher:
+    """Test cases for QueryEmbeddingBatcher class."""
+
+    def test_concurrent_queries_share_a_call(self):
+        """Test expected use case: queries within the wait window are batched."""
+        embed_batch = fake_embed_batch()
+
+        async def scenario():
+            batcher = QueryEmbeddingBatcher(embed_batch, max_wait_ms=20)
+            results = await asyncio.gather(
+                batcher.embed("a"), batcher.embed("bb"), batcher.embed("ccc")
+            )
+            return results, batcher.metrics()
+
+        results, metrics = asyncio.run(scenario())
+
+        assert results == [[1.0], [2.0], [3.0]]
+        embed_batch.assert_called_once_with(["a", "bb", "ccc"])
+        assert metrics["batches"] == 1
+        assert metrics["avg_batch_size"] == 3
+
+    def test_full_batch_flushed_early(self):
+        """Test edge case: a full batch does not wait for the timer."""
+        embed_batch = fake_embed_batch()
+
+        async def scenario():
+            batcher = QueryEmbeddingBatcher(
+                embed_batch, max_batch_size=2, max_wait_ms=10_000
+            )
+            queries = [batcher.embed(q) for q in ["a", "b", "c", "d"]]
+            return await asyncio.wait_for(asyncio.gather(*queries), timeout=5)
+
+        assert asyncio.run(scenario()) == [[1.0]] * 4
+        assert [c.args[0] for c in embed_batch.call_args_list] == [["a", "b"], ["c", "d"]]
+
+    def test_failure_reaches_every_caller(self):
+        """Test failure case: a model error is raised in all batched callers."""
+        embed_batch = Mock(side_effect=RuntimeError("model down"))
+
+        async def scenario():
+            batcher = QueryEmbeddingBatcher(embed_batch)
+            return await asyncio.gather(
+                batcher.embed("a"), batcher.embed("b"), return_exceptions=True
+            )
+
+        results = asyncio.run(scenario())
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        embed_batch.assert_called_once()
+
+    def test_cancelled_caller_skipped(self):
+        """Test edge case: a caller that gave up is not embedded."""
+        embed_batch = fake_embed_batch()
+
+        async def scenario():
+            batcher = QueryEmbeddingBatcher(embed_batch, max_wait_ms=20)
+            gone = asyncio.create_task(batcher.embed("gone"))
+            await asyncio.sleep(0)
+            gone.cancel()
+            return await batcher.embed("kept")
+
+        assert asyncio.run(scenario()) == [4.0]
+        embed_batch.assert_called_once_with(["kept"])
+
+    def test_single_query(self):
+        """Test edge case: a lone query is embedded after the wait window."""
+        embed_batch = fake_embed_batch()
+
+        async def scenario():
+            return await QueryEmbeddingBatcher(embed_batch, max_wait_ms=1).embed("abc")
+
+        assert asyncio.run(scenario()) == [3.0]
@@ -0,0 +1,77 @@
+"""
+Tests for the query engine registry module.
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from pdfchat.query_engine import QueryEngineRegistry
+
+
+class TestQueryEngineRegistry:
+    """Test cases for QueryEngineRegistry class."""
+
+    def test_engine_reused_across_calls(self):
+        """Test expected use case: index and engine are built once."""
+        ingestion = Mock()
+        registry = QueryEngineRegistry(ingestion)
+
+        first = registry.get_query_engine(similarity_top_k=5)
+        second = registry.get_query_engine(similarity_top_k=5)
+
+        assert first is second
+        ingestion.load_existing_index.assert_called_once()
+        index = ingestion.load_existing_index.return_value
+        index.as_query_engine.assert_called_once_with(
+            similarity_top_k=5, response_mode="compact", streaming=False
+        )
+
+    def test_engines_keyed_by_settings(self):
+        """Test edge case: different settings get separate engines."""
+        ingestion = Mock()
+        index = ingestion.load_existing_index.return_value
+        index.as_query_engine.side_effect = lambda **kwargs: Mock()
+        registry = QueryEngineRegistry(ingestion)
+
+        top5 = registry.get_query_engine(similarity_top_k=5)
+        top10 = registry.get_query_engine(similarity_top_k=10)
+        tree = registry.get_query_engine(similarity_top_k=5, response_mode="tree")
+        stream = registry.get_query_engine(similarity_top_k=5, streaming=True)
+
+        assert len({id(top5), id(top10), id(tree), id(stream)}) == 4
+
+    def test_section_engine_filters_subtree(self):
+        """Test expected use case: a section engine filters on the section labels."""
+        ingestion = Mock()
+        index = ingestion.load_existing_index.return_value
+        registry = QueryEngineRegistry(ingestion)
+
+        registry.get_query_engine(similarity_top_k=5, section="Install > Network")
+
+        filters = index.as_query_engine.call_args.kwargs["filters"].filters
+        assert [(f.key, f.value) for f in filters] == [("sections", "Install > Network")]
+
+    def test_refresh_swaps_index(self):
+        """Test expected use case: refresh replaces index and bumps generation."""
+        ingestion = Mock()
+        ingestion.load_existing_index.side_effect = [Mock(), Mock()]
+        registry = QueryEngineRegistry(ingestion)
+
+        registry.refresh()
+        old_engine = registry.get_query_engine()
+        registry.refresh()
+
+        assert registry.generation == 2
+        assert registry.get_query_engine() is not old_engine
+
+    def test_try_refresh_failure(self):
+        """Test failure case: load errors are reported, not raised."""
+        ingestion = Mock()
+        ingestion.load_existing_index.side_effect = RuntimeError("store down")
+        registry = QueryEngineRegistry(ingestion)
+
+        assert registry.try_refresh() is False
+        assert registry.is_loaded is False
+        with pytest.raises(RuntimeError, match="store down"):
+            registry.get_query_engine()
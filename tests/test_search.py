@@ -0,0 +1,80 @@
+"""
+Tests for the exact search module.
+"""
+
+import numpy as np
+
+from pdfchat.search import exact_top_k, normalize
+
+
+def reference_top_k(matrix, query, k, mask=None):
+    """Naive full-sort top-k used as ground truth."""
+    scores = matrix @ query
+    if mask is not None:
+        scores[~mask] = -np.inf
+    rows = np.argsort(-scores, kind="stable")[:k]
+    return rows, scores[rows]
+
+
+class TestExactSearch:
+    """Test cases for exact_top_k function."""
+
+    def setup_method(self):
+        rng = np.random.default_rng(42)
+        self.matrix = normalize(rng.standard_normal((1000, 16)))
+        self.query = normalize(rng.standard_normal(16))
+
+    def test_matches_full_sort(self):
+        """Test expected use case: results equal a naive full sort."""
+        rows, scores = exact_top_k(self.matrix, self.query, k=10)
+        expected_rows, expected_scores = reference_top_k(
+            self.matrix, self.query, 10
+        )
+
+        assert rows.tolist() == expected_rows.tolist()
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+    def test_block_size_does_not_change_results(self):
+        """Test edge case: blocking over row ranges is transparent."""
+        whole, _ = exact_top_k(self.matrix, self.query, k=25)
+        blocked, _ = exact_top_k(self.matrix, self.query, k=25, block_rows=7)
+
+        assert blocked.tolist() == whole.tolist()
+
+    def test_mask_excludes_rows(self):
+        """Test expected use case: masked rows are never returned."""
+        mask = np.zeros(len(self.matrix), dtype=bool)
+        mask[::3] = True
+
+        rows, _ = exact_top_k(self.matrix, self.query, k=10, mask=mask, block_rows=64)
+        expected_rows, _ = reference_top_k(self.matrix, self.query, 10, mask)
+
+        assert rows.tolist() == expected_rows.tolist()
+
+    def test_batched_queries(self):
+        """Test expected use case: several queries are searched at once."""
+        queries = normalize(np.random.default_rng(1).standard_normal((3, 16)))
+
+        rows, scores = exact_top_k(self.matrix, queries, k=5, block_rows=100)
+
+        assert rows.shape == (3, 5)
+        for query, query_rows in zip(queries, rows):
+            expected_rows, _ = reference_top_k(self.matrix, query, 5)
+            assert query_rows.tolist() == expected_rows.tolist()
+
+    def test_k_larger_than_eligible_rows(self):
+        """Test edge case: k is capped at the number of eligible rows."""
+        mask = np.zeros(len(self.matrix), dtype=bool)
+        mask[[3, 500]] = True
+
+        rows, scores = exact_top_k(self.matrix, self.query, k=10, mask=mask)
+
+        assert sorted(rows.tolist()) == [3, 500]
+        assert np.isfinite(scores).all()
+
+    def test_empty_matrix(self):
+        """Test failure case: searching an empty matrix returns nothing."""
+        rows, scores = exact_top_k(np.empty((0, 16), dtype=np.float32), self.query, 5)
+
+        assert len(rows) == 0
+        assert len(scores) == 0
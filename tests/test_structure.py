@@ -0,0 +1,132 @@
+"""
+Tests for the document section structure module.
+"""
+
+from pdfchat.extraction import PageRecord
+from pdfchat.structure import (
+    Heading,
+    Section,
+    assign_sections,
+    font_headings,
+    outline_headings,
+    section_label,
+    section_labels,
+)
+
+
+def span(text, size=10.0, bold=False):
+    """A PyMuPDF text span."""
+    return {"text": text, "size": size, "flags": 16 if bold else 0}
+
+
+def page_dict(*blocks):
+    """A PyMuPDF page dict with one line of spans per block entry."""
+    return {
+        "blocks": [
+            {"lines": [{"spans": spans} for spans in block]} for block in blocks
+        ]
+    }
+
+
+class TestOutlineHeadings:
+    """Test cases for outline_headings function."""
+
+    def test_titles_located_in_text(self):
+        """Test expected use case: outline titles are found despite case and wrapping."""
+        text = "Intro text.\nNETWORK\nSETUP\nConfigure the vlan.\nStorage\nAdd disks."
+
+        headings = outline_headings(
+            [[1, "Network  Setup", 3], [2, "Storage", 3]], text
+        )
+
+        assert headings == (
+            Heading(1, "Network Setup", text.index("NETWORK")),
+            Heading(2, "Storage", text.index("Storage")),
+        )
+
+    def test_missing_title_starts_at_previous(self):
+        """Test edge case: a title absent from the text starts where the last one did."""
+        headings = outline_headings([[1, "Not on page", 2]], "Body text.")
+
+        assert headings == (Heading(1, "Not on page", 0),)
+
+
+class TestFontHeadings:
+    """Test cases for font_headings function."""
+
+    def test_levels_from_size_and_weight(self):
+        """Test expected use case: larger fonts rank above bold body-size lines."""
+        text = "Installation\nNetwork\nPrerequisites\nBody text that is long enough."
+        layout = page_dict(
+            [[span("Installation", size=18)]],
+            [[span("Network", size=14)]],
+            [[span("Prerequisites", bold=True)]],
+            [[span("Body text that is long enough.")]],
+        )
+
+        headings = font_headings(layout, text)
+
+        assert [(h.level, h.title) for h in headings] == [
+            (1, "Installation"),
+            (2, "Network"),
+            (4, "Prerequisites"),
+        ]
+        assert [h.offset for h in headings] == [0, 13, 21]
+
+    def test_body_text_not_headings(self):
+        """Test edge case: bold sentences and long paragraphs are not headings."""
+        text = "Note: back up first.\n" + "Plain words here. " * 10
+        layout = page_dict(
+            [[span("Note: back up first.", bold=True)]],
+            [[span("Plain words here. " * 10)]],
+        )
+
+        assert font_headings(layout, text) == ()
+
+    def test_empty_page(self):
+        """Test edge case: a page without text spans has no headings."""
+        assert font_headings({"blocks": []}, "") == ()
+
+
+class TestAssignSections:
+    """Test cases for assign_sections function."""
+
+    def test_paths_carry_across_pages(self):
+        """Test expected use case: sections continue until a same-level heading."""
+        pages = [
+            PageRecord(1, "Preface. Install here.", headings=(Heading(1, "Install", 9),)),
+            PageRecord(2, "More install. Network here.", headings=(Heading(2, "Network", 14),)),
+            PageRecord(3, "Still network."),
+            PageRecord(4, "Upgrade now.", headings=(Heading(1, "Upgrade", 0),)),
+        ]
+
+        sections = [record.sections for record in assign_sections(pages)]
+
+        assert sections == [
+            (Section(0, 9, ()), Section(9, 22, ("Install",))),
+            (Section(0, 14, ("Install",)), Section(14, 27, ("Install", "Network"))),
+            (Section(0, 14, ("Install", "Network")),),
+            (Section(0, 12, ("Upgrade",)),),
+        ]
+
+    def test_no_headings(self):
+        """Test edge case: a document without headings has one unnamed section per page."""
+        (record,) = assign_sections([PageRecord(1, "Just text.")])
+
+        assert record.sections == (Section(0, 10, ()),)
+
+
+class TestSectionLabels:
+    """Test cases for section_label and section_labels functions."""
+
+    def test_labels_of_ancestors(self):
+        """Test expected use case: one label per level, outermost first."""
+        path = ("Install", "Network", "VLANs")
+
+        assert section_label(path) == "Install > Network > VLANs"
+        assert section_labels(path) == [
+            "Install",
+            "Install > Network",
+            "Install > Network > VLANs",
+        ]
+        assert section_labels(()) == []
@@ -0,0 +1,310 @@
+"""
+Tests for the memory-mapped vector store module.
+"""
+
+import os
+import sqlite3
+import threading
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+
+from pdfchat.vector_store import EMBEDDINGS_FILE, MmapVectorStore
+
+
+def make_node(node_id, embedding, ref_doc_id="doc1", text=None):
+    """Build a text node with an embedding and a source document."""
+    return TextNode(
+        id_=node_id,
+        text=text or f"text of {node_id}",
+        embedding=embedding,
+        metadata={"file_name": f"{ref_doc_id}.pdf"},
+        relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=ref_doc_id)},
+    )
+
+
+class TestMmapVectorStore:
+    """Test cases for MmapVectorStore class."""
+
+    def test_add_and_query(self, tmp_path):
+        """Test expected use case: nearest node is returned first."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add(
+            [
+                make_node("a", [1.0, 0.0, 0.0]),
+                make_node("b", [0.0, 1.0, 0.0]),
+                make_node("c", [0.7, 0.7, 0.0]),
+            ]
+        )
+
+        result = store.query(
+            VectorStoreQuery(query_embedding=[1.0, 0.1, 0.0], similarity_top_k=2)
+        )
+
+        assert result.ids == ["a", "c"]
+        assert result.nodes[0].text == "text of a"
+        assert result.nodes[0].metadata["file_name"] == "doc1.pdf"
+        assert result.similarities[0] == pytest.approx(0.995, abs=1e-3)
+
+    def test_reopen_uses_memory_map(self, tmp_path):
+        """Test expected use case: data survives a restart without loading."""
+        MmapVectorStore(str(tmp_path)).add(
+            [make_node("a", [1.0, 0.0]), make_node("b", [0.0, 1.0])]
+        )
+
+        reopened = MmapVectorStore(str(tmp_path))
+
+        assert isinstance(reopened.matrix(), np.memmap)
+        assert reopened.matrix().shape == (2, 2)
+        assert reopened.num_vectors == 2
+        result = reopened.query(
+            VectorStoreQuery(query_embedding=[0.0, 1.0], similarity_top_k=1)
+        )
+        assert result.ids == ["b"]
+
+    def test_delete_and_compact(self, tmp_path):
+        """Test expected use case: deleted documents disappear from results."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add([make_node("a", [1.0, 0.0], ref_doc_id="doc1")])
+        store.add([make_node("b", [0.9, 0.1], ref_doc_id="doc2")])
+
+        store.delete("doc1")
+        result = store.query(
+            VectorStoreQuery(query_embedding=[1.0, 0.0], similarity_top_k=2)
+        )
+        assert result.ids == ["b"]
+
+        store.compact()
+        assert store.num_rows == 1
+        assert os.path.getsize(store._embeddings_path) == 2 * 4
+        assert not os.path.exists(tmp_path / EMBEDDINGS_FILE)
+        assert store.get_nodes(["b"])[0].text == "text of b"
+        assert MmapVectorStore(str(tmp_path)).search([0.9, 0.1], top_k=1)[0] == [0]
+
+    def test_compaction_interrupted_before_commit(self, tmp_path):
+        """Test failure case: a matrix file without its commit is discarded on open."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add([make_node("a", [1.0, 0.0], ref_doc_id="doc1")])
+        store.add([make_node("b", [0.0, 1.0], ref_doc_id="doc2")])
+        store.delete("doc1")
+        (tmp_path / "embeddings.0123456789ab.f32").write_bytes(b"\0" * 8)
+
+        reopened = MmapVectorStore(str(tmp_path))
+
+        assert reopened.num_rows == 2
+        assert sorted(os.listdir(tmp_path)) == [EMBEDDINGS_FILE, "nodes.db", "write.lock"]
+        assert reopened.search([0.0, 1.0], top_k=1)[0] == [1]
+
+    def test_compaction_interrupted_after_commit(self, tmp_path):
+        """Test failure case: a crash after the commit keeps the compacted rows."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add([make_node("a", [1.0, 0.0], ref_doc_id="doc1")])
+        store.add([make_node("b", [0.0, 1.0], ref_doc_id="doc2")])
+        store.delete("doc1")
+
+        with patch("pdfchat.vector_store.os.remove", side_effect=OSError("crash")):
+            with pytest.raises(OSError):
+                store.compact()
+        reopened = MmapVectorStore(str(tmp_path))
+
+        assert reopened.num_rows == 1
+        assert not os.path.exists(tmp_path / EMBEDDINGS_FILE)
+        assert reopened._nodes_for_rows([0])[0].node_id == "b"
+        assert reopened.search([0.0, 1.0], top_k=1)[0] == [0]
+
+    def test_delete_waits_for_other_writers(self, tmp_path):
+        """Test edge case: deletes are excluded while another instance writes."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add([make_node("a", [1.0, 0.0], ref_doc_id="doc1")])
+        other = MmapVectorStore(str(tmp_path))
+
+        with other._write_lock():
+            deleter = threading.Thread(target=store.delete, args=("doc1",))
+            deleter.start()
+            deleter.join(0.2)
+            assert deleter.is_alive()
+        deleter.join(5)
+
+        assert store.num_vectors == 0
+
+    def test_section_filter_matches_subtree(self, tmp_path):
+        """Test expected use case: a list field filter matches any of its labels."""
+        store = MmapVectorStore(str(tmp_path))
+        nodes = [
+            make_node("a", [1.0, 0.0]),
+            make_node("b", [0.9, 0.1]),
+            make_node("c", [0.8, 0.2]),
+        ]
+        nodes[0].metadata["sections"] = ["Install"]
+        nodes[1].metadata["sections"] = ["Install", "Install > Network"]
+        nodes[2].metadata["sections"] = ["Upgrade"]
+        store.add(nodes)
+
+        def query(*filters, **kwargs):
+            return store.query(
+                VectorStoreQuery(
+                    query_embedding=[1.0, 0.0],
+                    similarity_top_k=3,
+                    filters=MetadataFilters(filters=list(filters)),
+                    **kwargs,
+                )
+            ).ids
+
+        assert query(MetadataFilter(key="sections", value="Install")) == ["a", "b"]
+        assert query(MetadataFilter(key="sections", value="Install > Network")) == ["b"]
+        assert query(
+            MetadataFilter(
+                key="sections", value=["Upgrade", "Missing"], operator=FilterOperator.IN
+            )
+        ) == ["c"]
+        assert query(
+            MetadataFilter(key="file_name", value="doc1.pdf"), node_ids=["b", "c"]
+        ) == ["b", "c"]
+        matched = store.get_nodes(
+            filters=MetadataFilters(
+                filters=[MetadataFilter(key="sections", value="Upgrade")]
+            )
+        )
+        assert [node.node_id for node in matched] == ["c"]
+
+    def test_unsupported_filter_operator(self, tmp_path):
+        """Test failure case: range filters are rejected rather than ignored."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add([make_node("a", [1.0, 0.0])])
+        filters = MetadataFilters(
+            filters=[MetadataFilter(key="page", value=3, operator=FilterOperator.GT)]
+        )
+
+        with pytest.raises(ValueError, match="operator '>' is not supported"):
+            store.query(
+                VectorStoreQuery(
+                    query_embedding=[1.0, 0.0], similarity_top_k=1, filters=filters
+                )
+            )
+
+    def test_readd_replaces_node(self, tmp_path):
+        """Test edge case: adding an existing node id replaces it."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add([make_node("a", [1.0, 0.0], text="old")])
+        store.add([make_node("a", [0.0, 1.0], text="new")])
+
+        assert store.num_vectors == 1
+        assert store.get_nodes(["a"])[0].text == "new"
+
+    def test_dimension_mismatch(self, tmp_path):
+        """Test failure case: embeddings must match the store dimension."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add([make_node("a", [1.0, 0.0])])
+
+        with pytest.raises(ValueError):
+            store.add([make_node("b", [1.0, 0.0, 0.0])])
+
+    def test_truncates_uncommitted_rows(self, tmp_path):
+        """Test edge case: rows written without a commit are discarded on open."""
+        MmapVectorStore(str(tmp_path)).add([make_node("a", [1.0, 0.0])])
+        with open(tmp_path / EMBEDDINGS_FILE, "ab") as f:
+            f.write(np.zeros(2, dtype=np.float32).tobytes())
+
+        reopened = MmapVectorStore(str(tmp_path))
+
+        assert reopened.num_rows == 1
+        assert os.path.getsize(tmp_path / EMBEDDINGS_FILE) == 2 * 4
+
+    def test_failed_add_rolled_back(self, tmp_path):
+        """Test failure case: a batch with a duplicate id leaves the store usable."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add([make_node("a", [1.0, 0.0])])
+
+        with pytest.raises(sqlite3.IntegrityError):
+            store.add([make_node("b", [0.0, 1.0]), make_node("b", [0.5, 0.5])])
+        store.add([make_node("c", [0.0, 1.0])])
+
+        assert store.num_rows == 2
+        assert os.path.getsize(tmp_path / EMBEDDINGS_FILE) == 2 * 2 * 4
+        assert [n.node_id for n in store.get_nodes(["a", "b", "c"])] == ["a", "c"]
+
+    def test_reload_sees_other_writers(self, tmp_path):
+        """Test expected use case: rows added by another instance appear on reload."""
+        reader = MmapVectorStore(str(tmp_path))
+        MmapVectorStore(str(tmp_path)).add(
+            [make_node("a", [1.0, 0.0]), make_node("b", [0.0, 1.0])]
+        )
+        assert reader.num_rows == 0
+
+        reader.reload()
+
+        assert reader.num_vectors == 2
+        assert reader.search([0.0, 1.0], top_k=1)[0] == [1]
+
+    def test_two_writers_share_directory(self, tmp_path):
+        """Test edge case: instances sharing a directory append after each other."""
+        first = MmapVectorStore(str(tmp_path))
+        second = MmapVectorStore(str(tmp_path))
+
+        first.add([make_node("a", [1.0, 0.0])])
+        second.add([make_node("b", [0.0, 1.0])])
+        first.add([make_node("c", [0.7, 0.7])])
+
+        reopened = MmapVectorStore(str(tmp_path))
+        assert reopened.num_rows == 3
+        assert os.path.getsize(tmp_path / EMBEDDINGS_FILE) == 3 * 2 * 4
+        rows, _ = reopened.search([0.0, 1.0], top_k=1)
+        assert reopened._nodes_for_rows(rows)[0].node_id == "b"
+
+    def test_concurrent_adds_and_queries(self, tmp_path):
+        """Test edge case: queries racing adds and deletes never see torn state."""
+        store = MmapVectorStore(str(tmp_path))
+        store.add([make_node("seed", [1.0, 0.0])])
+        errors = []
+        done = threading.Event()
+
+        def add():
+            try:
+                for i in range(300):
+                    store.add([make_node(f"n{i}", [1.0, i / 300], f"doc{i % 3}")])
+                    if i % 10 == 0:
+                        store.delete(f"doc{i % 3}")
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        def query(**kwargs):
+            try:
+                while not done.is_set():
+                    store.query(
+                        VectorStoreQuery(
+                            query_embedding=[1.0, 0.5], similarity_top_k=5, **kwargs
+                        )
+                    )
+            except Exception as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=add),
+            threading.Thread(target=query),
+            threading.Thread(target=query, kwargs={"doc_ids": ["doc1"]}),
+            threading.Thread(
+                target=query,
+                kwargs={
+                    "filters": MetadataFilters(
+                        filters=[MetadataFilter(key="file_name", value="doc2.pdf")]
+                    )
+                },
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert store.num_rows == 301
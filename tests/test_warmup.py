@@ -0,0 +1,81 @@
+"""
+Tests for the startup warm-up module.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from pdfchat.warmup import Warmup, ollama_generate
+
+
+class TestWarmup:
+    """Test cases for Warmup class."""
+
+    def test_components_warmed_in_order(self):
+        """Test expected use case: every step runs once and timings are recorded."""
+        calls = []
+        warmup = Warmup()
+        warmup.add("embedding", lambda: calls.append("embedding"))
+        warmup.add("llm", lambda: calls.append("llm"))
+
+        assert not warmup.ready
+        assert warmup.run()
+
+        status = warmup.status()
+        assert calls == ["embedding", "llm"]
+        assert status["ready"] and status["warmup_seconds"] >= 0
+        assert status["components"]["llm"]["state"] == "ready"
+        assert status["components"]["llm"]["seconds"] >= 0
+
+    def test_skipped_component_counts_as_ready(self):
+        """Test edge case: a component without a step does not block readiness."""
+        warmup = Warmup()
+        warmup.add("llm", None)
+
+        assert warmup.ready
+        assert warmup.status()["components"]["llm"]["state"] == "skipped"
+
+    def test_failed_step_retried(self):
+        """Test failure case: a failing step keeps readiness off until it succeeds."""
+        step = Mock(side_effect=[ConnectionError("ollama starting"), None])
+        warmup = Warmup(retry_interval=0.01)
+        warmup.add("llm", step)
+
+        assert warmup.run()
+        assert step.call_count == 2
+        assert warmup.status()["components"]["llm"]["attempts"] == 2
+
+    def test_stop_ends_retries(self):
+        """Test failure case: a stopped warm-up reports the last error."""
+        warmup = Warmup(retry_interval=0.01)
+        warmup.add("llm", Mock(side_effect=ConnectionError("refused")))
+        warmup.stop()
+
+        assert not warmup.run()
+        component = warmup.status()["components"]["llm"]
+        assert (component["state"], component["error"]) == ("failed", "refused")
+
+
+class TestOllamaGenerate:
+    """Test cases for ollama_generate function."""
+
+    def test_one_token_generation(self):
+        """Test expected use case: a one-token, non-streaming request loads the model."""
+        with patch("pdfchat.warmup.requests.post") as post:
+            ollama_generate("http://ollama:11434/", "phi3:cpu", timeout=5)
+
+        url = post.call_args.args[0]
+        body = post.call_args.kwargs["json"]
+        assert url == "http://ollama:11434/api/generate"
+        assert (body["model"], body["stream"]) == ("phi3:cpu", False)
+        assert body["options"] == {"num_predict": 1}
+
+    def test_http_error_raised(self):
+        """Test failure case: an unknown model is reported as an error."""
+        response = Mock()
+        response.raise_for_status.side_effect = requests.HTTPError("404")
+        with patch("pdfchat.warmup.requests.post", return_value=response):
+            with pytest.raises(requests.HTTPError):
+                ollama_generate("http://ollama:11434", "missing")